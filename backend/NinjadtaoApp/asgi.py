@@ -9,8 +9,35 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.core.handlers.asgi import ASGIHandler
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'NinjadtaoProj.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'NinjadtaoApp.settings')
+django.setup(set_prefix=False)
 
-application = get_asgi_application()
+
+class NinjadtaoASGIHandler(ASGIHandler):
+    """Routes requests through NinjadtaoApp.asgi_urls so the async read views are used."""
+
+    urlconf = 'NinjadtaoApp.asgi_urls'
+
+    # Responses that stay open for as long as the client is connected. Django
+    # normally gives each request a ThreadSensitiveContext, whose executor
+    # thread then sits idle until the response ends, so every client would
+    # hold a thread. These requests share the one process-wide sync thread instead.
+    streaming_paths = ('/api/v1.0/user/classes/stream/',)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] in self.streaming_paths:
+            await self.handle(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = self.urlconf
+        return request, error_response
+
+
+application = NinjadtaoASGIHandler()
@@ -0,0 +1,20 @@
+"""
+URL configuration for the ASGI application.
+
+Same routes as NinjadtaoApp.urls, except the read endpoints are served by
+their async views (userAPI.asyncviews). Listed first, so they win. The
+availability stream exists only here, because it holds its connection open.
+"""
+
+from django.urls import path
+
+from userAPI.asyncviews import AsyncAuthView, AsyncBatchView, AsyncClassesView, AvailabilityStreamView
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/v1.0/user/auth/', AsyncAuthView.as_view()),
+    path('api/v1.0/user/classes/', AsyncClassesView.as_view()),
+    path('api/v1.0/user/classes/stream/', AvailabilityStreamView.as_view()),
+    path('api/v1.0/user/batch/', AsyncBatchView.as_view()),
+] + sync_urlpatterns
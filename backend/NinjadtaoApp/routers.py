@@ -0,0 +1,117 @@
+"""
+Read-replica routing.
+
+Writes always go to `default`. Inside a request, reads go to a random alias from
+settings.DATABASE_REPLICAS, except when the primary is needed for consistency:
+the request already wrote, a transaction is open on the primary, or the same
+client wrote within the last REPLICA_STICKY_SECONDS. Outside a request
+(management commands, shell, tests) everything uses the primary.
+"""
+
+import base64
+import json
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Mutable per-request state: {'pinned': bool, 'wrote': bool}. A dict rather than
+# separate vars so flags set inside sync_to_async threads are seen by the middleware.
+_request_state = ContextVar('db_routing_state', default=None)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if state is None or not replicas or state['pinned'] or state['wrote']:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+
+def _client_key(request):
+    """
+    Who made the request, for read-your-writes stickiness: the JWT user or the session.
+
+    The token is decoded but not verified. This only picks which database serves
+    the reads, and a forged token can at worst pin its own reads to the primary.
+    """
+    auth = request.headers.get('Authorization', '')
+    if auth.startswith('Bearer '):
+        try:
+            payload = auth.split('.')[1]
+            claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+            return f"jwt:{claims.get('uid') or claims.get(settings.SIMPLE_JWT.get('USER_ID_CLAIM', 'user_id'))}"
+        except (IndexError, ValueError):
+            return None
+    session = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    return f"session:{session}" if session else None
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Pins a client's reads to the primary for a short window after they write.
+
+    Runs natively under both WSGI and ASGI, so async views don't pay a thread
+    hop here. Without replicas there is nothing to pin and the cache is not
+    consulted at all.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def get_cache_key(request):
+        if not getattr(settings, 'DATABASE_REPLICAS', []):
+            return None
+        key = _client_key(request)
+        return f"db-primary:{key}" if key else None
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        cache_key = self.get_cache_key(request)
+        state = {'pinned': bool(cache_key and cache.get(cache_key)), 'wrote': False}
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+
+        if state['wrote'] and cache_key:
+            cache.set(cache_key, True, timeout=getattr(settings, 'REPLICA_STICKY_SECONDS', 5))
+        return response
+
+    async def __acall__(self, request):
+        # Same as __call__. The state dict is shared with sync_to_async threads through the context copy.
+        cache_key = self.get_cache_key(request)
+        state = {'pinned': bool(cache_key and await cache.aget(cache_key)), 'wrote': False}
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+
+        if state['wrote'] and cache_key:
+            await cache.aset(cache_key, True, timeout=getattr(settings, 'REPLICA_STICKY_SECONDS', 5))
+        return response
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -44,9 +45,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'userAPI.middleware.RequestMetricsMiddleware',   # first, so its timings cover everything below
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'userAPI.middleware.LargeResponseGZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'NinjadtaoApp.routers.ReplicaStickinessMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -85,13 +89,101 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file (not the shared-cache in-memory default) so threaded tests get real SQLite locking.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        # Reuse connections across requests; health checks drop dead ones before use.
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Take the write lock at BEGIN so two writers never deadlock upgrading read locks.
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# SQLite production profile, applied to every new SQLite connection (userAPI.signals.apply_sqlite_pragmas).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',     # readers no longer block the writer (and vice versa)
+    'busy_timeout': 5000,      # ms to wait for the write lock before "database is locked"
+    'synchronous': 'NORMAL',   # durable with WAL; fsyncs at checkpoints instead of every commit
+    'mmap_size': 268435456,    # 256 MiB of the file read through mmap
+    'cache_size': -65536,      # 64 MiB page cache (negative values are KiB)
+}
+
+# Set DJANGO_DB_ENGINE=mysql to run against MySQL (mysqlclient) instead of SQLite.
+if os.environ.get('DJANGO_DB_ENGINE') == 'mysql':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.mysql',
+        'NAME': os.environ.get('MYSQL_DATABASE', 'ninjadtao'),
+        'USER': os.environ.get('MYSQL_USER', 'root'),
+        'PASSWORD': os.environ.get('MYSQL_PASSWORD', ''),
+        'HOST': os.environ.get('MYSQL_HOST', '127.0.0.1'),
+        'PORT': os.environ.get('MYSQL_PORT', '3306'),
+        'OPTIONS': {'charset': 'utf8mb4'},
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+    }
+
+# Read replicas: DJANGO_DB_REPLICAS is a comma-separated list of SQLite files, or of MySQL hosts
+# when DJANGO_DB_ENGINE=mysql. Each one becomes a `replicaN` alias used by NinjadtaoApp.routers.
+DATABASE_REPLICAS = []
+for _number, _replica in enumerate(filter(None, os.environ.get('DJANGO_DB_REPLICAS', '').split(',')), 1):
+    _alias = f'replica{_number}'
+    DATABASES[_alias] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    DATABASES[_alias]['HOST' if DATABASES['default']['ENGINE'].endswith('mysql') else 'NAME'] = _replica
+    DATABASE_REPLICAS.append(_alias)
+
+DATABASE_ROUTERS = ['NinjadtaoApp.routers.PrimaryReplicaRouter']
+
+# After a client writes, their reads stay on the primary this long so replica lag can't hide the write.
+# Needs a cache shared by all workers to hold across processes.
+REPLICA_STICKY_SECONDS = 5
+
+
+# Cache: DJANGO_CACHE_BACKEND=locmem (default, per process), file or redis. DJANGO_CACHE_LOCATION
+# is the directory for file and the URL for redis. Use file/redis when running several workers.
+_cache_location = os.environ.get('DJANGO_CACHE_LOCATION')
+CACHES = {
+    'default': {
+        'locmem': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'ninjadtao',
+        },
+        'file': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': _cache_location or '/var/tmp/ninjadtao_cache',
+        },
+        'redis': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': _cache_location or 'redis://127.0.0.1:6379',
+        },
+    }[os.environ.get('DJANGO_CACHE_BACKEND', 'locmem')]
+}
+
+# Per-day schedule cache (userAPI.schedule_cache)
+SCHEDULE_CACHE_TIMEOUT = 86400      # seconds an entry lives; versions invalidate it sooner
+SCHEDULE_CACHE_LOCK_TIMEOUT = 10    # seconds a rebuild lock is held at most
+SCHEDULE_CACHE_WAIT = 2.0           # seconds to wait for another request's rebuild
+
+# /metrics/ answers only these client addresses (REMOTE_ADDR): DJANGO_METRICS_ALLOWED_IPS is a
+# comma-separated list, e.g. the Prometheus host. Empty, the default, turns the endpoint off.
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get('DJANGO_METRICS_ALLOWED_IPS', '').split(',') if ip.strip()]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
+# userAPI.hashers.TunablePBKDF2PasswordHasher reads its cost from PASSWORD_HASH_ITERATIONS
+# (None = Django's default). Changing it re-hashes each password on its next successful login.
+PASSWORD_HASHERS = [
+    'userAPI.hashers.TunablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASH_ITERATIONS = int(os.environ['DJANGO_PASSWORD_ITERATIONS']) if os.environ.get('DJANGO_PASSWORD_ITERATIONS') else None
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -131,6 +223,18 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': (
+        'userAPI.renderers.ORJSONRenderer',   # same bytes as JSONRenderer, encoded by orjson if installed
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    # Login attempts (userAPI.throttles), checked before any password hashing.
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': '30/min',
+        'login_email': '10/min',
+    },
+    # Reverse proxies in front of the app. 0 keys the IP throttle on REMOTE_ADDR; DRF's
+    # default (None) would trust whatever X-Forwarded-For the client sends.
+    'NUM_PROXIES': int(os.environ.get('DJANGO_NUM_PROXIES', '0')),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
     ),
@@ -140,6 +244,27 @@ REST_FRAMEWORK = {
     ),
 }
 
+# Build list responses from .values() rows instead of ModelSerializer instances
+# (userAPI.fastserializers). Same JSON; opt in with DJANGO_FAST_SERIALIZATION=1.
+FAST_SERIALIZATION = os.environ.get('DJANGO_FAST_SERIALIZATION', '0') == '1'
+
+# Queries at least this slow (ms) are logged to userAPI.slow_queries with the request path.
+SLOW_QUERY_MS = 100
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'userAPI.slow_queries': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
+# Responses smaller than this are sent uncompressed (userAPI.middleware).
+GZIP_MIN_BYTES = 1024
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=30),
@@ -149,9 +274,35 @@ SIMPLE_JWT = {
     "USER_ID_FIELD": "email",       # default is "id"
 }
 
+# Revoked refresh tokens (userAPI.blacklist). The in-process Bloom filter is sized for
+# CAPACITY live entries at ERROR_RATE false positives and rebuilt every TTL seconds.
+TOKEN_BLACKLIST_FILTER_CAPACITY = 100_000
+TOKEN_BLACKLIST_FILTER_ERROR_RATE = 0.001
+TOKEN_BLACKLIST_FILTER_TTL = 3600
+
+# Idempotency-Key records for booking requests (userAPI.idempotency): how long a key is
+# remembered, how long a retry waits for the first request with its key to finish, and
+# after how many seconds a claim whose request never finished (a crashed worker) lapses.
+IDEMPOTENCY_KEY_TTL = 86400
+IDEMPOTENCY_WAIT = 5.0
+IDEMPOTENCY_CLAIM_TIMEOUT = 30
+
+# Most rows one GET /api/v1.0/user/classes/search/ returns (userAPI.search).
+SEARCH_MAX_RESULTS = 100
+
+# Most sub-requests one POST /api/v1.0/user/batch/ may carry (userAPI.batch).
+BATCH_MAX_REQUESTS = 10
+
+# Live seat availability over Server-Sent Events (userAPI.availability), ASGI only.
+# LocalBroker serves a single worker; with several, use userAPI.availability.RedisBroker.
+AVAILABILITY_BROKER = os.environ.get('DJANGO_AVAILABILITY_BROKER', 'userAPI.availability.LocalBroker')
+AVAILABILITY_BROKER_URL = os.environ.get('DJANGO_AVAILABILITY_BROKER_URL', 'redis://127.0.0.1:6379')
+AVAILABILITY_HEARTBEAT = 15  # seconds between keep-alive comments on an idle stream
+
 AUTHENTICATION_BACKENDS = [
-    'userAPI.backends.EmailBackend',  # your custom backend
-    'django.contrib.auth.backends.ModelBackend',  # keep the default
+    'userAPI.backends.EmailBackend',  # your custom backend; extends ModelBackend, so permissions still work
+    # ModelBackend is left out on purpose: after a failed EmailBackend attempt it would
+    # look the same email up and hash the password a second time.
 ]
 
 
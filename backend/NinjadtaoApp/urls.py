@@ -17,16 +17,16 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from rest_framework_simplejwt.views import TokenObtainPairView
+from userAPI.throttles import LOGIN_THROTTLES
+from userAPI.views import EmailTokenRefreshView, metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/v1.0/user/', include('userAPI.urls')),
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'), #--- FOR JWT AUTH ---
-    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'), #--- FOR JWT AUTH ---
+    path('api/token/', TokenObtainPairView.as_view(throttle_classes=LOGIN_THROTTLES), name='token_obtain_pair'), #--- FOR JWT AUTH ---
+    path('api/token/refresh/', EmailTokenRefreshView.as_view(), name='token_refresh'), #--- FOR JWT AUTH ---
+    path('metrics/', metrics),
 ]
 
 
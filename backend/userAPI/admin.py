@@ -1,6 +1,19 @@
 from django.contrib import admin
-from .models import Classes, userModel
+from .models import BookedClasses, Classes, ClassTemplate, userModel
+from .pagination import EstimatedCountPaginator
 
 admin.site.register(userModel)
 admin.site.register(Classes)
+admin.site.register(ClassTemplate)
 
+
+@admin.register(BookedClasses)
+class BookedClassesAdmin(admin.ModelAdmin):
+    # Sized for millions of rows: one joined query per page, no COUNT(*) over the whole
+    # table, and id inputs instead of <select>s holding every member and class.
+    list_display = ('id', 'booking_date', 'clasId', 'userId')
+    list_select_related = ('clasId', 'userId')
+    raw_id_fields = ('clasId', 'userId')
+    ordering = ('-id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class UserapiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'userAPI'
+
+    def ready(self):
+        from . import signals  # noqa: F401
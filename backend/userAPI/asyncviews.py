@@ -0,0 +1,153 @@
+import asyncio
+import inspect
+import json
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import availability, batch, fastserializers
+from .pagination import BookingCursorPagination
+from .serializer import ClassSerializer
+from .schedule_cache import get_schedule
+from .services import abooked_class_ids, aschedule_versions, schedule_etag
+from .views import AuthView, BatchView, ClassesView, etag_matches
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView whose handlers are coroutines, so it runs natively on the ASGI app.
+
+    DRF's authentication/permission/throttle hooks are synchronous and may hit
+    the database (tokens without claims fall back to a user lookup), so
+    initial() runs through sync_to_async. Errors and rendering go through DRF's
+    usual handle_exception/finalize_response.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class AsyncClassesView(AsyncAPIView, ClassesView):
+    async def get(self, request):
+        try:
+            start, end = self.get_date_range(request)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        versions = await aschedule_versions(start, end)
+        etag = schedule_etag(start, end, request.user, versions)
+        headers = {"ETag": etag, "Vary": "Authorization, Cookie"}
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        if start is None:
+            classes = self.get_classes(start, end, request.user)
+            if fastserializers.enabled():
+                data = await sync_to_async(fastserializers.serialize_classes)(classes)
+            else:
+                data = ClassSerializer([c async for c in classes], many=True).data
+            return Response(data, status=status.HTTP_200_OK, headers=headers)
+
+        rows, stale = await sync_to_async(get_schedule)(versions)
+        if stale:
+            del headers["ETag"]
+        data = self.mark_booked(rows, await abooked_class_ids(request.user, start, end))
+        return Response(data, status=status.HTTP_200_OK, headers=headers)
+
+
+class AsyncAuthView(AsyncAPIView, AuthView):
+    async def post(self, request):
+        view = request.query_params.get("bookings", "upcoming")
+        if view not in self.booking_views:
+            return Response({"error": "bookings must be 'upcoming' or 'past'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # CursorPagination evaluates its slice internally; run it on the same
+        # thread-sensitive executor Django's async ORM uses for its own queries.
+        paginator = BookingCursorPagination()
+        page = await sync_to_async(paginator.paginate_queryset)(
+            self.get_bookings(request.user, view), request, view=self
+        )
+        return Response(self.get_profile(request.user, view, page, paginator))
+
+
+class AsyncBatchView(AsyncAPIView, BatchView):
+    async def post(self, request):
+        try:
+            specs = batch.parse(request.data)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        responses = []
+        for group in batch.phases([batch.Call(request, spec) for spec in specs]):
+            responses.extend(await asyncio.gather(*(call.arun() for call in group)))
+        return Response({"responses": responses})
+
+
+class AvailabilityStreamView(View):
+    """
+    Server-Sent Events feed of seat changes on one day: GET ?date=YYYY-MM-DD.
+
+    Each booking or cancellation sends an `availability` event carrying the
+    class's classId, seats_booked and seats_left. Clients load the day from
+    /classes/ first and then apply the events to it. An idle stream gets a
+    comment every AVAILABILITY_HEARTBEAT seconds, so proxies keep it open.
+
+    Served on the ASGI app only. A WSGI worker would be tied up for as long as
+    each client stays connected.
+    """
+
+    async def get(self, request):
+        try:
+            day = date.fromisoformat(request.GET.get("date", ""))
+        except ValueError:
+            return JsonResponse({"error": "date must be YYYY-MM-DD."}, status=400)
+
+        response = StreamingHttpResponse(self.events(day.isoformat()), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # nginx: pass events through unbuffered
+        return response
+
+    async def events(self, day):
+        subscription = availability.subscribe(day)
+        heartbeat = getattr(settings, "AVAILABILITY_HEARTBEAT", 15)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                messages = await subscription.next(heartbeat)
+                if not messages:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield "".join(
+                    f"event: availability\ndata: {json.dumps(message, separators=(',', ':'))}\n\n"
+                    for message in messages
+                )
+        finally:
+            # Runs when the client disconnects and Django cancels the response.
+            availability.unsubscribe(subscription)
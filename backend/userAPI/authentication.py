@@ -0,0 +1,102 @@
+from django.utils.dateparse import parse_date
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import Membership, userModel
+
+
+def add_user_claims(token, user):
+    """Copy the profile fields views need onto a token so requests don't have to look them up."""
+    token['uid'] = user.pk
+    token['first_name'] = user.first_name
+    token['last_name'] = user.last_name
+    token['membership'] = user.membershipName
+    token['expiration'] = user.expirationDate.isoformat() if user.expirationDate else None
+    token['is_staff'] = user.is_staff
+    token['is_superuser'] = user.is_superuser
+    return token
+
+
+class ClaimsUser(TokenUser):
+    """
+    A user built from the signed claims in an access token.
+
+    It answers id/email/names/membership and is_staff/is_superuser straight
+    from the token. Anything else (startDate, password, ...) loads the real
+    userModel row once, on first use.
+
+    is_active is always True, as on TokenUser: tokens are only issued to
+    active members, and nothing is re-checked per request. Deactivating a
+    member therefore takes effect when their access token expires, and the
+    refresh endpoint refuses them from then on.
+    """
+
+    @cached_property
+    def id(self):
+        return self.token['uid']
+
+    @cached_property
+    def email(self):
+        return self.token[api_settings.USER_ID_CLAIM]
+
+    @cached_property
+    def first_name(self):
+        return self.token.get('first_name', '')
+
+    @cached_property
+    def last_name(self):
+        return self.token.get('last_name', '')
+
+    @cached_property
+    def membershipName(self):
+        return self.token.get('membership')
+
+    @cached_property
+    def expirationDate(self):
+        expiration = self.token.get('expiration')
+        return parse_date(expiration) if expiration else None
+
+    @cached_property
+    def is_staff(self):
+        # Tokens issued before the claim existed ask the database rather than default to False.
+        return self.token['is_staff'] if 'is_staff' in self.token else self.db_user.is_staff
+
+    @cached_property
+    def is_superuser(self):
+        return self.token['is_superuser'] if 'is_superuser' in self.token else self.db_user.is_superuser
+
+    def get_membershipName_display(self):
+        return Membership(self.membershipName).label
+
+    def get_username(self):
+        return self.email
+
+    def __str__(self):
+        return self.email
+
+    @cached_property
+    def db_user(self):
+        return userModel.objects.get(pk=self.id)
+
+    def __getattr__(self, attr):
+        if attr.startswith('_') or attr in ('token', 'db_user'):
+            raise AttributeError(attr)
+        return getattr(self.db_user, attr)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    Opt-in JWT authentication that trusts the token's claims instead of loading the user.
+
+    Tokens issued before the claims existed (no `uid`) fall back to the normal
+    database lookup. Because nothing is re-checked per request, a deactivated
+    member keeps access until their access token expires (ACCESS_TOKEN_LIFETIME);
+    the refresh endpoint re-reads the user and stops them there.
+    """
+
+    def get_user(self, validated_token):
+        if 'uid' not in validated_token:
+            return super().get_user(validated_token)
+        return ClaimsUser(validated_token)
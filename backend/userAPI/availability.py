@@ -0,0 +1,234 @@
+"""
+Live seat availability, pushed to Server-Sent Events clients (asyncviews.AvailabilityStreamView).
+
+When a booking is created or cancelled, the class's new seat counts are
+published for its day once the transaction commits. The broker
+(settings.AVAILABILITY_BROKER) carries the delta to every worker. Each worker
+then fans it out to its own subscribers for that day.
+
+LocalBroker delivers inside this process only, which is enough for a single
+worker. RedisBroker relays between workers through Redis pub/sub.
+
+A subscription keeps only the latest delta per class. A client that falls
+behind therefore holds at most one pending message per class that day, however
+many bookings happen in the meantime. The values are absolute, so skipping the
+intermediate ones loses nothing.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .models import Classes
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------
+# Subscriptions (this process)
+# ----------------------------
+class Subscription:
+    """One connected client, bound to the event loop it was opened on."""
+
+    __slots__ = ('day', 'loop', 'pending', 'ready')
+
+    def __init__(self, day, loop):
+        self.day = day
+        self.loop = loop
+        self.pending = {}
+        self.ready = asyncio.Event()
+
+    def push(self, message):
+        # Runs on self.loop.
+        self.pending[message['classId']] = message
+        self.ready.set()
+
+    async def next(self, timeout):
+        """The deltas received since the last call, or [] if none arrive within `timeout` seconds."""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self.ready.clear()
+        messages = list(self.pending.values())
+        self.pending.clear()
+        return messages
+
+
+_subscriptions = {}  # day -> {loop: {Subscription}}
+_lock = threading.Lock()
+
+
+def subscribe(day):
+    """Start receiving deltas for `day` (an ISO date string). Call from the event loop."""
+    subscription = Subscription(day, asyncio.get_running_loop())
+    with _lock:
+        _subscriptions.setdefault(day, {}).setdefault(subscription.loop, set()).add(subscription)
+    get_broker().start()
+    return subscription
+
+
+def unsubscribe(subscription):
+    with _lock:
+        loops = _subscriptions.get(subscription.day, {})
+        group = loops.get(subscription.loop, set())
+        group.discard(subscription)
+        if not group:
+            loops.pop(subscription.loop, None)
+        if not loops:
+            _subscriptions.pop(subscription.day, None)
+
+
+def subscriber_count(day=None):
+    with _lock:
+        days = [_subscriptions.get(day, {})] if day is not None else list(_subscriptions.values())
+        return sum(len(group) for loops in days for group in loops.values())
+
+
+def _push_all(group, message):
+    for subscription in group:
+        subscription.push(message)
+
+
+def deliver(day, message):
+    """
+    Hand a delta to this process's subscribers for `day`. Safe from any thread.
+
+    Each event loop is woken once per delta, not once per subscriber.
+    """
+    with _lock:
+        loops = [(loop, tuple(group)) for loop, group in _subscriptions.get(day, {}).items()]
+    for loop, group in loops:
+        try:
+            loop.call_soon_threadsafe(_push_all, group, message)
+        except RuntimeError:
+            pass  # loop already closed; its subscriptions go away with it
+
+
+# ----------------------------
+# Brokers
+# ----------------------------
+class LocalBroker:
+    """Delivers inside this process only."""
+
+    def start(self):
+        pass
+
+    def listening(self):
+        # Nobody to tell, so the publisher can skip reading the class.
+        with _lock:
+            return bool(_subscriptions)
+
+    def publish(self, day, message):
+        deliver(day, message)
+
+
+class RedisBroker:
+    """
+    Relays deltas between workers through Redis pub/sub (settings.AVAILABILITY_BROKER_URL).
+
+    Each worker starts one listener thread the first time a client subscribes.
+    It hands whatever arrives on the channel to deliver(). If the connection
+    to Redis drops, the listener resubscribes with exponential backoff, from
+    reconnect_delay up to max_reconnect_delay seconds. Deltas published while
+    it was away are lost, and the next change to a class sends fresh absolute
+    counts.
+    """
+
+    channel_prefix = 'ninjadtao:availability:'
+    reconnect_delay = 0.5
+    max_reconnect_delay = 30.0
+
+    def __init__(self):
+        import redis
+
+        self.client = redis.Redis.from_url(getattr(settings, 'AVAILABILITY_BROKER_URL', 'redis://127.0.0.1:6379'))
+        self._connection_errors = (redis.RedisError, OSError)
+        self._listener = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        if self._listener is not None:
+            return
+        with self._start_lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='availability-broker', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        delay = self.reconnect_delay
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.psubscribe(self.channel_prefix + '*')
+                delay = self.reconnect_delay
+                for item in pubsub.listen():
+                    self._relay(item)
+            except self._connection_errors:
+                logger.warning("Lost the availability broker connection; retrying in %.1fs", delay, exc_info=True)
+            finally:
+                try:
+                    pubsub.close()
+                except self._connection_errors:
+                    pass
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _relay(self, item):
+        try:
+            day = item['channel'].decode()[len(self.channel_prefix):]
+            message = json.loads(item['data'])
+        except (KeyError, AttributeError, ValueError):
+            logger.warning("Ignoring malformed availability message: %r", item)
+            return
+        deliver(day, message)
+
+    def listening(self):
+        # Subscribers may be connected to any worker.
+        return True
+
+    def publish(self, day, message):
+        self.client.publish(self.channel_prefix + day, json.dumps(message))
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(getattr(settings, 'AVAILABILITY_BROKER', 'userAPI.availability.LocalBroker'))()
+    return _broker
+
+
+def reset_broker():
+    global _broker
+    _broker = None
+
+
+# ----------------------------
+# Publishing
+# ----------------------------
+def publish_class(class_id):
+    """Publish a class's current seat counts to its day's subscribers. Run after commit."""
+    broker = get_broker()
+    if not broker.listening():
+        return
+    row = Classes.objects.filter(pk=class_id).values('classId', 'class_date', 'capacity', 'seats_booked').first()
+    if row is None:
+        return
+    message = {
+        "classId": row['classId'],
+        "seats_booked": row['seats_booked'],
+        "seats_left": max(row['capacity'] - row['seats_booked'], 0),
+    }
+    try:
+        broker.publish(row['class_date'].isoformat(), message)
+    except Exception:
+        # Live updates are best effort. A broker outage must not fail the booking that committed.
+        logger.exception("Could not publish availability for class %s", class_id)
@@ -15,9 +15,16 @@ class EmailBackend(ModelBackend):
         try:
             user = UserModel.objects.get(email=email)
         except UserModel.DoesNotExist:
+            # Hash anyway, so an unknown email takes as long as a wrong password.
+            UserModel().set_password(password)
             return None
 
-        # check_password is built into AbstractBaseUser
+        if not user.has_usable_password():
+            UserModel().set_password(password)
+            return None
+
+        # check_password is built into AbstractBaseUser; it also re-hashes the
+        # password when the hasher or its cost changed (see userAPI.hashers)
         if user.check_password(password) and self.user_can_authenticate(user):
             return user
         return None
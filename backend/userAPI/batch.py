@@ -0,0 +1,181 @@
+"""
+Several userAPI calls in one round trip (views.BatchView, asyncviews.AsyncBatchView).
+
+    POST /api/v1.0/user/batch/
+    {"requests": [
+        {"id": "profile", "method": "POST", "path": "/api/v1.0/user/auth/"},
+        {"id": "today", "method": "GET", "path": "/api/v1.0/user/classes/?date=2026-01-05",
+         "headers": {"If-None-Match": "\"...\""}}
+    ]}
+
+The batch is authenticated once. Each sub-request runs in-process as that
+user, on the same database connection, and skips the middleware stack. The
+answer holds one {"id", "status", "headers", "body"} per sub-request, in
+request order. A failing sub-request does not stop the others. Each one
+commits on its own, exactly as it would when sent alone.
+
+Sub-requests run in order, except that consecutive reads run concurrently on
+the ASGI app. A read is a GET or HEAD, or a method the view lists in
+`read_only_methods`.
+"""
+
+import json
+import logging
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import Resolver404, resolve
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "/api/v1.0/user/"
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE"}
+# Credentials come from the batch itself.
+FORBIDDEN_HEADERS = {"authorization", "cookie"}
+# Parent request headers that describe the client rather than the call.
+INHERITED_HEADERS = {"HTTP_HOST", "HTTP_USER_AGENT", "HTTP_X_FORWARDED_FOR", "HTTP_X_FORWARDED_HOST", "HTTP_X_FORWARDED_PROTO"}
+# Response headers that only make sense on a real HTTP response.
+DROPPED_HEADERS = {"Allow", "Content-Length", "Content-Type", "Vary"}
+
+
+def parse(data):
+    """The validated sub-requests in a batch body. Raises ValueError with a message for the client."""
+    requests = data.get("requests") if isinstance(data, dict) else None
+    limit = getattr(settings, 'BATCH_MAX_REQUESTS', 10)
+    if not isinstance(requests, list) or not requests:
+        raise ValueError("requests must be a non-empty list.")
+    if len(requests) > limit:
+        raise ValueError(f"A batch holds at most {limit} requests.")
+
+    specs = []
+    for index, item in enumerate(requests):
+        if not isinstance(item, dict):
+            raise ValueError(f"requests[{index}] must be an object.")
+        method = str(item.get("method", "GET")).upper()
+        path = item.get("path")
+        headers = item.get("headers") or {}
+        if method not in METHODS:
+            raise ValueError(f"requests[{index}].method must be one of {sorted(METHODS)}.")
+        if not isinstance(path, str) or not path.startswith(PREFIX):
+            raise ValueError(f"requests[{index}].path must start with {PREFIX}.")
+        if not isinstance(headers, dict) or not all(isinstance(v, str) for v in headers.values()):
+            raise ValueError(f"requests[{index}].headers must map names to strings.")
+        if FORBIDDEN_HEADERS & {name.lower() for name in headers}:
+            raise ValueError(f"requests[{index}] may not set Authorization or Cookie; the batch's own are used.")
+        specs.append({
+            "id": item.get("id", index),
+            "method": method,
+            "path": path,
+            "headers": headers,
+            "body": item.get("body"),
+        })
+    return specs
+
+
+class Call:
+    """One sub-request, resolved and ready to run as the batch's user."""
+
+    def __init__(self, parent, spec):
+        self.spec = spec
+        url = urlsplit(spec["path"])
+        self.request = self.build_request(parent, spec, url)
+        try:
+            self.match = resolve(url.path, getattr(parent._request, 'urlconf', None))
+        except Resolver404:
+            self.match = None
+        view_class = getattr(self.match.func, 'view_class', None) if self.match else None
+        if not (isinstance(view_class, type) and issubclass(view_class, APIView)
+                and getattr(view_class, 'batchable', True)):
+            self.match = view_class = None
+        self.is_async = bool(view_class and view_class.view_is_async)
+        self.read = spec["method"] in SAFE_METHODS or spec["method"] in getattr(view_class, 'read_only_methods', ())
+
+    @staticmethod
+    def build_request(parent, spec, url):
+        body = b"" if spec["body"] is None else json.dumps(spec["body"]).encode()
+        environ = {
+            key: value for key, value in parent.META.items()
+            if not key.startswith("HTTP_") or key in INHERITED_HEADERS
+        }
+        environ.update({
+            "REQUEST_METHOD": spec["method"],
+            "PATH_INFO": url.path,
+            "QUERY_STRING": url.query,
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": BytesIO(body),
+            "wsgi.url_scheme": parent.scheme,
+        })
+        for name, value in spec["headers"].items():
+            environ["HTTP_" + name.upper().replace("-", "_")] = value
+        request = WSGIRequest(environ)
+        if parent.user.is_authenticated:
+            # DRF's forced authentication: the views see the batch's user and
+            # token without authenticating again. Anonymous batches carry no
+            # credentials, so their sub-requests answer 401 just as they would alone.
+            request._force_auth_user = parent.user
+            request._force_auth_token = parent.auth
+        urlconf = getattr(parent._request, 'urlconf', None)
+        if urlconf is not None:
+            request.urlconf = urlconf
+        return request
+
+    def run(self):
+        if self.match is None:
+            return self.not_found()
+        try:
+            return self.result(self.match.func(self.request, *self.match.args, **self.match.kwargs))
+        except Exception:
+            return self.failed()
+
+    async def arun(self):
+        if self.match is None:
+            return self.not_found()
+        view = self.match.func if self.is_async else sync_to_async(self.match.func)
+        try:
+            return self.result(await view(self.request, *self.match.args, **self.match.kwargs))
+        except Exception:
+            return self.failed()
+
+    def result(self, response):
+        if response.streaming:
+            response.close()
+            return self.answer(400, {"error": "Streaming responses can't be batched."})
+        if hasattr(response, 'data'):
+            body = response.data
+        elif response.get("Content-Type", "").startswith("application/json"):
+            body = json.loads(response.content or b"null")
+        else:
+            body = response.content.decode(response.charset)
+        headers = {name: value for name, value in response.items() if name not in DROPPED_HEADERS}
+        return self.answer(response.status_code, body, headers)
+
+    def not_found(self):
+        return self.answer(404, {"error": f"No batchable endpoint at {self.spec['path']}."})
+
+    def failed(self):
+        logger.exception("Batch sub-request %s %s failed", self.spec["method"], self.spec["path"])
+        return self.answer(500, {"error": "Internal server error."})
+
+    def answer(self, status, body, headers=None):
+        return {"id": self.spec["id"], "status": status, "headers": headers or {}, "body": body}
+
+
+def phases(calls):
+    """Split calls into runs that may go concurrently: consecutive reads together, each write alone."""
+    group = []
+    for call in calls:
+        if call.read:
+            group.append(call)
+            continue
+        if group:
+            yield group
+            group = []
+        yield [call]
+    if group:
+        yield group
@@ -0,0 +1,274 @@
+"""
+Helpers for the benchmark management commands.
+
+They drive the WSGI and ASGI applications in-process (no HTTP server), so the
+numbers measure Django + DRF + the database rather than the network stack.
+"""
+
+import asyncio
+import io
+import math
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlencode
+
+from django.db import connection
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize(latencies, elapsed, **extra):
+    """Throughput and latency percentiles (in ms) for one benchmark run."""
+    return {
+        **extra,
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+@contextmanager
+def scratch_database():
+    """Run against a throwaway copy of the schema (the test database), never db.sqlite3."""
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+# ----------------------------
+# WSGI
+# ----------------------------
+def wsgi_call(app, method, path, query=None, headers=None, body=b""):
+    return wsgi_request(app, method, path, query, headers, body)[0]
+
+
+def wsgi_request(app, method, path, query=None, headers=None, body=b""):
+    """One call through the WSGI app; returns (status, response headers, body)."""
+    environ = {
+        "REQUEST_METHOD": method,
+        "PATH_INFO": path,
+        "QUERY_STRING": urlencode(query or {}),
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "8000",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": io.StringIO(),
+        "wsgi.url_scheme": "http",
+        "wsgi.version": (1, 0),
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in (headers or {}).items():
+        environ["HTTP_" + name.upper().replace("-", "_")] = value
+
+    started = []
+    result = app(environ, lambda s, h, exc_info=None: started.append((int(s.split()[0]), dict(h))))
+    try:
+        content = b"".join(result)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    return started[0][0], started[0][1], content
+
+
+def server_timing_queries(headers):
+    """The query count RequestMetricsMiddleware put in the Server-Timing header, if any."""
+    match = re.search(r'desc="(\d+) queries"', headers.get("Server-Timing", ""))
+    return int(match.group(1)) if match else None
+
+
+def run_wsgi(app, request, total, concurrency):
+    """Send `total` requests through `concurrency` threads; request(app) performs one call."""
+    def timed(_):
+        started = time.perf_counter()
+        status = request(app)
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, range(total)))
+    return [r[0] for r in results], time.perf_counter() - started, [r[1] for r in results]
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """
+    Regressions of `results` against a stored `baseline` (both {endpoint: summary}).
+
+    p95 latency may grow and throughput may drop by `tolerance` (0.2 = 20%) before
+    it counts; any increase in queries per request counts.
+    """
+    regressions = []
+    for endpoint, base in baseline.items():
+        current = results.get(endpoint)
+        if current is None:
+            regressions.append({"endpoint": endpoint, "metric": "missing"})
+            continue
+        checks = (
+            ("p95_ms", current["p95_ms"] > base["p95_ms"] * (1 + tolerance)),
+            ("rps", current["rps"] < base["rps"] * (1 - tolerance)),
+            ("queries_per_request", (current.get("queries_per_request") or 0) > (base.get("queries_per_request") or 0)),
+        )
+        for metric, worse in checks:
+            if worse:
+                regressions.append({"endpoint": endpoint, "metric": metric, "baseline": base.get(metric), "current": current.get(metric)})
+    return regressions
+
+
+# ----------------------------
+# ASGI
+# ----------------------------
+def _asgi_scope(method, path, query=None, headers=None):
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": urlencode(query or {}).encode(),
+        "root_path": "",
+        "headers": [(b"host", b"localhost"), (b"content-type", b"application/json")]
+        + [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 8000),
+    }
+
+
+async def asgi_call(app, method, path, query=None, headers=None, body=b""):
+    scope = _asgi_scope(method, path, query, headers)
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()  # nothing more to send; wait to be cancelled
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+class ASGIStream:
+    """
+    A long-lived GET against an ASGI app, such as an event stream. Create it inside a running loop.
+
+    Body chunks are queued as they are sent. close() disconnects the client
+    and waits for the app to finish.
+    """
+
+    def __init__(self, app, path, query=None, headers=None):
+        self.status = None
+        self.chunks = asyncio.Queue()
+        self._requested = False
+        self._disconnect = asyncio.Event()
+        self.task = asyncio.ensure_future(app(_asgi_scope("GET", path, query, headers), self._receive, self._send))
+
+    async def _receive(self):
+        if not self._requested:
+            self._requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self._disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def _send(self, message):
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+        elif message.get("body"):
+            self.chunks.put_nowait(message["body"])
+
+    async def read(self, timeout=5):
+        return (await asyncio.wait_for(self.chunks.get(), timeout)).decode()
+
+    async def close(self):
+        self._disconnect.set()
+        await self.task
+
+
+async def run_asgi(app, request, total, concurrency):
+    """Send `total` requests with at most `concurrency` in flight; request(app) awaits one call."""
+    latencies, statuses = [], []
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            statuses.append(await request(app))
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - started, statuses
+
+
+# ----------------------------
+# SQLite write contention
+# ----------------------------
+def _contention_worker(class_id, writes, tuned):
+    # Runs in a forked child process, so it must open its own connection.
+    from django.conf import settings
+    from django.db import OperationalError, connections, transaction
+    from django.db.models import F
+
+    from .models import Classes
+
+    if not tuned:
+        settings.SQLITE_PRAGMAS = {}
+        connections['default'].settings_dict['OPTIONS'] = {}
+    connections.close_all()
+
+    ok = locked = 0
+    for _ in range(writes):
+        try:
+            # Read-then-write in one transaction: the pattern that makes deferred
+            # transactions deadlock when they try to upgrade to the write lock.
+            with transaction.atomic():
+                Classes.objects.filter(pk=class_id).values_list('seats_booked', flat=True).get()
+                Classes.objects.filter(pk=class_id).update(seats_booked=F('seats_booked') + 1)
+            ok += 1
+        except OperationalError as error:
+            if 'locked' not in str(error):
+                raise
+            locked += 1
+    connections.close_all()
+    return ok, locked
+
+
+def run_write_contention(class_id, processes, writes, tuned):
+    """Hammer one row from several processes; returns committed writes, lock errors and throughput."""
+    import multiprocessing
+
+    from django.db import connections
+
+    connections.close_all()
+    started = time.perf_counter()
+    with multiprocessing.get_context('fork').Pool(processes) as pool:
+        results = pool.starmap(_contention_worker, [(class_id, writes, tuned)] * processes)
+    elapsed = time.perf_counter() - started
+
+    ok = sum(r[0] for r in results)
+    return {
+        "profile": "tuned" if tuned else "default",
+        "processes": processes,
+        "committed": ok,
+        "lock_errors": sum(r[1] for r in results),
+        "writes_per_s": round(ok / elapsed, 1),
+    }
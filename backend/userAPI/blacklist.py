@@ -0,0 +1,117 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import BlacklistedToken
+
+
+# ----------------------------
+# Bloom filter
+# ----------------------------
+class BloomFilter:
+    """
+    Fixed-size set of strings that can answer "definitely not present" without storage lookups.
+
+    False positives happen at roughly `error_rate` once `capacity` items are added.
+    False negatives never happen.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing: two 64-bit halves of one digest give all k positions.
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+# ----------------------------
+# Blacklist
+# ----------------------------
+_filter = None
+_filter_built_at = 0.0
+_filter_lock = threading.Lock()
+
+
+def _local_filter():
+    """
+    The process-wide filter, built from the unexpired blacklist on first use.
+
+    It is rebuilt every TOKEN_BLACKLIST_FILTER_TTL seconds so pruned jtis drop
+    out and the false-positive rate stays near its target.
+    """
+    global _filter, _filter_built_at
+    ttl = getattr(settings, 'TOKEN_BLACKLIST_FILTER_TTL', 3600)
+    if _filter is not None and time.monotonic() - _filter_built_at < ttl:
+        return _filter
+
+    with _filter_lock:
+        if _filter is None or time.monotonic() - _filter_built_at >= ttl:
+            bloom = BloomFilter(
+                capacity=getattr(settings, 'TOKEN_BLACKLIST_FILTER_CAPACITY', 100_000),
+                error_rate=getattr(settings, 'TOKEN_BLACKLIST_FILTER_ERROR_RATE', 0.001),
+            )
+            live = BlacklistedToken.objects.filter(expires_at__gt=timezone.now())
+            for jti in live.values_list('jti', flat=True).iterator(chunk_size=5000):
+                bloom.add(jti)
+            _filter, _filter_built_at = bloom, time.monotonic()
+    return _filter
+
+
+def reset_filter():
+    global _filter
+    _filter = None
+
+
+def is_revoked(jti):
+    """
+    Fast check for tokens this process has seen revoked.
+
+    A filter miss answers without touching the database; a filter hit is
+    confirmed with one primary-key lookup. A token revoked by another worker
+    after this process built its filter can still pass here, so anything that
+    must be exact goes through revoke(), whose INSERT is the authoritative check.
+    """
+    if jti not in _local_filter():
+        return False
+    return BlacklistedToken.objects.filter(jti=jti).exists()
+
+
+def revoke(jti, expires_at):
+    """Blacklist a jti. Returns False if it was already blacklisted (e.g. a replayed refresh token)."""
+    _local_filter().add(jti)
+    try:
+        with transaction.atomic():
+            BlacklistedToken.objects.create(jti=jti, expires_at=expires_at)
+    except IntegrityError:
+        return False
+    return True
+
+
+def prune(batch_size=5000):
+    """Delete expired entries in batches and yield the running total removed."""
+    removed = 0
+    expired = BlacklistedToken.objects.filter(expires_at__lte=timezone.now())
+    while True:
+        jtis = list(expired.values_list('jti', flat=True)[:batch_size])
+        if not jtis:
+            break
+        BlacklistedToken.objects.filter(jti__in=jtis).delete()
+        removed += len(jtis)
+        yield removed
@@ -0,0 +1,26 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class ClassFull(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "This class is fully booked."
+    default_code = "class_full"
+
+
+class AlreadyBooked(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "You have already booked this class."
+    default_code = "already_booked"
+
+
+class TimeConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "You have already booked a class at this time."
+    default_code = "time_conflict"
+
+
+class OutOfCredits(APIException):
+    status_code = status.HTTP_402_PAYMENT_REQUIRED
+    default_detail = "You have no class credits left."
+    default_code = "out_of_credits"
@@ -0,0 +1,120 @@
+"""
+Streaming exports for reporting. Rows are read with .values_list().iterator(),
+so memory stays flat however many bookings there are, and each chunk of rows
+is written out as one piece of the response.
+"""
+
+import csv
+import io
+
+from . fastserializers import datetime_isoformat, isoformat
+from . models import BookedClasses, Membership, userModel
+from . renderers import ORJSONRenderer
+
+CHUNK_SIZE = 2000
+
+_membership = dict(Membership.choices)
+
+
+def _text(value):
+    return value
+
+
+def _label(value):
+    return _membership.get(value, value)
+
+
+# (column, lookup, converter)
+BOOKING_COLUMNS = [
+    ("booking_id", "id", _text),
+    ("booking_date", "booking_date", datetime_isoformat),
+    ("class_id", "clasId__classId", _text),
+    ("class_name", "clasId__class_name", _text),
+    ("class_date", "clasId__class_date", isoformat),
+    ("class_start_time", "clasId__class_start_time", isoformat),
+    ("class_end_time", "clasId__class_end_time", isoformat),
+    ("instructor_name", "clasId__instructor_name", _text),
+    ("member_id", "userId__id", _text),
+    ("member_email", "userId__email", _text),
+    ("member_first_name", "userId__first_name", _text),
+    ("member_last_name", "userId__last_name", _text),
+    ("membership", "userId__membershipName", _label),
+]
+
+MEMBER_COLUMNS = [
+    ("member_id", "id", _text),
+    ("email", "email", _text),
+    ("first_name", "first_name", _text),
+    ("last_name", "last_name", _text),
+    ("membership", "membershipName", _label),
+    ("start_date", "startDate", isoformat),
+    ("expiration_date", "expirationDate", isoformat),
+    ("is_active", "is_active", _text),
+    ("credit_balance", "credit_balance", _text),
+]
+
+
+def bookings(start=None, end=None, instructor=None):
+    """Bookings joined with their class and member, in class order. start/end filter on class_date."""
+    rows = BookedClasses.objects.order_by('clasId__class_date', 'clasId__class_start_time', 'id')
+    if start is not None:
+        rows = rows.filter(clasId__class_date__gte=start)
+    if end is not None:
+        rows = rows.filter(clasId__class_date__lte=end)
+    if instructor:
+        rows = rows.filter(clasId__instructor_name=instructor)
+    return rows, BOOKING_COLUMNS
+
+
+def members(membership=None, active=None):
+    rows = userModel.objects.order_by('id')
+    if membership is not None:
+        rows = rows.filter(membershipName=membership)
+    if active is not None:
+        rows = rows.filter(is_active=active)
+    return rows, MEMBER_COLUMNS
+
+
+def _records(queryset, columns, chunk_size):
+    converters = [convert for _, _, convert in columns]
+    rows = queryset.values_list(*[lookup for _, lookup, _ in columns]).iterator(chunk_size=chunk_size)
+    chunk = []
+    for row in rows:
+        chunk.append([convert(value) for convert, value in zip(converters, row)])
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _safe_cell(value):
+    # Spreadsheets run cells starting with these as formulas; member names are user input.
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@', '\t', '\r'):
+        return "'" + value
+    return value
+
+
+def stream_csv(queryset, columns, chunk_size=CHUNK_SIZE):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _, _ in columns])
+    yield buffer.getvalue()
+    for chunk in _records(queryset, columns, chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([[_safe_cell(value) for value in row] for row in chunk])
+        yield buffer.getvalue()
+
+
+def stream_ndjson(queryset, columns, chunk_size=CHUNK_SIZE):
+    names = [name for name, _, _ in columns]
+    render = ORJSONRenderer().render
+    for chunk in _records(queryset, columns, chunk_size):
+        yield b"".join(render(dict(zip(names, row))) + b"\n" for row in chunk)
+
+
+FORMATS = {
+    "csv": (stream_csv, "text/csv; charset=utf-8"),
+    "ndjson": (stream_ndjson, "application/x-ndjson"),
+}
@@ -0,0 +1,130 @@
+"""
+Opt-in fast path (settings.FAST_SERIALIZATION) for the list endpoints.
+
+Rows come straight from .values_list()/.values() and go through a mapper that
+is built once from itemgetters and converters, producing exactly the dicts
+(same keys, same order, same string formats) as the ModelSerializers in
+serializer.py.
+"""
+
+from operator import itemgetter
+
+from django.conf import settings
+from django.db.models import F, IntegerField, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+
+def enabled():
+    return getattr(settings, 'FAST_SERIALIZATION', False)
+
+
+# ----------------------------
+# Field converters (match DRF's to_representation)
+# ----------------------------
+def isoformat(value):
+    return None if value is None else value.isoformat()
+
+
+def datetime_isoformat(value):
+    # DateTimeField: convert to the current timezone, isoformat, "+00:00" -> "Z"
+    if value is None:
+        return None
+    if settings.USE_TZ and timezone.is_aware(value):
+        value = value.astimezone(timezone.get_current_timezone())
+    value = value.isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+class RowMapper:
+    """
+    Builds `map(row) -> dict` from a field spec.
+
+    fields is a list of (output name, lookup, converter or None); a list in place
+    of the lookup makes a nested dict. `lookups` is what to pass to
+    values_list() (or values() with by_name=True) for the rows.
+    """
+
+    def __init__(self, fields, by_name=False):
+        self.lookups = []
+        self._by_name = by_name
+        self.map = self._build(fields)
+
+    def _build(self, fields):
+        # One getter per output key: an itemgetter, a converter applied to the
+        # row's value, or the mapper of a nested dict.
+        names, getters = [], []
+        for name, source, convert in fields:
+            if isinstance(source, list):
+                getter = self._build(source)
+            else:
+                self.lookups.append(source)
+                key = source if self._by_name else len(self.lookups) - 1
+                getter = itemgetter(key) if convert is None else _converted(key, convert)
+            names.append(name)
+            getters.append(getter)
+
+        names, getters = tuple(names), tuple(getters)
+        return lambda row: dict(zip(names, [get(row) for get in getters]))
+
+
+def _converted(key, convert):
+    return lambda row: convert(row[key])
+
+
+# ----------------------------
+# Classes
+# ----------------------------
+# Same order as ClassSerializer: pk, declared fields, then model fields.
+class_mapper = RowMapper([
+    ('classId', 'classId', None),
+    ('seats_left', 'seats_left_value', None),
+    ('is_booked', 'is_booked', bool),
+    ('class_name', 'class_name', None),
+    ('class_description', 'class_description', None),
+    ('class_date', 'class_date', isoformat),
+    ('class_start_time', 'class_start_time', isoformat),
+    ('class_end_time', 'class_end_time', isoformat),
+    ('instructor_name', 'instructor_name', None),
+    ('capacity', 'capacity', None),
+    ('seats_booked', 'seats_booked', None),
+])
+
+
+def serialize_classes(classes):
+    """Same output as ClassSerializer(classes, many=True).data; classes must carry an is_booked annotation."""
+    classes = classes.annotate(
+        seats_left_value=Greatest(F('capacity') - F('seats_booked'), Value(0), output_field=IntegerField())
+    )
+    to_dict = class_mapper.map
+    return [to_dict(row) for row in classes.values_list(*class_mapper.lookups)]
+
+
+# ----------------------------
+# Bookings
+# ----------------------------
+# Same shape as BookingDetailSerializer. Uses .values() dicts because
+# CursorPagination reads booking_date from each row to build the cursor.
+booking_mapper = RowMapper([
+    ('id', 'id', None),
+    ('booking_date', 'booking_date', datetime_isoformat),
+    ('clasId', [
+        ('classId', 'clasId__classId', None),
+        ('class_name', 'clasId__class_name', None),
+        ('class_description', 'clasId__class_description', None),
+        ('class_date', 'clasId__class_date', isoformat),
+        ('class_start_time', 'clasId__class_start_time', isoformat),
+        ('class_end_time', 'clasId__class_end_time', isoformat),
+        ('instructor_name', 'clasId__instructor_name', None),
+    ], None),
+], by_name=True)
+
+
+def booking_values(bookings):
+    return bookings.values(*booking_mapper.lookups)
+
+
+def serialize_bookings(rows):
+    """Same output as BookingDetailSerializer(rows, many=True).data, for rows from booking_values()."""
+    to_dict = booking_mapper.map
+    return [to_dict(row) for row in rows]
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 whose cost comes from settings.PASSWORD_HASH_ITERATIONS.
+
+    It keeps the pbkdf2_sha256 algorithm name, so existing hashes still verify.
+    When the stored iteration count differs from the setting, must_update()
+    tells check_password to re-hash at the configured cost. That happens on
+    the user's next successful login.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
@@ -0,0 +1,159 @@
+"""
+Idempotency-Key support for write endpoints (Stripe-style).
+
+The first request with a key claims it by inserting an IdempotencyKey row, so
+concurrent requests with the same key cannot both win thanks to the unique
+(user, key) constraint. The winner runs the view and stores its response on
+that row in the same transaction as the view's own writes, so a booking is
+never committed without the response that replays it. A repeat of the key
+gets the stored response back from one indexed read and never reaches the
+booking tables. If the first request is still running, the repeat waits up to
+IDEMPOTENCY_WAIT seconds for it and then answers 409.
+
+4xx outcomes are stored like successes. 5xx and unexpected errors roll the
+view's writes back and release the key so the client can retry for real. A
+claim whose request died before releasing it (a crashed worker) lapses after
+IDEMPOTENCY_CLAIM_TIMEOUT seconds and the next retry takes it over; since the
+view's writes only commit together with the stored response, nothing was
+written under it. Stored keys live IDEMPOTENCY_KEY_TTL seconds; prune() clears
+them out.
+"""
+
+import functools
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, router, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str) if request.data else ""
+    return hashlib.sha256(f"{request.method}|{request.path}|{body}".encode()).hexdigest()
+
+
+def _replay(record):
+    data = json.loads(record.response_body) if record.response_body else None
+    return Response(data, status=record.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def _claim(user, key, fingerprint):
+    """Returns (record, None) when this request owns the key, or (None, response) to send instead."""
+    keys = IdempotencyKey.objects.using(router.db_for_write(IdempotencyKey))  # never a lagging replica
+    deadline = time.monotonic() + getattr(settings, 'IDEMPOTENCY_WAIT', 5.0)
+    while True:
+        now = timezone.now()
+        record = keys.filter(user_id=user.pk, key=key).first()
+        if record is not None and record.expires_at <= now:
+            keys.filter(pk=record.pk, expires_at__lte=now).delete()
+            record = None
+
+        if record is None:
+            try:
+                with transaction.atomic(using=keys.db):
+                    return keys.create(
+                        user_id=user.pk, key=key, request_hash=fingerprint,
+                        expires_at=now + timedelta(seconds=getattr(settings, 'IDEMPOTENCY_CLAIM_TIMEOUT', 30)),
+                    ), None
+            except IntegrityError:
+                continue  # another request claimed it first; read what it stored
+
+        if record.request_hash != fingerprint:
+            return None, Response(
+                {"error": f"This {HEADER} was already used for a different request."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        if record.status_code is not None:
+            return None, _replay(record)
+        if time.monotonic() >= deadline:
+            return None, Response(
+                {"error": f"A request with this {HEADER} is still being processed."},
+                status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'},
+            )
+        time.sleep(0.05)
+
+
+class _Release(Exception):
+    """Rolls the view's writes back and gives the key up; carries the response to send."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+class _ClaimLost(Exception):
+    pass
+
+
+def idempotent(handler):
+    """Decorator for APIView handlers: honour an Idempotency-Key header from authenticated members."""
+
+    @functools.wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None or not request.user.is_authenticated:
+            return handler(view, request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"error": f"{HEADER} must be 1-{MAX_KEY_LENGTH} characters."}, status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        record, response = _claim(request.user, key, _fingerprint(request))
+        if response is not None:
+            return response
+
+        keys = IdempotencyKey.objects.using(record._state.db)
+        try:
+            with transaction.atomic(using=keys.db):
+                try:
+                    with transaction.atomic(using=keys.db):
+                        response = handler(view, request, *args, **kwargs)
+                except APIException as exc:
+                    response = view.handle_exception(exc)  # a 4xx outcome is part of the stored result
+                if response.status_code >= 500:
+                    raise _Release(response)
+                stored = keys.filter(pk=record.pk, status_code__isnull=True).update(
+                    status_code=response.status_code,
+                    response_body=json.dumps(response.data) if response.data is not None else "",
+                    expires_at=timezone.now() + timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 86400)),
+                )
+                if not stored:
+                    # Our claim lapsed and a retry took the key over; let that one's outcome stand.
+                    raise _ClaimLost()
+        except _Release as release:
+            record.delete()
+            return release.response
+        except _ClaimLost:
+            return Response(
+                {"error": f"A request with this {HEADER} is still being processed."},
+                status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'},
+            )
+        except Exception:
+            record.delete()
+            raise
+        return response
+
+    return wrapper
+
+
+def prune(batch_size=5000):
+    """Delete expired keys in batches and yield the running total removed."""
+    removed = 0
+    expired = IdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+    while True:
+        ids = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        IdempotencyKey.objects.filter(pk__in=ids).delete()
+        removed += len(ids)
+        yield removed
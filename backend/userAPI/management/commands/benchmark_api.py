@@ -0,0 +1,141 @@
+import json
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+from django.db.models import F
+from django.utils import timezone
+
+from userAPI.bench import compare_to_baseline, run_wsgi, scratch_database, server_timing_queries, summarize, wsgi_request
+from userAPI.models import MEMBERSHIP_CREDITS, Classes, userModel
+from userAPI.serializer import EmailTokenObtainPairSerializer
+
+from .seed_load_data import EMAIL_DOMAIN
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test login, token refresh, /classes/, /auth/ and booking through the WSGI app. By default "
+        "it seeds a scratch database with seed_load_data; --existing runs against an already seeded "
+        "database. Prints (and with --output writes) JSON with throughput, p50/p95/p99 and queries per "
+        "request; --baseline compares against a stored run and exits non-zero on regressions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Requests per endpoint.")
+        parser.add_argument('--login-requests', type=int, default=50,
+                            help="Requests for login, which is dominated by password hashing.")
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--users', type=int, default=2_000, help="Scratch seed size.")
+        parser.add_argument('--days', type=int, default=120, help="Scratch seed size.")
+        parser.add_argument('--bookings', type=int, default=100_000, help="Scratch seed size.")
+        parser.add_argument('--password', default="load-test-password")
+        parser.add_argument('--existing', action='store_true', help="Use the configured database as seeded.")
+        parser.add_argument('--output', help="Write the results JSON here (e.g. a new baseline).")
+        parser.add_argument('--baseline', help="Results JSON from an earlier run to compare against.")
+        parser.add_argument('--tolerance', type=float, default=0.2)
+
+    def handle(self, *args, **options):
+        settings.DEBUG = False
+        if options['existing']:
+            results = self.run(options)
+        else:
+            with scratch_database():
+                call_command(
+                    'seed_load_data', users=options['users'], days=options['days'], bookings=options['bookings'],
+                    password=options['password'], stdout=self.stderr,
+                )
+                results = self.run(options)
+
+        report = {
+            "meta": {
+                "requests": options['requests'], "concurrency": options['concurrency'],
+                "database": settings.DATABASES['default']['ENGINE'], "at": timezone.now().isoformat(),
+            },
+            "results": results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as out:
+                json.dump(report, out, indent=2)
+        self.stdout.write(json.dumps(report))
+
+        if options['baseline']:
+            with open(options['baseline']) as stored:
+                regressions = compare_to_baseline(results, json.load(stored)["results"], options['tolerance'])
+            self.stdout.write(json.dumps({"regressions": regressions}))
+            if regressions:
+                raise CommandError(f"{len(regressions)} regressions against {options['baseline']}")
+
+    def run(self, options):
+        rng = random.Random(1)
+        total, concurrency = options['requests'], options['concurrency']
+        members = list(
+            userModel.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}")
+            .exclude(membershipName__in=list(MEMBERSHIP_CREDITS))  # credit members could run out mid-run
+            .order_by('pk')[:total]
+        )
+        if len(members) < total:
+            raise CommandError(f"Need at least {total} seeded members without credit memberships.")
+
+        today = timezone.localdate()
+        tokens = [EmailTokenObtainPairSerializer.get_token(user) for user in members]
+        access = [str(token.access_token) for token in tokens]
+        refresh = iter([str(token) for token in tokens])  # each refresh token is rotated away after one use
+        # One roomy class per run so every booking succeeds, by a member who hasn't booked it.
+        klass = Classes.objects.filter(class_date__gt=today).order_by('class_date', 'pk').first()
+        Classes.objects.filter(pk=klass.pk).update(capacity=F('seats_booked') + total)
+        already_booked = set(klass.booked_users.values_list('userId_id', flat=True))
+        bookers = [access[i] for i, user in enumerate(members) if user.pk not in already_booked]
+
+        def week():
+            start = today + timedelta(days=rng.randint(-30, 30))
+            return {"start": start.isoformat(), "end": (start + timedelta(days=6)).isoformat()}
+
+        def bearer():
+            return {"Authorization": f"Bearer {rng.choice(access)}"}
+
+        scenarios = {
+            "login": (options['login_requests'], lambda: (
+                "POST", "/api/token/", None, {},
+                json.dumps({"email": rng.choice(members).email, "password": options['password']}),
+            )),
+            "token_refresh": (total, lambda: (
+                "POST", "/api/token/refresh/", None, {}, json.dumps({"refresh": next(refresh)}),
+            )),
+            "classes": (total, lambda: ("GET", "/api/v1.0/user/classes/", week(), bearer(), "")),
+            "auth": (total, lambda: ("POST", "/api/v1.0/user/auth/", None, bearer(), "")),
+            "book": (len(bookers), lambda: (
+                "POST", "/api/v1.0/user/book/", None, {"Authorization": f"Bearer {bookers.pop()}"},
+                json.dumps({"clasId": klass.pk}),
+            )),
+        }
+
+        app = get_wsgi_application()
+        results = {}
+        # Measure what a login costs, not how soon the login throttles start answering 429.
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}):
+            for name, (count, make_request) in scenarios.items():
+                results[name] = self.run_scenario(app, name, count, make_request, concurrency)
+        return results
+
+    def run_scenario(self, app, name, count, make_request, concurrency):
+        calls = [make_request() for _ in range(count)]  # built up front so the timing is just the request
+
+        def request(app, calls=iter(calls)):
+            method, path, query, headers, body = next(calls)
+            status, response_headers, _ = wsgi_request(app, method, path, query, headers, body.encode())
+            return status, server_timing_queries(response_headers)
+
+        latencies, elapsed, outcomes = run_wsgi(app, request, count, concurrency)
+        queries = [q for _, q in outcomes if q is not None]
+        result = summarize(
+            latencies, elapsed,
+            errors=sum(1 for status, _ in outcomes if status >= 400),
+            queries_per_request=round(sum(queries) / len(queries), 2) if queries else None,
+        )
+        self.stderr.write(f"{name}: {json.dumps(result)}")
+        return result
@@ -0,0 +1,71 @@
+import asyncio
+import json
+from datetime import date, time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+
+from userAPI.bench import asgi_call, run_asgi, run_wsgi, scratch_database, summarize, wsgi_call
+from userAPI.models import Classes, userModel
+from userAPI.serializer import EmailTokenObtainPairSerializer
+from userAPI.services import book_class
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync WSGI app with the async ASGI app on /classes/ and /auth/ at rising "
+        "concurrency. Runs on a scratch database and prints one JSON object per run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 64])
+        parser.add_argument('--requests', type=int, default=500, help="Requests per run.")
+        parser.add_argument('--classes', type=int, default=30, help="Classes on the benchmarked day.")
+
+    def handle(self, *args, **options):
+        settings.DEBUG = False  # don't let per-query logging skew the numbers
+        with scratch_database():
+            access = self.seed(options['classes'])
+            from NinjadtaoApp.asgi import application as asgi_app
+            wsgi_app = get_wsgi_application()
+
+            endpoints = {
+                "classes": ("GET", "/api/v1.0/user/classes/", {"date": "2026-01-05"}),
+                "auth": ("POST", "/api/v1.0/user/auth/", None),
+            }
+            headers = {"Authorization": f"Bearer {access}"}
+
+            for name, (method, path, query) in endpoints.items():
+                for concurrency in options['concurrency']:
+                    latencies, elapsed, statuses = run_wsgi(
+                        wsgi_app, lambda app: wsgi_call(app, method, path, query, headers),
+                        options['requests'], concurrency,
+                    )
+                    self.report(latencies, elapsed, statuses, "wsgi", name, concurrency)
+
+                    latencies, elapsed, statuses = asyncio.run(run_asgi(
+                        asgi_app, lambda app: asgi_call(app, method, path, query, headers),
+                        options['requests'], concurrency,
+                    ))
+                    self.report(latencies, elapsed, statuses, "asgi", name, concurrency)
+
+    def seed(self, class_count):
+        user = userModel.objects.create_user(
+            email="bench@example.com", password=None, first_name="Bench", last_name="User"
+        )
+        day = date(2026, 1, 5)
+        for i in range(class_count):
+            start = time(6 + i % 15, 30 * (i % 2))
+            klass = Classes.objects.create(
+                class_name=f"Class {i}", class_description="Benchmark class",
+                class_date=day + timedelta(days=i % 3), class_start_time=start, instructor_name="Kru Bench",
+            )
+            if i % 2:
+                book_class(user, klass.pk)
+        return str(EmailTokenObtainPairSerializer.get_token(user).access_token)
+
+    def report(self, latencies, elapsed, statuses, mode, endpoint, concurrency):
+        errors = sum(1 for s in statuses if s >= 400)
+        row = summarize(latencies, elapsed, mode=mode, endpoint=endpoint, concurrency=concurrency, errors=errors)
+        self.stdout.write(json.dumps(row))
@@ -0,0 +1,78 @@
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+
+from userAPI.bench import scratch_database, wsgi_request
+from userAPI.models import userModel
+
+
+class Command(BaseCommand):
+    help = (
+        "Logins per core per second on /api/token/, single-threaded, for the old profile (Django's "
+        "default PBKDF2 cost, no login throttles) and the new one (--iterations, throttles on). Covers "
+        "valid logins, a wrong-password burst on one account, and unknown emails. Runs on a scratch "
+        "database and prints one JSON object per profile and scenario."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=40, help="Attempts per scenario.")
+        parser.add_argument('--iterations', type=int, default=600_000,
+                            help="PBKDF2 iterations for the tuned profile.")
+
+    def handle(self, *args, **options):
+        settings.DEBUG = False
+        profiles = {
+            "before": {'PASSWORD_HASH_ITERATIONS': PBKDF2PasswordHasher.iterations, 'DEFAULT_THROTTLE_RATES': {}},
+            "after": {
+                'PASSWORD_HASH_ITERATIONS': options['iterations'],
+                'DEFAULT_THROTTLE_RATES': settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {}),
+            },
+        }
+        attempts = options['attempts']
+        with scratch_database():
+            app = get_wsgi_application()
+            for profile, config in profiles.items():
+                rest_framework = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': config['DEFAULT_THROTTLE_RATES']}
+                with override_settings(
+                    PASSWORD_HASH_ITERATIONS=config['PASSWORD_HASH_ITERATIONS'], REST_FRAMEWORK=rest_framework,
+                ):
+                    userModel.objects.filter(email__endswith="@bench.test").delete()
+                    users = [
+                        userModel.objects.create_user(
+                            email=f"member{i}@bench.test", password="bench-password", first_name="Bench", last_name="User",
+                        )
+                        for i in range(attempts)
+                    ]
+                    scenarios = {
+                        "valid": [(user.email, "bench-password") for user in users],
+                        "wrong_password_burst": [(users[0].email, "guess") for _ in range(attempts)],
+                        "unknown_email": [(f"nobody{i}@bench.test", "guess") for i in range(attempts)],
+                    }
+                    for scenario, logins in scenarios.items():
+                        cache.clear()  # fresh throttle windows for each scenario
+                        self.stdout.write(json.dumps(self.measure(app, profile, config, scenario, logins)))
+
+    def measure(self, app, profile, config, scenario, logins):
+        statuses = []
+        cpu, wall = time.process_time(), time.perf_counter()
+        for email, password in logins:
+            body = json.dumps({"email": email, "password": password}).encode()
+            statuses.append(wsgi_request(app, "POST", "/api/token/", body=body)[0])
+        cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+        return {
+            "profile": profile,
+            "scenario": scenario,
+            "iterations": config['PASSWORD_HASH_ITERATIONS'],
+            "attempts": len(logins),
+            "ok": statuses.count(200),
+            "rejected": statuses.count(401) + statuses.count(400),
+            "throttled": statuses.count(429),
+            "per_core_per_s": round(len(logins) / cpu, 1) if cpu else None,
+            "avg_ms": round(wall / len(logins) * 1000, 2),
+        }
@@ -0,0 +1,92 @@
+import json
+import time as clock
+from datetime import date, time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from userAPI import search
+from userAPI.bench import scratch_database
+from userAPI.models import Classes
+
+DISCIPLINES = ["Muay Thai", "Boxing", "Brazilian Jiu Jitsu", "Wrestling", "Kickboxing", "Yoga", "Strength", "Mobility"]
+LEVELS = ["fundamentals", "intermediate", "advanced", "open mat", "sparring", "conditioning"]
+# 200 instructors; no name is a substring of another word, so prefix and substring matching agree.
+INSTRUCTORS = [
+    f"{first} {last}"
+    for first in ["Anong", "Bao", "Chai", "Dara", "Eero", "Femi", "Goran", "Hiro", "Ines", "Jorge",
+                  "Kofi", "Lena", "Mateo", "Nia", "Oskar", "Priya", "Quinn", "Rafa", "Sven", "Tariq"]
+    for last in ["Adeyemi", "Brennan", "Castillo", "Dvorak", "Eriksen", "Fujita", "Gallo", "Haddad", "Ivanova", "Jensen"]
+]
+
+# (q, instructor, days from the first class date or None for no end). Common words,
+# a single instructor, the "discipline + instructor + month" case and a miss.
+QUERIES = [
+    ("muay thai", "", None),
+    ("wrestling open mat", "", None),
+    ("", "priya haddad", None),
+    ("jiu jitsu", "priya haddad", 30),
+    ("capoeira", "", None),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time /classes/search/ queries on the full-text index against icontains scans. Seeds a "
+        "scratch database, checks that both return the same classes and prints one JSON object per query."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--classes', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=5, help="Best of this many runs is reported.")
+
+    def handle(self, *args, **options):
+        settings.DEBUG = False
+        limit = getattr(settings, 'SEARCH_MAX_RESULTS', 100)
+        with scratch_database():
+            if search.backend(connection.alias) is None:
+                raise CommandError(f"No full-text index on {connection.vendor}; nothing to compare.")
+            seconds = self.seed(options['classes'])
+            self.stdout.write(json.dumps({"classes": options['classes'], "seed_seconds": round(seconds, 2)}))
+
+            first_day = date(2026, 1, 5)
+            for text, instructor, days in QUERIES:
+                end = first_day + timedelta(days=days) if days is not None else None
+
+                def run(scan):
+                    classes = search.search_classes(text, instructor, first_day, end, scan=scan)
+                    return list(classes.values_list('pk', flat=True)[:limit])
+
+                if run(False) != run(True):
+                    raise CommandError(f"q={text!r} instructor={instructor!r}: index and scan disagree")
+                matches = search.search_classes(text, instructor, first_day, end).count()
+                fts_ms, scan_ms = self.best(lambda: run(False), options['repeat']), self.best(lambda: run(True), options['repeat'])
+                self.stdout.write(json.dumps({
+                    "q": text, "instructor": instructor, "days": days, "matches": matches,
+                    "fts_ms": round(fts_ms, 2), "scan_ms": round(scan_ms, 2), "speedup": round(scan_ms / fts_ms, 1),
+                }))
+
+    def seed(self, count):
+        # Goes through the triggers, so this also times keeping the index up to date.
+        started = clock.perf_counter()
+        day = date(2026, 1, 5)
+        Classes.objects.bulk_create([
+            Classes(
+                class_name=DISCIPLINES[i % len(DISCIPLINES)],
+                class_description=f"{LEVELS[i // 7 % len(LEVELS)].capitalize()} session, all gear provided",
+                class_date=day + timedelta(days=i // 24), class_start_time=time(6 + i % 12),
+                class_end_time=time(7 + i % 12), instructor_name=INSTRUCTORS[i * 7 % len(INSTRUCTORS)],
+            )
+            for i in range(count)
+        ], batch_size=1000)
+        return clock.perf_counter() - started
+
+    @staticmethod
+    def best(run, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = clock.perf_counter()
+            run()
+            timings.append((clock.perf_counter() - started) * 1000)
+        return min(timings)
@@ -0,0 +1,86 @@
+import json
+import time as clock
+from datetime import date, time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from userAPI import fastserializers
+from userAPI.bench import scratch_database
+from userAPI.models import BookedClasses, Classes, userModel
+from userAPI.renderers import ORJSONRenderer
+from userAPI.serializer import BookingDetailSerializer, ClassSerializer
+from userAPI.services import with_availability
+
+
+class Command(BaseCommand):
+    help = (
+        "Time ModelSerializer + JSONRenderer against the fast path (userAPI.fastserializers + "
+        "ORJSONRenderer) for the class list and booking list, query included. Runs on a scratch "
+        "database, checks both produce identical bytes and prints one JSON object per size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[100, 1_000, 10_000])
+        parser.add_argument('--repeat', type=int, default=5, help="Best of this many runs is reported.")
+
+    def handle(self, *args, **options):
+        settings.DEBUG = False
+        with scratch_database():
+            user = self.seed(max(options['rows']))
+            classes = with_availability(Classes.objects.order_by('class_date', 'class_start_time'), user)
+            bookings = BookedClasses.objects.filter(userId_id=user.pk).order_by('-booking_date')
+
+            for rows in options['rows']:
+                cases = {
+                    "classes": (
+                        lambda: JSONRenderer().render(ClassSerializer(classes[:rows], many=True).data),
+                        lambda: ORJSONRenderer().render(fastserializers.serialize_classes(classes[:rows])),
+                    ),
+                    "bookings": (
+                        lambda: JSONRenderer().render(
+                            BookingDetailSerializer(bookings.select_related('clasId')[:rows], many=True).data
+                        ),
+                        lambda: ORJSONRenderer().render(
+                            fastserializers.serialize_bookings(fastserializers.booking_values(bookings)[:rows])
+                        ),
+                    ),
+                }
+                for name, (drf, fast) in cases.items():
+                    if drf() != fast():
+                        raise CommandError(f"{name}: fast path output differs at {rows} rows")
+                    drf_ms, fast_ms = self.best(drf, options['repeat']), self.best(fast, options['repeat'])
+                    self.stdout.write(json.dumps({
+                        "endpoint": name, "rows": rows,
+                        "drf_ms": round(drf_ms, 2), "fast_ms": round(fast_ms, 2),
+                        "speedup": round(drf_ms / fast_ms, 1),
+                    }))
+
+    def seed(self, count):
+        user = userModel.objects.create_user(
+            email="bench@example.com", password=None, first_name="Bench", last_name="User"
+        )
+        day = date(2026, 1, 5)
+        Classes.objects.bulk_create([
+            Classes(
+                class_name=f"Class {i}", class_description="Benchmark class — all levels",
+                class_date=day + timedelta(days=i // 12), class_start_time=time(6 + i % 12),
+                class_end_time=time(7 + i % 12), instructor_name="Kru Bench", seats_booked=i % 21,
+            )
+            for i in range(count)
+        ], batch_size=1000)
+        BookedClasses.objects.bulk_create([
+            BookedClasses(userId=user, clasId_id=class_id)
+            for class_id in Classes.objects.values_list('pk', flat=True)
+        ], batch_size=1000)
+        return user
+
+    @staticmethod
+    def best(run, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = clock.perf_counter()
+            run()
+            timings.append((clock.perf_counter() - started) * 1000)
+        return min(timings)
@@ -0,0 +1,32 @@
+import json
+from datetime import date, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from userAPI.bench import run_write_contention, scratch_database
+from userAPI.models import Classes
+
+
+class Command(BaseCommand):
+    help = (
+        "Multi-process write contention on one row, with Django's default SQLite settings and with "
+        "the SQLITE_PRAGMAS / IMMEDIATE-transaction profile. Runs on a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8)
+        parser.add_argument('--writes', type=int, default=200, help="Transactions per process.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("This benchmark only applies to SQLite.")
+
+        with scratch_database():
+            klass = Classes.objects.create(
+                class_name="Contention", class_description="", class_date=date(2026, 1, 5), class_start_time=time(12, 0),
+                instructor_name="Kru Bench", capacity=10**9,
+            )
+            for tuned in (False, True):
+                result = run_write_contention(klass.pk, options['processes'], options['writes'], tuned)
+                self.stdout.write(json.dumps(result))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from userAPI.services import booking_conflicts
+
+
+def _describe(row):
+    return (f"{row['clasId__class_name']} {row['clasId__class_start_time']:%H:%M}-{row['ends']:%H:%M} "
+            f"(booking {row['pk']})")
+
+
+class Command(BaseCommand):
+    help = "List members' bookings whose classes overlap in time, found in one pass over the bookings table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help="Rows fetched per round trip while scanning (default 2000).")
+
+    def handle(self, *args, **options):
+        found = 0
+        for first, second in booking_conflicts(chunk_size=options['chunk_size']):
+            found += 1
+            self.stdout.write(
+                f"{first['userId__email']} on {first['clasId__class_date']}: "
+                f"{_describe(first)} overlaps {_describe(second)}"
+            )
+
+        if found:
+            self.stdout.write(self.style.WARNING(
+                f"{found} overlapping pairs. Cancel one booking of each pair to clear them."
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS("No overlapping bookings."))
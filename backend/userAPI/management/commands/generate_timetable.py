@@ -0,0 +1,32 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from userAPI.models import ClassTemplate
+from userAPI.services import generate_timetable
+
+
+class Command(BaseCommand):
+    help = (
+        "Create dated classes from the active weekly ClassTemplates. Safe to re-run: dates a "
+        "template already has are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help="YYYY-MM-DD. Defaults to today.")
+        parser.add_argument('--end', type=date.fromisoformat, help="YYYY-MM-DD, inclusive. Defaults to 13 weeks from start.")
+        parser.add_argument('--template', type=int, action='append',
+                            help="Only this template id (repeatable). Defaults to every active template.")
+
+    def handle(self, *args, **options):
+        start = options['start'] or timezone.localdate()
+        end = options['end'] or start + timedelta(weeks=13, days=-1)
+        if end < start:
+            raise CommandError("--end must not be before --start.")
+
+        templates = None
+        if options['template']:
+            templates = ClassTemplate.objects.filter(pk__in=options['template'])
+        created = generate_timetable(start, end, templates)
+        self.stdout.write(self.style.SUCCESS(f"{created} classes created from {start} to {end}."))
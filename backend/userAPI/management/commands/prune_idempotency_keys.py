@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from userAPI.idempotency import prune
+
+
+class Command(BaseCommand):
+    help = "Delete Idempotency-Key records whose TTL has passed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        removed = 0
+        for removed in prune(batch_size=options['batch_size']):
+            self.stdout.write(f"Pruned {removed} expired keys...")
+        self.stdout.write(self.style.SUCCESS(f"Done. {removed} expired keys removed."))
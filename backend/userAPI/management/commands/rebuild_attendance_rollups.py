@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from userAPI.services import rebuild_attendance_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the weekly instructor and time-slot attendance rollups from the classes and bookings "
+        "tables, a chunk of weeks per transaction. Run once after migrating, and after bulk loads or "
+        "queryset updates that bypass the model signals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First class date to recount (YYYY-MM-DD). Default: the earliest class.")
+        parser.add_argument('--end', help="Last class date to recount (YYYY-MM-DD). Default: the latest class.")
+        parser.add_argument('--weeks-per-chunk', type=int, default=8,
+                            help="Weeks recounted per transaction (default 8).")
+
+    def handle(self, *args, **options):
+        dates = {}
+        for name in ('start', 'end'):
+            value = options[name]
+            try:
+                dates[name] = parse_date(value) if value else None
+            except ValueError:
+                dates[name] = None
+            if value and dates[name] is None:
+                raise CommandError(f"--{name} must be a date (YYYY-MM-DD).")
+        if options['weeks_per_chunk'] < 1:
+            raise CommandError("--weeks-per-chunk must be at least 1.")
+
+        chunks = 0
+        for first, last in rebuild_attendance_rollups(weeks_per_chunk=options['weeks_per_chunk'], **dates):
+            chunks += 1
+            self.stdout.write(f"Recounted {first} to {last}")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt attendance rollups in {chunks} chunks."))
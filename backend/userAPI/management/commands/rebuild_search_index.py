@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from userAPI import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Recreate the class search index (SQLite FTS5 table and triggers, or MySQL FULLTEXT) "
+        "and re-index every class from the classes table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if not search.rebuild(connection):
+            raise CommandError(
+                f"{connection.vendor} has no full-text index here; searches use icontains scans."
+            )
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the search index on '{connection.alias}'."))
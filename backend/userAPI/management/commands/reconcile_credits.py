@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from userAPI.services import credit_mismatches, reset_balances_from_ledger
+
+
+class Command(BaseCommand):
+    help = "Compare every member's credit_balance with their credit ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true',
+                            help="Rewrite balances from the ledger when they disagree.")
+
+    def handle(self, *args, **options):
+        mismatches = list(credit_mismatches())
+        for row in mismatches:
+            self.stdout.write(f"{row['email']}: balance {row['credit_balance']}, ledger {row['ledger_balance']}")
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("All credit balances match the ledger."))
+        elif options['fix']:
+            reset_balances_from_ledger()
+            self.stdout.write(self.style.SUCCESS(f"Fixed {len(mismatches)} balances."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(mismatches)} balances differ. Re-run with --fix to repair."))
@@ -0,0 +1,182 @@
+import random
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from userAPI.models import (
+    MEMBERSHIP_CREDITS, MEMBERSHIP_MONTHS, BookedClasses, Classes, CreditLedger, Membership, ScheduleDay, userModel,
+)
+from userAPI.services import rebuild_attendance_rollups, reset_balances_from_ledger
+
+EMAIL_DOMAIN = "load.test"
+FIRST_NAMES = ["Anan", "Bee", "Chai", "Dao", "Emma", "Finn", "Gun", "Hana", "Ivan", "Jin", "Kai", "Lek", "Mali", "Noi"]
+LAST_NAMES = ["Srisuk", "Wong", "Smith", "Chaiyo", "Garcia", "Nakamura", "Boonmee", "Muller", "Kaewkla", "Tran"]
+CLASS_TYPES = [
+    ("Muay Thai Fundamentals", "Stance, guard and the basic strikes."),
+    ("Muay Thai Advanced", "Combinations, sweeps and sparring drills."),
+    ("Clinch", "Clinch entries, knees and off-balancing."),
+    ("Boxing", "Footwork, head movement and hands."),
+    ("Conditioning", "Circuits, bag rounds and core work."),
+    ("Kids Muay Thai", "Technique and games for ages 7-12."),
+    ("Open Mat", "Free training with a coach on the floor."),
+]
+INSTRUCTORS = ["Kru Dan", "Kru Bee", "Kru Lek", "Kru Noi", "Kru Sam", "Kru Tong"]
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def insert_bookings(rows):
+    """
+    INSERT (user id, class id, booking date) rows as given.
+
+    bulk_create would stamp booking_date with now() (auto_now_add), so the
+    generated history is written with a plain multi-row INSERT instead.
+    """
+    fields = [BookedClasses._meta.get_field(name) for name in ('userId', 'clasId', 'booking_date')]
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        connection.ops.quote_name(BookedClasses._meta.db_table),
+        ", ".join(connection.ops.quote_name(field.column) for field in fields),
+        ", ".join(["%s"] * len(fields)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            [field.get_db_prep_save(value, connection) for field, value in zip(fields, row)] for row in rows
+        ])
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with synthetic load-test data in bulk: members across every "
+        "membership type, a schedule from a year ago to a year ahead, and bookings with matching "
+        "seat counters, credit ledger entries, schedule versions and attendance rollups. Members get "
+        f"@{EMAIL_DOMAIN} emails and share one password."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50_000)
+        parser.add_argument('--days', type=int, default=730, help="Schedule length, centred on today.")
+        parser.add_argument('--classes-per-day', type=int, default=24)
+        parser.add_argument('--capacity', type=int, default=200)
+        parser.add_argument('--bookings', type=int, default=2_000_000, help="Target; capped by class capacity.")
+        parser.add_argument('--password', default="load-test-password")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5_000)
+
+    def handle(self, *args, **options):
+        if userModel.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").exists():
+            raise CommandError(f"@{EMAIL_DOMAIN} members already exist; seed a fresh database.")
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        with transaction.atomic():
+            user_ids, credit_users = self.seed_users(options['users'], options['password'])
+            classes = self.seed_classes(
+                options['days'], options['classes_per_day'], options['capacity'], options['bookings'], len(user_ids),
+            )
+            bookings = self.seed_bookings(user_ids, credit_users, classes)
+            reset_balances_from_ledger(userModel.objects.filter(pk__in=credit_users.keys()))
+        if classes:
+            # bulk_create skips the rollup signals; recount the seeded weeks, a chunk per transaction.
+            days = [day for _, day, _, _ in classes]
+            for _ in rebuild_attendance_rollups(min(days), max(days)):
+                pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(user_ids)} members, {len(classes)} classes and {bookings} bookings."
+        ))
+
+    def seed_users(self, count, password):
+        today = timezone.localdate()
+        password = make_password(password)  # hashed once; every member shares it
+
+        def members():
+            for i in range(count):
+                membership = Membership.values[i % len(Membership.values)]
+                start = today - timedelta(days=self.rng.randint(0, 365))
+                yield userModel(
+                    email=f"member{i:06d}@{EMAIL_DOMAIN}", password=password,
+                    first_name=self.rng.choice(FIRST_NAMES), last_name=self.rng.choice(LAST_NAMES),
+                    membershipName=membership, startDate=start,
+                    expirationDate=start + relativedelta(months=MEMBERSHIP_MONTHS[membership]),
+                )
+
+        for batch in batches(members(), self.batch_size):
+            userModel.objects.bulk_create(batch)
+
+        members = userModel.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").order_by('pk')
+        user_ids = list(members.values_list('pk', flat=True))
+        # {user id: credits granted at signup} for the credit memberships
+        credit_users = {
+            pk: MEMBERSHIP_CREDITS[membership]
+            for pk, membership in members.filter(membershipName__in=list(MEMBERSHIP_CREDITS)).values_list('pk', 'membershipName')
+        }
+        for batch in batches(credit_users.items(), self.batch_size):
+            CreditLedger.objects.bulk_create([
+                CreditLedger(user_id=pk, delta=credits, reason=CreditLedger.Reason.GRANT) for pk, credits in batch
+            ])
+        return user_ids, credit_users
+
+    def seed_classes(self, days, per_day, capacity, bookings, members):
+        first_day = timezone.localdate() - timedelta(days=days // 2)
+        mean = bookings / (days * per_day) if days * per_day else 0
+
+        def schedule():
+            for d in range(days):
+                day = first_day + timedelta(days=d)
+                for slot in range(per_day):
+                    name, description = self.rng.choice(CLASS_TYPES)
+                    start = time(6 + slot % 16, 30 if slot // 16 % 2 else 0)
+                    booked = min(capacity, members, max(0, round(self.rng.gauss(mean, mean / 3))))
+                    yield Classes(
+                        class_name=name, class_description=description, class_date=day,
+                        class_start_time=start, class_end_time=time(start.hour + 1, start.minute),
+                        instructor_name=self.rng.choice(INSTRUCTORS), capacity=capacity, seats_booked=booked,
+                    )
+
+        for batch in batches(schedule(), self.batch_size):
+            Classes.objects.bulk_create(batch)
+        ScheduleDay.objects.bulk_create(
+            [ScheduleDay(class_date=first_day + timedelta(days=d)) for d in range(days)], ignore_conflicts=True,
+        )
+        return list(
+            Classes.objects.filter(class_date__gte=first_day, class_date__lt=first_day + timedelta(days=days))
+            .order_by('pk').values_list('pk', 'class_date', 'class_start_time', 'seats_booked')
+        )
+
+    def seed_bookings(self, user_ids, credit_users, classes):
+        booked = dict.fromkeys(credit_users, 0)
+
+        def rows():
+            for class_id, day, start, seats in classes:
+                starts_at = timezone.make_aware(datetime.combine(day, start))
+                for user_id in self.rng.sample(user_ids, seats):
+                    if user_id in booked:
+                        booked[user_id] += 1
+                    yield user_id, class_id, starts_at - timedelta(minutes=self.rng.randint(30, 14 * 24 * 60))
+
+        total = 0
+        for batch in batches(rows(), self.batch_size):
+            insert_bookings(batch)
+            CreditLedger.objects.bulk_create([
+                CreditLedger(user_id=user_id, delta=-1, reason=CreditLedger.Reason.BOOKING, klass_id=class_id)
+                for user_id, class_id, _ in batch if user_id in credit_users
+            ])
+            total += len(batch)
+
+        # Members who booked past their signup credits bought top-ups.
+        top_ups = [
+            CreditLedger(user_id=pk, delta=count - credit_users[pk] + self.rng.randint(0, 5), reason=CreditLedger.Reason.GRANT)
+            for pk, count in booked.items() if count > credit_users[pk]
+        ]
+        for batch in batches(top_ups, self.batch_size):
+            CreditLedger.objects.bulk_create(batch)
+        return total
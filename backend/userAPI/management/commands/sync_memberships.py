@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from userAPI.models import Membership
+from userAPI.services import deactivate_expired, recompute_expirations
+
+
+class Command(BaseCommand):
+    help = "Recompute membership expiration dates in bulk and optionally deactivate expired members."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--membership', type=int, action='append', choices=Membership.values,
+            help="Only recompute this membership type (repeatable). Defaults to all types.",
+        )
+        parser.add_argument('--deactivate-expired', action='store_true',
+                            help="Also set is_active=False on members whose expirationDate has passed.")
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help="Distinct start dates per UPDATE.")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Members deactivated per UPDATE.")
+
+    def handle(self, *args, **options):
+        totals = {}
+        for membership, updated in recompute_expirations(options['membership'], options['chunk_size']):
+            totals[membership] = totals.get(membership, 0) + updated
+            self.stdout.write(f"{Membership(membership).label}: {totals[membership]} updated")
+        self.stdout.write(self.style.SUCCESS(f"Expiration dates recomputed for {sum(totals.values())} members."))
+
+        if options['deactivate_expired']:
+            deactivated = 0
+            for deactivated in deactivate_expired(batch_size=options['batch_size']):
+                self.stdout.write(f"Deactivated {deactivated} expired members...")
+            self.stdout.write(self.style.SUCCESS(f"{deactivated} expired members deactivated."))
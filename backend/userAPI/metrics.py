@@ -0,0 +1,135 @@
+"""
+Per-process request histograms, exported in Prometheus text format on /metrics/.
+
+Recording takes no lock. Each thread gets its own shard, a dict of
+{labels: [bucket counts..., +Inf count, sum]}, and only that thread ever writes
+to it. /metrics/ sums every shard when it is scraped. A scrape can miss an
+observation that is in flight, and the next scrape picks it up. Counts only
+ever grow, so the exported histograms stay monotonic. A lock is taken once per
+thread, when the thread first registers its shard, and once more when the
+thread exits and its counts are folded into a shared retired shard. The ASGI
+handler runs each request on a new thread, so a shard must not outlive its
+thread.
+
+The numbers are per process. With several workers, scrape each of them.
+"""
+
+import threading
+import weakref
+from bisect import bisect_left
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class _ThreadExit:
+    # Lives only in a thread's local storage, so it is freed when the thread exits.
+    __slots__ = ('__weakref__',)
+
+
+class Histogram:
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._shards = {}
+        self._retired = {}
+        self._register = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            self._local.exit = _ThreadExit()
+            weakref.finalize(self._local.exit, self._retire, shard)
+            with self._register:
+                self._shards[id(shard)] = shard
+        return shard
+
+    def _retire(self, shard):
+        with self._register:
+            _merge(self._retired, shard)
+            del self._shards[id(shard)]
+
+    def observe(self, value, labels=()):
+        """labels: a tuple of (name, value) pairs, in the same order every time."""
+        shard = self._shard()
+        row = shard.get(labels)
+        if row is None:
+            row = shard[labels] = [0] * (len(self.buckets) + 2)
+        row[bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def collect(self):
+        """{labels: (cumulative bucket counts incl. +Inf, sum)} across all threads."""
+        totals = {}
+        with self._register:
+            _merge(totals, self._retired)
+            for shard in list(self._shards.values()):
+                _merge(totals, shard)
+        result = {}
+        for labels, row in totals.items():
+            cumulative, running = [], 0
+            for count in row[:-1]:
+                running += count
+                cumulative.append(running)
+            result[labels] = (cumulative, row[-1])
+        return result
+
+    def reset(self):
+        with self._register:
+            self._retired.clear()
+            for shard in self._shards.values():
+                shard.clear()
+
+    def exposition(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        bounds = [_number(b) for b in self.buckets] + ["+Inf"]
+        for labels, (cumulative, total) in sorted(self.collect().items()):
+            base = [f'{key}="{_escape(value)}"' for key, value in labels]
+            for bound, count in zip(bounds, cumulative):
+                bucket_labels = ",".join(base + [f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {count}")
+            suffix = f'{{{",".join(base)}}}' if base else ""
+            lines.append(f"{self.name}_sum{suffix} {_number(total)}")
+            lines.append(f"{self.name}_count{suffix} {cumulative[-1]}")
+        return lines
+
+
+def _merge(totals, shard):
+    for labels, row in list(shard.items()):
+        total = totals.setdefault(labels, [0] * len(row))
+        for i, value in enumerate(row):
+            total[i] += value
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+request_duration = Histogram(
+    "ninjadtao_request_duration_seconds", "Wall time per request, by view.", DURATION_BUCKETS
+)
+request_queries = Histogram(
+    "ninjadtao_request_db_queries", "Database queries per request, by view.", QUERY_BUCKETS
+)
+request_db_time = Histogram(
+    "ninjadtao_request_db_seconds", "Time spent in database queries per request, by view.", DURATION_BUCKETS
+)
+request_render_time = Histogram(
+    "ninjadtao_request_render_seconds", "Time spent rendering the response body, by view.", DURATION_BUCKETS
+)
+
+REQUEST_HISTOGRAMS = (request_duration, request_queries, request_db_time, request_render_time)
+
+
+def exposition():
+    lines = []
+    for histogram in REQUEST_HISTOGRAMS:
+        lines.extend(histogram.exposition())
+    return lines
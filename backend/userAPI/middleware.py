@@ -0,0 +1,163 @@
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+
+from . import metrics
+
+slow_query_log = logging.getLogger('userAPI.slow_queries')
+
+
+class LargeResponseGZipMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware for big payloads only (settings.GZIP_MIN_BYTES and up).
+
+    Small responses such as login and token refresh are left uncompressed.
+    Compressing them saves nothing, and it would put tokens in compressed
+    responses (BREACH).
+    """
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < getattr(settings, 'GZIP_MIN_BYTES', 1024):
+            return response
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            return response  # small events on a long-lived connection; gzip only adds a flush per event
+        return super().process_response(request, response)
+
+
+class RequestCost:
+    """
+    What one request spent. record_query passes it every query the request makes.
+
+    Every query is counted and timed. Queries slower than settings.SLOW_QUERY_MS
+    go to the userAPI.slow_queries log. The SQL is logged without its params,
+    which can hold emails and password hashes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self._render_started = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += elapsed
+            if elapsed * 1000 >= getattr(settings, 'SLOW_QUERY_MS', 100):
+                slow_query_log.warning(
+                    "%.1f ms on %s during %s: %s", elapsed * 1000, context['connection'].alias, self.path, sql
+                )
+
+    def start_render(self):
+        self._render_started = time.perf_counter()
+
+    def rendered(self, response):
+        self.render_time += time.perf_counter() - self._render_started
+
+    def server_timing(self, total):
+        return (
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries", '
+            f'render;dur={self.render_time * 1000:.2f}, '
+            f'total;dur={total * 1000:.2f}'
+        )
+
+
+_current_cost = ContextVar('request_cost', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper installed once on every connection (signals.measure_queries).
+
+    Charges the query to the request running in this context, if any. The
+    ContextVar follows sync_to_async into its worker threads, which hold their
+    own connections. Async views' queries are therefore counted without the
+    middleware leaving the event loop.
+    """
+    cost = _current_cost.get()
+    if cost is None:
+        return execute(sql, params, many, context)
+    return cost(execute, sql, params, many, context)
+
+
+class RequestMetricsMiddleware:
+    """
+    Measures every request and feeds the /metrics/ histograms.
+
+    It records wall time, DB query count, DB time and DRF render time per view.
+    The same numbers go out in a Server-Timing header, so the browser devtools
+    show them. Keep it first in MIDDLEWARE so the total covers all the other
+    middleware too. It runs natively under ASGI as well, so async views don't
+    pay a thread hop at the front of the chain.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # Django runs a sync process_template_response in a thread under ASGI.
+            self.process_template_response = self.aprocess_template_response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        cost, started = self.start(request)
+        token = _current_cost.set(cost)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_cost.reset(token)
+        return self.finish(request, response, cost, started)
+
+    async def __acall__(self, request):
+        cost, started = self.start(request)
+        token = _current_cost.set(cost)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_cost.reset(token)
+        return self.finish(request, response, cost, started)
+
+    @staticmethod
+    def start(request):
+        request.request_cost = RequestCost(request.path)
+        return request.request_cost, time.perf_counter()
+
+    @staticmethod
+    def finish(request, response, cost, started):
+        total = time.perf_counter() - started
+        match = request.resolver_match
+        labels = (('view', match.view_name if match else 'unmatched'), ('method', request.method))
+        metrics.request_duration.observe(total, labels)
+        metrics.request_queries.observe(cost.queries, labels)
+        metrics.request_db_time.observe(cost.db_time, labels)
+        metrics.request_render_time.observe(cost.render_time, labels)
+
+        response['Server-Timing'] = cost.server_timing(total)
+        return response
+
+    def process_template_response(self, request, response):
+        return self.time_render(request, response)
+
+    async def aprocess_template_response(self, request, response):
+        return self.time_render(request, response)
+
+    @staticmethod
+    def time_render(request, response):
+        # DRF responses render after the view returns; time that separately.
+        request.request_cost.start_render()
+        response.add_post_render_callback(request.request_cost.rendered)
+        return response
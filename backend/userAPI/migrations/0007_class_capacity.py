@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-17 21:40
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def dedupe_and_count_bookings(apps, schema_editor):
+    """Drop duplicate (user, class) bookings and seed seats_booked from what is left."""
+    BookedClasses = apps.get_model('userAPI', 'BookedClasses')
+    Classes = apps.get_model('userAPI', 'Classes')
+
+    duplicates = (
+        BookedClasses.objects.values('userId', 'clasId')
+        .annotate(first_id=Min('id'), n=Count('id'))
+        .filter(n__gt=1)
+    )
+    for row in duplicates:
+        BookedClasses.objects.filter(userId=row['userId'], clasId=row['clasId']).exclude(id=row['first_id']).delete()
+
+    counts = BookedClasses.objects.values('clasId').annotate(n=Count('id'))
+    for row in counts:
+        Classes.objects.filter(pk=row['clasId']).update(seats_booked=row['n'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userAPI', '0006_classes_class_end_time_classes_class_start_time_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classes',
+            name='capacity',
+            field=models.PositiveIntegerField(default=20),
+        ),
+        migrations.AddField(
+            model_name='classes',
+            name='seats_booked',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(dedupe_and_count_bookings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='bookedclasses',
+            constraint=models.UniqueConstraint(fields=('userId', 'clasId'), name='unique_user_class_booking'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-17 21:42
+
+from django.db import migrations, models
+
+
+def seed_schedule_days(apps, schema_editor):
+    Classes = apps.get_model('userAPI', 'Classes')
+    ScheduleDay = apps.get_model('userAPI', 'ScheduleDay')
+    days = Classes.objects.values_list('class_date', flat=True).distinct()
+    ScheduleDay.objects.bulk_create([ScheduleDay(class_date=day) for day in days], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userAPI', '0007_class_capacity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleDay',
+            fields=[
+                ('class_date', models.DateField(primary_key=True, serialize=False)),
+                ('version', models.PositiveIntegerField(default=1)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='classes',
+            index=models.Index(fields=['class_date', 'class_start_time'], name='classes_date_start_idx'),
+        ),
+        migrations.RunPython(seed_schedule_days, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 21:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userAPI', '0009_token_blacklist'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookedclasses',
+            index=models.Index(fields=['userId', 'booking_date'], name='booking_user_date_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-17 21:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def open_credit_balances(apps, schema_editor):
+    """Give existing credit members their pack minus the classes booked since it started."""
+    userModel = apps.get_model('userAPI', 'userModel')
+    BookedClasses = apps.get_model('userAPI', 'BookedClasses')
+    CreditLedger = apps.get_model('userAPI', 'CreditLedger')
+    credits = {4: 10, 5: 20}  # Ten_Credits, Twenty_Credits
+
+    for user in userModel.objects.filter(membershipName__in=credits):
+        used = BookedClasses.objects.filter(userId=user)
+        if user.startDate:
+            used = used.filter(booking_date__date__gte=user.startDate)
+        balance = max(credits[user.membershipName] - used.count(), 0)
+        CreditLedger.objects.create(user=user, delta=balance, reason=4)  # Adjustment
+        userModel.objects.filter(pk=user.pk).update(credit_balance=balance)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userAPI', '0010_booking_user_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usermodel',
+            name='credit_balance',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='CreditLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField()),
+                ('reason', models.IntegerField(choices=[(1, 'Grant'), (2, 'Booking'), (3, 'Refund'), (4, 'Adjustment')])),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('klass', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='userAPI.classes')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='credit_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'klass'], name='credit_user_class_idx')],
+            },
+        ),
+        migrations.RunPython(open_credit_balances, migrations.RunPython.noop),
+    ]
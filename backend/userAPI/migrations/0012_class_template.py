@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:09
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userAPI', '0011_credit_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('class_name', models.CharField(max_length=100)),
+                ('class_description', models.TextField(blank=True)),
+                ('instructor_name', models.CharField(max_length=100)),
+                ('weekday', models.IntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('start_time', models.TimeField()),
+                ('duration', models.DurationField(default=datetime.timedelta(seconds=3600))),
+                ('capacity', models.PositiveIntegerField(default=20)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='classes',
+            name='template',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='classes', to='userAPI.classtemplate'),
+        ),
+        migrations.AddConstraint(
+            model_name='classes',
+            constraint=models.UniqueConstraint(fields=('template', 'class_date'), name='unique_template_date'),
+        ),
+    ]
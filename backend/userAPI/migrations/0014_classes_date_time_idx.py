@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userAPI', '0013_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='classes',
+            name='classes_date_start_idx',
+        ),
+        migrations.AddIndex(
+            model_name='classes',
+            index=models.Index(fields=['class_date', 'class_start_time', 'class_end_time'], name='classes_date_time_idx'),
+        ),
+    ]
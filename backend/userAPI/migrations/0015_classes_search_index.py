@@ -0,0 +1,72 @@
+# Full-text index over classes (userAPI.search): FTS5 plus triggers on SQLite, FULLTEXT on MySQL.
+# The DDL is frozen here rather than imported from userAPI.search, so later changes to that module
+# can't change what this migration does.
+
+from django.db import OperationalError, migrations
+
+FTS_TABLE = 'userAPI_classes_fts'
+FULLTEXT_INDEX = 'classes_fulltext'
+
+DELETE_OLD = (
+    "INSERT INTO userAPI_classes_fts(userAPI_classes_fts, rowid, class_name, class_description, instructor_name) "
+    "VALUES ('delete', old.classId, old.class_name, old.class_description, old.instructor_name);"
+)
+INSERT_NEW = (
+    "INSERT INTO userAPI_classes_fts(rowid, class_name, class_description, instructor_name) "
+    "VALUES (new.classId, new.class_name, new.class_description, new.instructor_name);"
+)
+
+SQLITE_STATEMENTS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS userAPI_classes_fts USING fts5("
+    "class_name, class_description, instructor_name, content='userAPI_classes', content_rowid='classId', "
+    "detail=column, tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS userAPI_classes_fts_insert AFTER INSERT ON userAPI_classes BEGIN {INSERT_NEW} END",
+    f"CREATE TRIGGER IF NOT EXISTS userAPI_classes_fts_delete AFTER DELETE ON userAPI_classes BEGIN {DELETE_OLD} END",
+    "CREATE TRIGGER IF NOT EXISTS userAPI_classes_fts_update AFTER UPDATE OF "
+    f"class_name, class_description, instructor_name ON userAPI_classes BEGIN {DELETE_OLD} {INSERT_NEW} END",
+    "INSERT INTO userAPI_classes_fts(userAPI_classes_fts) VALUES ('rebuild')",
+]
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            try:
+                for statement in SQLITE_STATEMENTS:
+                    cursor.execute(statement)
+            except OperationalError:
+                pass  # built without FTS5; searches fall back to scans
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT 1 FROM information_schema.statistics "
+                "WHERE table_schema = DATABASE() AND table_name = 'userAPI_classes' AND index_name = %s LIMIT 1",
+                [FULLTEXT_INDEX],
+            )
+            if cursor.fetchone() is None:
+                cursor.execute(
+                    f"ALTER TABLE userAPI_classes ADD FULLTEXT INDEX {FULLTEXT_INDEX} "
+                    "(class_name, class_description, instructor_name)"
+                )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for trigger in ('insert', 'delete', 'update'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{trigger}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        elif connection.vendor == 'mysql':
+            cursor.execute(f"ALTER TABLE userAPI_classes DROP INDEX {FULLTEXT_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userAPI', '0014_classes_date_time_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
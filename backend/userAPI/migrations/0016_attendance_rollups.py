@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userAPI', '0015_classes_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstructorWeek',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.DateField()),
+                ('instructor_name', models.CharField(max_length=100)),
+                ('classes', models.IntegerField(default=0)),
+                ('capacity', models.IntegerField(default=0)),
+                ('booked', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('week', 'instructor_name'), name='unique_instructor_week')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TimeSlotWeek',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.DateField()),
+                ('weekday', models.IntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('start_time', models.TimeField()),
+                ('classes', models.IntegerField(default=0)),
+                ('capacity', models.IntegerField(default=0)),
+                ('booked', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('week', 'weekday', 'start_time'), name='unique_time_slot_week')],
+            },
+        ),
+    ]
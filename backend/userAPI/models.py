@@ -32,6 +32,21 @@ class Membership (models.IntegerChoices):
     Ten_Credits = 4, "10 Credits",
     Twenty_Credits = 5, "20 Credits"
 
+# How long each membership lasts from its startDate (also used by services.recompute_expirations)
+MEMBERSHIP_MONTHS = {
+    Membership.Monthly: 1,
+    Membership.Three_Month: 3,
+    Membership.Six_Month: 6,
+    Membership.Ten_Credits: 1,
+    Membership.Twenty_Credits: 2,
+}
+
+# Credits granted when a credit membership starts; other memberships don't use credits
+MEMBERSHIP_CREDITS = {
+    Membership.Ten_Credits: 10,
+    Membership.Twenty_Credits: 20,
+}
+
 class userModel(AbstractBaseUser, PermissionsMixin):
     id = models.AutoField(primary_key=True)
     email = models.EmailField(unique=True)
@@ -43,6 +58,7 @@ class userModel(AbstractBaseUser, PermissionsMixin):
     )
     startDate = models.DateField(null=True, blank=True)
     expirationDate = models.DateField(null=True, blank=True)
+    credit_balance = models.IntegerField(default=0)  # materialized sum of CreditLedger.delta
 
     is_staff = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
@@ -69,19 +85,37 @@ class userModel(AbstractBaseUser, PermissionsMixin):
     
     def save(self, *args, **kwargs):
         """Auto-calculate expiration date based on membership type."""
-        if self.startDate:
-            if self.membershipName == Membership.Monthly:
-                self.expirationDate = self.startDate + relativedelta(months=1)
-            elif self.membershipName == Membership.Three_Month:
-                self.expirationDate = self.startDate + relativedelta(months=3)
-            elif self.membershipName == Membership.Six_Month:
-                self.expirationDate = self.startDate + relativedelta(months=6)
-            elif self.membershipName == Membership.Ten_Credits:
-                self.expirationDate = self.startDate + relativedelta(months=1)
-            elif self.membershipName == Membership.Twenty_Credits:
-                self.expirationDate = self.startDate + relativedelta(months=2)
+        if self.startDate and self.membershipName in MEMBERSHIP_MONTHS:
+            self.expirationDate = self.startDate + relativedelta(months=MEMBERSHIP_MONTHS[self.membershipName])
         super().save(*args, **kwargs)
 
+# ----------------------------
+# Class Template Model
+# ----------------------------
+class Weekday(models.IntegerChoices):
+    # Same numbering as date.weekday()
+    Monday = 0, "Monday"
+    Tuesday = 1, "Tuesday"
+    Wednesday = 2, "Wednesday"
+    Thursday = 3, "Thursday"
+    Friday = 4, "Friday"
+    Saturday = 5, "Saturday"
+    Sunday = 6, "Sunday"
+
+class ClassTemplate(models.Model):
+    """A class that repeats every week; services.generate_timetable turns it into dated Classes rows."""
+    class_name = models.CharField(max_length=100)
+    class_description = models.TextField(blank=True)
+    instructor_name = models.CharField(max_length=100)
+    weekday = models.IntegerField(choices=Weekday.choices)
+    start_time = models.TimeField()
+    duration = models.DurationField(default=timedelta(hours=1))
+    capacity = models.PositiveIntegerField(default=20)
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.class_name} ({self.get_weekday_display()} {self.start_time:%H:%M})"
+
 # ----------------------------
 # Classes Model
 # ----------------------------
@@ -93,6 +127,19 @@ class Classes(models.Model):
     class_start_time = models.TimeField(default="12:00:00")
     class_end_time = models.TimeField(null=True, blank=True)  # allow null
     instructor_name = models.CharField(max_length=100)
+    capacity = models.PositiveIntegerField(default=20)
+    seats_booked = models.PositiveIntegerField(default=0)  # only changed through services.book_class / cancel_booking
+    template = models.ForeignKey(ClassTemplate, on_delete=models.SET_NULL, null=True, blank=True, related_name='classes')
+
+    class Meta:
+        indexes = [
+            # Also answers "which of these classes overlap a time range" (services.overlapping_booking).
+            models.Index(fields=['class_date', 'class_start_time', 'class_end_time'], name='classes_date_time_idx'),
+        ]
+        constraints = [
+            # One generated class per template per day, so re-running the generator is a no-op.
+            models.UniqueConstraint(fields=['template', 'class_date'], name='unique_template_date'),
+        ]
 
     def save(self, *args, **kwargs):
         if self.class_end_time is None and self.class_start_time:
@@ -105,6 +152,62 @@ class Classes(models.Model):
     def __str__(self):
         return self.class_name
 
+    @property
+    def seats_left(self):
+        return max(self.capacity - self.seats_booked, 0)
+
+# ----------------------------
+# Schedule Version Model
+# ----------------------------
+class ScheduleDay(models.Model):
+    """One row per calendar day; version is bumped whenever that day's schedule changes."""
+    class_date = models.DateField(primary_key=True)
+    version = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.class_date} v{self.version}"
+
+# ----------------------------
+# Attendance Rollup Models
+# ----------------------------
+class InstructorWeek(models.Model):
+    """
+    One instructor's classes in one week (week is its Monday): how many, their
+    total capacity and their booked seats. Kept up to date by services.add_to_rollups.
+    """
+    week = models.DateField()
+    instructor_name = models.CharField(max_length=100)
+    # Plain integers: a delta applied before the first backfill may leave a row below
+    # zero until rebuild_attendance_rollups rewrites it, and must not fail the booking.
+    classes = models.IntegerField(default=0)
+    capacity = models.IntegerField(default=0)
+    booked = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['week', 'instructor_name'], name='unique_instructor_week'),
+        ]
+
+    def __str__(self):
+        return f"{self.instructor_name} w/c {self.week}"
+
+class TimeSlotWeek(models.Model):
+    """Classes starting at one weekday and time in one week, with the same counts as InstructorWeek."""
+    week = models.DateField()
+    weekday = models.IntegerField(choices=Weekday.choices)
+    start_time = models.TimeField()
+    classes = models.IntegerField(default=0)
+    capacity = models.IntegerField(default=0)
+    booked = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['week', 'weekday', 'start_time'], name='unique_time_slot_week'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_weekday_display()} {self.start_time:%H:%M} w/c {self.week}"
+
 # ----------------------------
 # Booked Classes Model
 # ----------------------------
@@ -113,5 +216,70 @@ class BookedClasses(models.Model):
     clasId = models.ForeignKey(Classes, on_delete=models.CASCADE, related_name='booked_users')
     booking_date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['userId', 'clasId'], name='unique_user_class_booking'),
+        ]
+        indexes = [
+            models.Index(fields=['userId', 'booking_date'], name='booking_user_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.userId.email} - {self.clasId.class_name}"
+
+# ----------------------------
+# Token Blacklist Model
+# ----------------------------
+class BlacklistedToken(models.Model):
+    """A revoked refresh token. Only the jti is kept, and the row can be pruned once the token expires."""
+    jti = models.CharField(max_length=64, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.jti
+
+# ----------------------------
+# Credit Ledger Model
+# ----------------------------
+class CreditLedger(models.Model):
+    """Append-only record of credit changes; userModel.credit_balance is their running sum."""
+
+    class Reason(models.IntegerChoices):
+        GRANT = 1, "Grant"
+        BOOKING = 2, "Booking"
+        REFUND = 3, "Refund"
+        ADJUSTMENT = 4, "Adjustment"
+
+    user = models.ForeignKey(userModel, on_delete=models.CASCADE, related_name='credit_entries')
+    delta = models.IntegerField()
+    reason = models.IntegerField(choices=Reason.choices)
+    klass = models.ForeignKey(Classes, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'klass'], name='credit_user_class_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.delta:+d} ({self.get_reason_display()})"
+
+# ----------------------------
+# Idempotency Key Model
+# ----------------------------
+class IdempotencyKey(models.Model):
+    """An Idempotency-Key a member sent and the response it produced (see userAPI.idempotency)."""
+    user = models.ForeignKey(userModel, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)  # sha256 of method, path and body
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)  # null while the first request runs
+    response_body = models.TextField(blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_user_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key}"
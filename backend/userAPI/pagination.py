@@ -0,0 +1,56 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination
+
+
+class BookingCursorPagination(CursorPagination):
+    """Keyset pagination over a member's bookings, newest first (uses booking_user_date_idx)."""
+    ordering = '-booking_date'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Admin paginator that avoids COUNT(*) on big, unfiltered changelists.
+
+    When the changelist has no filters, it uses the database's own row estimate
+    (MySQL table statistics, PostgreSQL reltuples, the highest primary key
+    elsewhere). Exact counts are still used for filtered lists and for tables
+    under `exact_below` rows.
+    """
+    exact_below = 100_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if getattr(queryset, 'query', None) is None or queryset.query.where:
+            return super().count
+        estimate = estimated_row_count(queryset.model, queryset.db)
+        if estimate is None or estimate < self.exact_below:
+            return super().count
+        return estimate
+
+
+def estimated_row_count(model, using='default'):
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                [table],
+            )
+            row = cursor.fetchone()
+            return row[0] if row else None
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+            row = cursor.fetchone()
+            return row[0] if row and row[0] >= 0 else None
+    # Integer primary keys are (nearly) dense here, and MAX(pk) is a single index lookup.
+    if model._meta.pk.get_internal_type() not in ('AutoField', 'BigAutoField'):
+        return None
+    return model._default_manager.using(using).aggregate(highest=Max('pk'))['highest'] or 0
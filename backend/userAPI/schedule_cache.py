@@ -0,0 +1,134 @@
+"""
+Per-day cache of the serialized schedule, shared through the Django cache framework.
+
+Each entry is {"version": n, "rows": [...]} under `schedule:<day>`. The
+post_save/post_delete signals on Classes and BookedClasses bump that day's
+ScheduleDay version (userAPI.signals), so an entry whose version is behind the
+current one is a miss for exactly the day that changed. It is also kept as
+the stale copy handed out while one request rebuilds the day, which is the
+stampede protection: the rebuilder holds `schedule-lock:<day>` (cache.add), and
+everyone else gets the stale rows, waits briefly for the new ones, or (if the
+lock holder died) rebuilds the day themselves.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import fastserializers
+from .models import Classes
+from .serializer import ClassSerializer
+from .services import with_availability
+
+COUNTERS = ('hits', 'misses', 'stale', 'waits')
+
+
+def _entry_key(day):
+    return f"schedule:{day.isoformat()}"
+
+
+def _lock_key(day):
+    return f"schedule-lock:{day.isoformat()}"
+
+
+def _count(name, amount=1):
+    if not amount:
+        return
+    key = f"schedule-cache:{name}"
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, amount)
+    except ValueError:  # evicted between add and incr
+        cache.set(key, amount, timeout=None)
+
+
+def stats():
+    values = cache.get_many([f"schedule-cache:{name}" for name in COUNTERS])
+    return {name: values.get(f"schedule-cache:{name}", 0) for name in COUNTERS}
+
+
+def _build(versions):
+    """Serialize the given days from the database and store them. versions: {day: version}."""
+    classes = Classes.objects.filter(class_date__in=list(versions)).order_by('class_date', 'class_start_time')
+    rows = {day: [] for day in versions}
+    if fastserializers.enabled():
+        by_iso = {day.isoformat(): day_rows for day, day_rows in rows.items()}
+        for row in fastserializers.serialize_classes(with_availability(classes, None)):
+            by_iso[row["class_date"]].append(row)
+    else:
+        classes = list(classes)
+        for klass, row in zip(classes, ClassSerializer(classes, many=True).data):
+            rows[klass.class_date].append(dict(row))
+
+    timeout = getattr(settings, 'SCHEDULE_CACHE_TIMEOUT', 86400)
+    cache.set_many(
+        {_entry_key(day): {"version": versions[day], "rows": rows[day]} for day in versions},
+        timeout=timeout,
+    )
+    return rows
+
+
+def get_schedule(versions):
+    """
+    Rows for every day in `versions` ([(day, version), ...] in date order), as ClassSerializer data.
+
+    Returns (rows, stale). stale is True if any day came from an older version
+    because another request was rebuilding it.
+    """
+    wanted = dict(versions)
+    entries = cache.get_many([_entry_key(day) for day in wanted])
+
+    found, missing, outdated = {}, {}, {}
+    for day, version in wanted.items():
+        entry = entries.get(_entry_key(day))
+        if entry is not None and entry["version"] == version:
+            found[day] = entry["rows"]
+        else:
+            missing[day] = version
+            if entry is not None:
+                outdated[day] = entry["rows"]
+    _count('hits', len(found))
+    _count('misses', len(missing))
+
+    stale = False
+    if missing:
+        lock_timeout = getattr(settings, 'SCHEDULE_CACHE_LOCK_TIMEOUT', 10)
+        mine = {day: v for day, v in missing.items() if cache.add(_lock_key(day), 1, timeout=lock_timeout)}
+        try:
+            if mine:
+                found.update(_build(mine))
+        finally:
+            cache.delete_many([_lock_key(day) for day in mine])
+
+        others = {day: v for day, v in missing.items() if day not in mine}
+        for day in [d for d in others if d in outdated]:
+            found[day] = outdated[day]
+            del others[day]
+            stale = True
+            _count('stale')
+        if others:
+            found.update(_wait_for(others))
+
+    rows = []
+    for day in wanted:
+        rows.extend(found[day])
+    return rows, stale
+
+
+def _wait_for(versions):
+    """Poll for days another request is rebuilding; build whatever hasn't appeared in time."""
+    _count('waits', len(versions))
+    deadline = time.monotonic() + getattr(settings, 'SCHEDULE_CACHE_WAIT', 2.0)
+    found = {}
+    while versions and time.monotonic() < deadline:
+        time.sleep(0.01)
+        entries = cache.get_many([_entry_key(day) for day in versions])
+        for day, version in list(versions.items()):
+            entry = entries.get(_entry_key(day))
+            if entry is not None and entry["version"] >= version:
+                found[day] = entry["rows"]
+                del versions[day]
+    if versions:
+        found.update(_build(versions))
+    return found
@@ -0,0 +1,175 @@
+"""
+Full-text search over classes: class_name, class_description and instructor_name.
+
+SQLite uses userAPI_classes_fts, an FTS5 external-content table. It indexes
+the classes table without keeping a second copy of the text. Triggers on
+INSERT, DELETE and UPDATE OF the three columns keep it in step with every
+write path: save() and delete(), and also bulk_create() and update(), which
+model signals never see. Seat-counter updates don't touch it.
+
+MySQL uses a FULLTEXT index on the same columns, which InnoDB maintains
+itself. Other backends, and SQLite builds without FTS5, fall back to
+icontains scans.
+
+Migration 0015 installs the index. The triggers are checked again after
+every migrate, because SQLite drops a table's triggers when a migration
+rebuilds the table. `manage.py rebuild_search_index` rebuilds the index
+from the table.
+"""
+
+import re
+
+from django.db import OperationalError, connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Classes
+
+FTS_TABLE = 'userAPI_classes_fts'
+FULLTEXT_INDEX = 'classes_fulltext'
+COLUMNS = ('class_name', 'class_description', 'instructor_name')
+MAX_TERMS = 8
+
+_backends = {}  # alias -> 'fts5' | 'fulltext' | None
+
+
+def _sqlite_statements():
+    table = Classes._meta.db_table
+    columns = ", ".join(COLUMNS)
+    new = ", ".join(f"new.{column}" for column in COLUMNS)
+    old = ", ".join(f"old.{column}" for column in COLUMNS)
+    delete_old = (
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.classId, {old});"
+    )
+    insert_new = f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.classId, {new});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5({columns}, content='{table}', "
+        f"content_rowid='classId', detail=column, tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON {table} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON {table} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF {columns} ON {table} "
+        f"BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+def _fulltext_exists(cursor):
+    cursor.execute(
+        "SELECT 1 FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1",
+        [Classes._meta.db_table, FULLTEXT_INDEX],
+    )
+    return cursor.fetchone() is not None
+
+
+def _add_fulltext(cursor):
+    cursor.execute(f"ALTER TABLE {Classes._meta.db_table} ADD FULLTEXT INDEX {FULLTEXT_INDEX} ({', '.join(COLUMNS)})")
+
+
+def install(connection):
+    """Create the index, and on SQLite its triggers, if they are missing. Safe to call repeatedly."""
+    _backends.pop(connection.alias, None)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            try:
+                for statement in _sqlite_statements():
+                    cursor.execute(statement)
+            except OperationalError:
+                return False  # built without FTS5; searches fall back to scans
+            return True
+        if connection.vendor == 'mysql':
+            if not _fulltext_exists(cursor):
+                _add_fulltext(cursor)
+            return True
+    return False
+
+
+def restore_triggers(connection):
+    """
+    Put back triggers that a table rebuild dropped (run after migrate).
+
+    Does nothing unless the FTS table exists, so a database migrated back
+    past 0015 stays without the index.
+    """
+    if connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+        install(connection)
+
+
+def rebuild(connection):
+    """Re-index every class from the table, e.g. after a restore or a load that bypassed the triggers."""
+    if connection.vendor == 'mysql':
+        # Building a FULLTEXT index is the expensive part, so drop any existing one and build it once.
+        _backends.pop(connection.alias, None)
+        with connection.cursor() as cursor:
+            if _fulltext_exists(cursor):
+                cursor.execute(f"ALTER TABLE {Classes._meta.db_table} DROP INDEX {FULLTEXT_INDEX}")
+            _add_fulltext(cursor)
+        return True
+    if not install(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def backend(alias):
+    """Which index serves searches on `alias`: 'fts5', 'fulltext' or None (icontains scans)."""
+    if alias not in _backends:
+        connection = connections[alias]
+        found = None
+        if connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+            found = 'fts5'
+        elif connection.vendor == 'mysql':
+            found = 'fulltext'
+        _backends[alias] = found
+    return _backends[alias]
+
+
+def terms(text):
+    """
+    The words of a search box, lower-cased: punctuation and query syntax are dropped.
+
+    Split the way the unicode61 tokenizer splits, so underscores separate words
+    too: a word the index sees as two would become a phrase query, which
+    detail=column can't answer.
+    """
+    return re.findall(r"[^\W_]+", (text or "").lower())[:MAX_TERMS]
+
+
+def _fts5_query(words, instructor):
+    # Every word must match, as a prefix, so "muay th" finds "Muay Thai".
+    return " ".join([f'"{word}"*' for word in words] + [f'instructor_name : "{word}"*' for word in instructor])
+
+
+def search_classes(text="", instructor="", start=None, end=None, scan=False):
+    """
+    Classes matching every word of `text` (in any of the three columns) and of
+    `instructor` (in instructor_name), between start and end, in schedule order.
+
+    scan=True skips the index and uses icontains filters (benchmark_search).
+    """
+    words, instructor_words = terms(text), terms(instructor)
+    classes = Classes.objects.order_by('class_date', 'class_start_time')
+    if start is not None:
+        classes = classes.filter(class_date__gte=start)
+    if end is not None:
+        classes = classes.filter(class_date__lte=end)
+
+    index = None if scan else backend(router.db_for_read(Classes))
+    if index == 'fts5':
+        return classes.filter(pk__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [_fts5_query(words, instructor_words)]
+        ))
+    if index == 'fulltext' and words:
+        classes = classes.filter(pk__in=RawSQL(
+            f"SELECT classId FROM {Classes._meta.db_table} "
+            f"WHERE MATCH ({', '.join(COLUMNS)}) AGAINST (%s IN BOOLEAN MODE)",
+            [" ".join(f"+{word}*" for word in words)],
+        ))
+        words = []
+    for word in words:
+        classes = classes.filter(
+            Q(class_name__icontains=word) | Q(class_description__icontains=word) | Q(instructor_name__icontains=word)
+        )
+    for word in instructor_words:
+        classes = classes.filter(instructor_name__icontains=word)
+    return classes
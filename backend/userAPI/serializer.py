@@ -1,11 +1,21 @@
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth import authenticate
 from .models import *
+from .authentication import add_user_claims
+from .blacklist import is_revoked, revoke
 
 class EmailTokenObtainPairSerializer(TokenObtainPairSerializer):
     username_field = 'email'  # Django uses USERNAME_FIELD
 
+    @classmethod
+    def get_token(cls, user):
+        return add_user_claims(super().get_token(user), user)
+
     def validate(self, attrs):
         email = attrs.get("email")
         password = attrs.get("password")
@@ -20,6 +30,42 @@ class EmailTokenObtainPairSerializer(TokenObtainPairSerializer):
             "access": str(refresh.access_token),
         }
 
+class EmailTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh that also re-reads the user, so token claims are never older than one access lifetime.
+
+    Rotated tokens are blacklisted by jti. The not-revoked case costs no blacklist
+    read: the in-process filter answers it, and the INSERT that revokes the old
+    token doubles as the replay check.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        jti = refresh[api_settings.JTI_CLAIM]
+        if is_revoked(jti):
+            raise InvalidToken("Token is blacklisted")
+
+        try:
+            user = userModel.objects.get(**{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]})
+        except (KeyError, userModel.DoesNotExist):
+            user = None
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+
+        add_user_claims(refresh, user)
+        data = {"access": str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION and not revoke(jti, datetime_from_epoch(refresh["exp"])):
+                # Another request already rotated this token.
+                raise InvalidToken("Token is blacklisted")
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data["refresh"] = str(refresh)
+
+        return data
+
 class RegisterSerializer(serializers.ModelSerializer):
     class Meta:
         model = userModel
@@ -30,7 +76,25 @@ class BookingSerializer(serializers.ModelSerializer):
         model = BookedClasses
         fields = '__all__'
 
+class ClassSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Classes
+        fields = ['classId', 'class_name', 'class_description', 'class_date',
+                  'class_start_time', 'class_end_time', 'instructor_name']
+
+class BookingDetailSerializer(serializers.ModelSerializer):
+    """A booking with its class embedded; load with select_related('clasId')."""
+    clasId = ClassSummarySerializer(read_only=True)
+
+    class Meta:
+        model = BookedClasses
+        fields = ['id', 'booking_date', 'clasId']
+
 class ClassSerializer(serializers.ModelSerializer):
+    seats_left = serializers.IntegerField(read_only=True)
+    # Filled in by services.with_availability() or ClassesView.mark_booked(); otherwise False.
+    is_booked = serializers.BooleanField(read_only=True, default=False)
+
     class Meta:
         model = Classes
-        fields = '__all__'
\ No newline at end of file
+        exclude = ['template']  # internal link back to the ClassTemplate that generated the class
\ No newline at end of file
@@ -0,0 +1,549 @@
+import hashlib
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Case, Count, DateField, Exists, F, Max, Min, OuterRef, Subquery, Sum, TimeField, Value, When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+
+from .exceptions import AlreadyBooked, ClassFull, OutOfCredits, TimeConflict
+from .models import (
+    MEMBERSHIP_CREDITS, MEMBERSHIP_MONTHS, BookedClasses, Classes, ClassTemplate, CreditLedger, InstructorWeek,
+    ScheduleDay, TimeSlotWeek, userModel,
+)
+
+
+# ----------------------------
+# Booking
+# ----------------------------
+def book_class(user, class_id):
+    """
+    Claim a seat and create the booking in one transaction.
+
+    The seat is taken with a conditional UPDATE (seats_booked < capacity), so the
+    database decides who gets the last seat and a class can never be oversold.
+    The UPDATE is the first statement in the transaction, which makes SQLite take
+    its write lock up front instead of upgrading a read lock later.
+
+    A class that overlaps one the member has already booked is refused
+    (overlapping_booking). The check runs after the insert, so booking the same
+    class twice still reports AlreadyBooked. It is a plain read, so the member's
+    row is locked first (SELECT ... FOR UPDATE on MySQL; SQLite's write lock
+    already serializes): a concurrent booking by the same member waits, then
+    sees this one.
+
+    Credit members also spend a credit in the same transaction. The conditional
+    decrement checks both the membership and the balance on the stored row,
+    not on `user`, whose membership may come from a token issued before a plan
+    change. Only when it matches nothing is the row read, to tell a member on
+    another plan from one who is out of credits.
+    """
+    with transaction.atomic():
+        claimed = Classes.objects.filter(
+            pk=class_id, seats_booked__lt=F('capacity')
+        ).update(seats_booked=F('seats_booked') + 1)
+
+        if not claimed:
+            if not Classes.objects.filter(pk=class_id).exists():
+                raise NotFound("Class not found.")
+            raise ClassFull()
+
+        # Serialize this member's bookings so two overlapping ones can't both pass the check below.
+        userModel.objects.select_for_update().filter(pk=user.pk).values_list('pk').first()
+
+        try:
+            # Raising out of the atomic block also rolls back the seat we claimed.
+            booking = BookedClasses.objects.create(userId_id=user.pk, clasId_id=class_id)
+        except IntegrityError:
+            raise AlreadyBooked()
+
+        conflict = overlapping_booking(user, class_id)
+        if conflict is not None:
+            raise TimeConflict(f"You have already booked {conflict} at this time.")
+
+        spent = userModel.objects.filter(
+            pk=user.pk, membershipName__in=list(MEMBERSHIP_CREDITS), credit_balance__gt=0
+        ).update(credit_balance=F('credit_balance') - 1)
+        if spent:
+            CreditLedger.objects.create(
+                user_id=user.pk, delta=-1, reason=CreditLedger.Reason.BOOKING, klass_id=class_id
+            )
+        elif userModel.objects.filter(pk=user.pk, membershipName__in=list(MEMBERSHIP_CREDITS)).exists():
+            raise OutOfCredits()
+        return booking
+
+
+def _effective_end(prefix=''):
+    # A class that runs past midnight (end <= start) counts as running to the end of its day.
+    end, start = f'{prefix}class_end_time', f'{prefix}class_start_time'
+    return Case(When(**{f'{end}__gt': F(start)}, then=F(end)), default=Value(time.max), output_field=TimeField())
+
+
+def overlapping_booking(user, class_id):
+    """
+    Name of another class the user has booked that overlaps class_id in time, or None.
+
+    Runs as one query. The target class is looked up by pk. An EXISTS-style
+    subquery then joins the user's bookings to classes on the same date with
+    start < target end and end > target start. That range is served by
+    classes_date_time_idx (class_date, class_start_time, class_end_time), and
+    the user's side by the unique (userId, clasId) index.
+    """
+    others = (
+        BookedClasses.objects.filter(
+            userId_id=user.pk,
+            clasId__class_date=OuterRef('class_date'),
+            clasId__class_start_time__lt=OuterRef('ends'),
+        )
+        .exclude(clasId_id=OuterRef('pk'))
+        .annotate(other_ends=_effective_end('clasId__'))
+        .filter(other_ends__gt=OuterRef('class_start_time'))
+        .order_by('clasId__class_start_time')
+    )
+    return (
+        Classes.objects.filter(pk=class_id)
+        .annotate(ends=_effective_end())
+        .annotate(conflict=Subquery(others.values('clasId__class_name')[:1]))
+        .values_list('conflict', flat=True)
+        .first()
+    )
+
+
+def booking_conflicts(chunk_size=2000):
+    """
+    Every pair of one member's bookings whose classes overlap, for data cleanup.
+
+    A single pass over all bookings ordered by member, date and start time (a
+    sweep line). Within each member's day it keeps the bookings still running at
+    the current start time. Each new booking conflicts with every one of those,
+    and then joins them. Memory is bounded by the largest number of
+    simultaneous bookings one member has, not by the table.
+
+    Yields (first, second) pairs of row dicts, where first starts no later than second.
+    """
+    rows = (
+        BookedClasses.objects.annotate(ends=_effective_end('clasId__'))
+        .order_by('userId_id', 'clasId__class_date', 'clasId__class_start_time', 'pk')
+        .values('pk', 'userId_id', 'userId__email', 'clasId_id', 'clasId__class_name',
+                'clasId__class_date', 'clasId__class_start_time', 'ends')
+        .iterator(chunk_size=chunk_size)
+    )
+    day, running = None, []
+    for row in rows:
+        if (row['userId_id'], row['clasId__class_date']) != day:
+            day, running = (row['userId_id'], row['clasId__class_date']), []
+        running = [other for other in running if other['ends'] > row['clasId__class_start_time']]
+        for other in running:
+            yield other, row
+        running.append(row)
+
+
+def with_availability(classes, user):
+    """
+    Annotate a Classes queryset with is_booked for the requesting user.
+
+    Booked counts come from the seats_booked counter that book_class/cancel_booking
+    keep in the same transaction as the booking rows, so the schedule needs no
+    COUNT/GROUP BY join; is_booked is a correlated EXISTS in the same SELECT.
+    """
+    if user is None or not user.is_authenticated:
+        return classes.annotate(is_booked=Value(False))
+    return classes.annotate(
+        is_booked=Exists(BookedClasses.objects.filter(clasId=OuterRef('pk'), userId_id=user.pk))
+    )
+
+
+def _booked_class_ids_query(user, start, end):
+    return BookedClasses.objects.filter(
+        userId_id=user.pk, clasId__class_date__range=(start, end)
+    ).values_list('clasId_id', flat=True)
+
+
+def booked_class_ids(user, start, end):
+    """Ids of the classes between start and end that the user has booked."""
+    if user is None or not user.is_authenticated:
+        return set()
+    return set(_booked_class_ids_query(user, start, end))
+
+
+async def abooked_class_ids(user, start, end):
+    if user is None or not user.is_authenticated:
+        return set()
+    return {class_id async for class_id in _booked_class_ids_query(user, start, end)}
+
+
+def cancel_booking(user, class_id):
+    """Delete the user's booking, give the seat back and refund the credit if one was spent."""
+    with transaction.atomic():
+        deleted, _ = BookedClasses.objects.filter(userId_id=user.pk, clasId_id=class_id).delete()
+        if not deleted:
+            raise NotFound("Booking not found.")
+
+        Classes.objects.filter(pk=class_id, seats_booked__gt=0).update(seats_booked=F('seats_booked') - 1)
+
+        last_entry = (
+            CreditLedger.objects.filter(user_id=user.pk, klass_id=class_id)
+            .order_by('-id').values_list('reason', flat=True).first()
+        )
+        if last_entry == CreditLedger.Reason.BOOKING:
+            add_credits(user, 1, CreditLedger.Reason.REFUND, class_id=class_id)
+
+
+# ----------------------------
+# Schedule versions
+# ----------------------------
+def bump_schedule_version(*dates):
+    """Mark the given days' schedules as changed so cached copies and ETags go stale."""
+    for day in {d for d in dates if d is not None}:
+        if ScheduleDay.objects.filter(class_date=day).update(version=F('version') + 1):
+            continue
+        _, created = ScheduleDay.objects.get_or_create(class_date=day)
+        if not created:
+            # Someone else created the row between our UPDATE and INSERT.
+            ScheduleDay.objects.filter(class_date=day).update(version=F('version') + 1)
+
+
+def bump_schedule_version_for_class(class_id):
+    """Same as bump_schedule_version, for the day a class is on, in a single UPDATE."""
+    ScheduleDay.objects.filter(
+        class_date__in=Classes.objects.filter(pk=class_id).values('class_date')
+    ).update(version=F('version') + 1)
+
+
+def _schedule_versions_query(start, end):
+    days = ScheduleDay.objects.order_by('class_date')
+    if start is not None:
+        days = days.filter(class_date__gte=start)
+    if end is not None:
+        days = days.filter(class_date__lte=end)
+    return days.values_list('class_date', 'version')
+
+
+def schedule_versions(start=None, end=None):
+    """(day, version) pairs for every day between start and end that has ever had classes."""
+    return list(_schedule_versions_query(start, end))
+
+
+async def aschedule_versions(start=None, end=None):
+    return [row async for row in _schedule_versions_query(start, end)]
+
+
+def schedule_etag(start=None, end=None, user=None, versions=None, resource=None):
+    """
+    Strong ETag for the schedule between start and end (inclusive, either may be None).
+
+    Day rows are never deleted and versions only go up, so the list of
+    (day, version) pairs identifies the schedule contents for the range. The
+    user is mixed in because responses carry their is_booked flags; their own
+    bookings bump the day version like anyone else's. `resource` keeps tags of
+    other views of the same days (e.g. the month summary) distinct.
+    """
+    if versions is None:
+        versions = schedule_versions(start, end)
+    user_id = user.pk if user is not None and user.is_authenticated else None
+    digest = hashlib.sha1(f"{start}|{end}|{user_id}".encode())
+    if resource:
+        digest.update(f"|{resource}".encode())
+    for day, version in versions:
+        digest.update(f"|{day.isoformat()}:{version}".encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def schedule_summary(start, end):
+    """
+    Per-day class count, total capacity and booked seats between start and end.
+
+    One GROUP BY class_date over classes_date_time_idx (class_date leads it),
+    summing the seats_booked counters rather than counting booking rows.
+    """
+    return list(
+        Classes.objects.filter(class_date__range=(start, end))
+        .order_by('class_date')
+        .values('class_date')
+        .annotate(classes=Count('classId'), capacity=Sum('capacity'), booked=Sum('seats_booked'))
+    )
+
+
+# ----------------------------
+# Timetable
+# ----------------------------
+def generate_timetable(start, end, templates=None):
+    """
+    Expand weekly ClassTemplates into dated Classes rows from start to end (inclusive).
+
+    All new rows go in with one bulk_create. Each template's end time is worked
+    out once rather than in every Classes.save(). Dates a template already has
+    are skipped. The unique (template, class_date) constraint plus
+    ignore_conflicts also covers a concurrent run, so re-running is a no-op.
+    bulk_create sends no signals, so the new days' schedule versions are bumped
+    here in two statements, and the weeks' attendance rollups are recounted.
+    Returns the number of classes added.
+    """
+    if templates is None:
+        templates = ClassTemplate.objects.filter(is_active=True)
+    templates = list(templates)
+    existing = set(
+        Classes.objects.filter(template__in=templates, class_date__range=(start, end))
+        .values_list('template_id', 'class_date')
+    )
+
+    new = []
+    for template in templates:
+        end_time = (datetime.combine(start, template.start_time) + template.duration).time()
+        day = start + timedelta(days=(template.weekday - start.weekday()) % 7)
+        while day <= end:
+            if (template.pk, day) not in existing:
+                new.append(Classes(
+                    template=template, class_name=template.class_name,
+                    class_description=template.class_description, instructor_name=template.instructor_name,
+                    class_date=day, class_start_time=template.start_time, class_end_time=end_time,
+                    capacity=template.capacity,
+                ))
+            day += timedelta(days=7)
+    if not new:
+        return 0
+
+    days = {klass.class_date for klass in new}
+    with transaction.atomic():
+        Classes.objects.bulk_create(new, batch_size=1000, ignore_conflicts=True)
+        ScheduleDay.objects.bulk_create([ScheduleDay(class_date=day) for day in days], ignore_conflicts=True)
+        ScheduleDay.objects.filter(class_date__in=days).update(version=F('version') + 1)
+        # ignore_conflicts hides which rows went in, so recount the weeks rather than add deltas.
+        _rebuild_rollup_weeks(week_of(min(days)), week_of(max(days)) + timedelta(days=6))
+    return len(new)
+
+
+# ----------------------------
+# Memberships
+# ----------------------------
+def recompute_expirations(memberships=None, chunk_size=500):
+    """
+    Recompute expirationDate for every member with a startDate, without calling save().
+
+    Members are grouped by membership type; within a type, each chunk of distinct
+    start dates becomes one UPDATE ... SET expirationDate = CASE startDate ... END.
+    The number of statements depends on how many distinct start dates there are,
+    not on how many members. Yields (membership, rows updated) after each chunk.
+    """
+    for membership, months in MEMBERSHIP_MONTHS.items():
+        if memberships and membership not in memberships:
+            continue
+
+        members = userModel.objects.filter(membershipName=membership, startDate__isnull=False)
+        start_dates = list(members.order_by('startDate').values_list('startDate', flat=True).distinct())
+        for i in range(0, len(start_dates), chunk_size):
+            chunk = start_dates[i:i + chunk_size]
+            expiration = Case(
+                *[When(startDate=start, then=Value(start + relativedelta(months=months))) for start in chunk],
+                output_field=DateField(),
+            )
+            yield membership, members.filter(startDate__in=chunk).update(expirationDate=expiration)
+
+
+def deactivate_expired(today=None, batch_size=1000):
+    """Set is_active=False on non-staff members whose membership has expired. Yields the running total."""
+    today = today or timezone.localdate()
+    expired = userModel.objects.filter(is_active=True, is_staff=False, expirationDate__lt=today)
+    total = 0
+    while True:
+        ids = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        total += userModel.objects.filter(pk__in=ids).update(is_active=False)
+        yield total
+
+
+# ----------------------------
+# Credits
+# ----------------------------
+def add_credits(user, amount, reason=CreditLedger.Reason.GRANT, class_id=None):
+    """Append a ledger entry and move the materialized balance with it, atomically."""
+    with transaction.atomic():
+        CreditLedger.objects.create(user_id=user.pk, delta=amount, reason=reason, klass_id=class_id)
+        userModel.objects.filter(pk=user.pk).update(credit_balance=F('credit_balance') + amount)
+
+
+def _ledger_sums():
+    return Coalesce(
+        Subquery(
+            CreditLedger.objects.filter(user=OuterRef('pk'))
+            .values('user').annotate(total=Sum('delta')).values('total')
+        ),
+        0,
+    )
+
+
+def credit_mismatches():
+    """Members whose credit_balance differs from their ledger, found in one aggregate query."""
+    return (
+        userModel.objects.annotate(ledger_balance=_ledger_sums())
+        .exclude(credit_balance=F('ledger_balance'))
+        .values('pk', 'email', 'credit_balance', 'ledger_balance')
+    )
+
+
+def reset_balances_from_ledger(users=None):
+    """Rewrite every credit_balance (or just those of `users`, a queryset) from the ledger in a single UPDATE."""
+    users = userModel.objects.all() if users is None else users
+    return users.update(credit_balance=_ledger_sums())
+
+
+# ----------------------------
+# Attendance rollups
+# ----------------------------
+ROLLUP_FIELDS = ('instructor_name', 'class_date', 'class_start_time')
+
+
+def week_of(day):
+    """The Monday of day's week; rollup rows are keyed by it."""
+    return day - timedelta(days=day.weekday())
+
+
+def _rollup_keys(klass):
+    # The rows a class (a dict of ROLLUP_FIELDS) counts towards.
+    week = week_of(klass['class_date'])
+    return (
+        (InstructorWeek, {'week': week, 'instructor_name': klass['instructor_name']}),
+        (TimeSlotWeek, {'week': week, 'weekday': klass['class_date'].weekday(), 'start_time': klass['class_start_time']}),
+    )
+
+
+def add_to_rollups(klass, classes=0, capacity=0, booked=0):
+    """
+    Move the InstructorWeek and TimeSlotWeek rows a class counts towards by the given amounts.
+
+    Usually one UPDATE per table. The first class in a week or slot creates
+    its row, the same way bump_schedule_version does.
+    """
+    amounts = {'classes': classes, 'capacity': capacity, 'booked': booked}
+    changes = {name: F(name) + amount for name, amount in amounts.items() if amount}
+    if not changes:
+        return
+    for model, key in _rollup_keys(klass):
+        if model.objects.filter(**key).update(**changes):
+            continue
+        _, created = model.objects.get_or_create(**key, defaults=amounts)
+        if not created:
+            model.objects.filter(**key).update(**changes)
+
+
+def add_booking_to_rollups(class_id, booked):
+    """Count a booking (+1) or cancellation (-1) of class_id in its rollups."""
+    klass = Classes.objects.filter(pk=class_id).values(*ROLLUP_FIELDS).first()
+    if klass is not None:
+        add_to_rollups(klass, booked=booked)
+
+
+def move_class_rollups(class_id, before, after):
+    """
+    Count a class that was created (before is None), edited or deleted (after is None).
+
+    before and after hold ROLLUP_FIELDS and capacity. A deleted class's bookings
+    are uncounted by their own delete signals, which run first. A class that
+    moves to another week, slot or instructor takes its booked seats along.
+    """
+    if before is not None and after is not None and all(before[f] == after[f] for f in ROLLUP_FIELDS):
+        add_to_rollups(after, capacity=after['capacity'] - before['capacity'])
+        return
+    booked = BookedClasses.objects.filter(clasId_id=class_id).count() if before and after else 0
+    if before is not None:
+        add_to_rollups(before, classes=-1, capacity=-before['capacity'], booked=-booked)
+    if after is not None:
+        add_to_rollups(after, classes=1, capacity=after['capacity'], booked=booked)
+
+
+def _rebuild_rollup_weeks(first, last):
+    """Recount the rollup rows for the days first..last (whole weeks) from classes and bookings."""
+    totals = {InstructorWeek: defaultdict(lambda: [0, 0, 0]), TimeSlotWeek: defaultdict(lambda: [0, 0, 0])}
+
+    def count(row, position, *amounts):
+        for model, key in _rollup_keys(row):
+            counts = totals[model][tuple(key.items())]
+            for offset, amount in enumerate(amounts):
+                counts[position + offset] += amount
+
+    classes = (
+        Classes.objects.filter(class_date__range=(first, last)).order_by().values(*ROLLUP_FIELDS)
+        .annotate(classes=Count('pk'), capacity=Sum('capacity'))
+    )
+    for row in classes:
+        count(row, 0, row['classes'], row['capacity'])
+    bookings = (
+        BookedClasses.objects.filter(clasId__class_date__range=(first, last)).order_by()
+        .values(**{field: F(f'clasId__{field}') for field in ROLLUP_FIELDS})
+        .annotate(booked=Count('pk'))
+    )
+    for row in bookings:
+        count(row, 2, row['booked'])
+
+    for model, rows in totals.items():
+        model.objects.filter(week__range=(first, last)).delete()
+        model.objects.bulk_create([
+            model(**dict(key), classes=classes, capacity=capacity, booked=booked)
+            for key, (classes, capacity, booked) in rows.items()
+        ], batch_size=1000)
+
+
+def rebuild_attendance_rollups(start=None, end=None, weeks_per_chunk=8):
+    """
+    Recount InstructorWeek and TimeSlotWeek from the classes and bookings tables.
+
+    Covers the weeks from start to end, or every week with classes. Work goes
+    a chunk of weeks at a time, one transaction per chunk. Each chunk costs
+    two GROUP BY queries over its dates, and the chunk's rows are replaced.
+    Memory is bounded by one chunk's classes, not by the booking history.
+    Yields (first day, last day) after each chunk.
+    """
+    if start is None or end is None:
+        bounds = Classes.objects.aggregate(first=Min('class_date'), last=Max('class_date'))
+        if start is None and end is None:
+            # Rows for weeks that no longer have classes.
+            for model in (InstructorWeek, TimeSlotWeek):
+                rows = model.objects.all()
+                if bounds['first'] is not None:
+                    rows = rows.exclude(week__range=(week_of(bounds['first']), week_of(bounds['last'])))
+                rows.delete()
+        start, end = start or bounds['first'], end or bounds['last']
+        if start is None or end is None:
+            return
+
+    first, last = week_of(start), week_of(end) + timedelta(days=6)
+    while first <= last:
+        chunk_end = min(first + timedelta(weeks=weeks_per_chunk, days=-1), last)
+        with transaction.atomic():
+            _rebuild_rollup_weeks(first, chunk_end)
+        yield first, chunk_end
+        first = chunk_end + timedelta(days=1)
+
+
+def _fill_rate(row):
+    return {**row, 'fill_rate': round(row['booked'] / row['capacity'], 3) if row['capacity'] > 0 else None}
+
+
+def instructor_weeks(start, end, instructor=None):
+    """
+    Classes, capacity, booked seats and fill rate per instructor per week, for
+    the weeks holding start..end. Reads InstructorWeek only, so the cost follows
+    the number of weeks and instructors, not the number of bookings.
+    """
+    rows = InstructorWeek.objects.filter(week__range=(week_of(start), week_of(end)))
+    if instructor:
+        rows = rows.filter(instructor_name=instructor)
+    rows = rows.order_by('week', 'instructor_name').values('week', 'instructor_name', 'classes', 'capacity', 'booked')
+    return [_fill_rate(row) for row in rows]
+
+
+def popular_time_slots(start, end, limit=None):
+    """Weekday and start time slots by booked seats over the weeks holding start..end, from TimeSlotWeek."""
+    rows = (
+        TimeSlotWeek.objects.filter(week__range=(week_of(start), week_of(end)))
+        .values('weekday', 'start_time')
+        .annotate(classes=Sum('classes'), capacity=Sum('capacity'), booked=Sum('booked'))
+        .order_by('-booked', 'weekday', 'start_time')
+    )
+    return [_fill_rate(row) for row in (rows[:limit] if limit else rows)]
@@ -0,0 +1,101 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from . import search
+from .availability import publish_class
+from .middleware import record_query
+from .models import MEMBERSHIP_CREDITS, BookedClasses, Classes, userModel
+from .services import (
+    ROLLUP_FIELDS, add_booking_to_rollups, add_credits, bump_schedule_version, bump_schedule_version_for_class,
+    move_class_rollups,
+)
+
+
+# ----------------------------
+# Database connections
+# ----------------------------
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    for pragma, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        connection.connection.execute(f"PRAGMA {pragma} = {value}")
+
+
+@receiver(connection_created)
+def measure_queries(sender, connection, **kwargs):
+    # Fires again on reconnect; the wrapper list lives on the DatabaseWrapper, so add it once.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    if sender.name == 'userAPI':
+        search.restore_triggers(connections[using])
+
+
+# ----------------------------
+# Classes
+# ----------------------------
+def _rollup_values(instance):
+    # Field values as the database stores them; an unsaved instance may still hold the "12:00:00" default.
+    return {
+        name: Classes._meta.get_field(name).to_python(getattr(instance, name))
+        for name in (*ROLLUP_FIELDS, 'capacity')
+    }
+
+
+@receiver(pre_save, sender=Classes)
+def remember_previous_class(sender, instance, **kwargs):
+    # Moving a class changes the schedule of the day it left as well, and the rollups it counted towards.
+    instance._previous_class = None
+    if instance.pk is not None:
+        instance._previous_class = (
+            Classes.objects.filter(pk=instance.pk).values(*ROLLUP_FIELDS, 'capacity').first()
+        )
+
+
+@receiver(post_save, sender=Classes)
+def class_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_class', None)
+    bump_schedule_version(instance.class_date, previous and previous['class_date'])
+    move_class_rollups(instance.pk, previous, _rollup_values(instance))
+
+
+@receiver(post_delete, sender=Classes)
+def class_deleted(sender, instance, **kwargs):
+    bump_schedule_version(instance.class_date)
+    move_class_rollups(instance.pk, _rollup_values(instance), None)
+
+
+# ----------------------------
+# Booked Classes
+# ----------------------------
+@receiver(post_save, sender=BookedClasses)
+def booking_saved(sender, instance, created, using, **kwargs):
+    if created:
+        bump_schedule_version_for_class(instance.clasId_id)
+        add_booking_to_rollups(instance.clasId_id, 1)
+        transaction.on_commit(partial(publish_class, instance.clasId_id), using=using)
+
+
+@receiver(post_delete, sender=BookedClasses)
+def booking_deleted(sender, instance, using, **kwargs):
+    bump_schedule_version_for_class(instance.clasId_id)
+    add_booking_to_rollups(instance.clasId_id, -1)
+    transaction.on_commit(partial(publish_class, instance.clasId_id), using=using)
+
+
+# ----------------------------
+# Users
+# ----------------------------
+@receiver(post_save, sender=userModel)
+def grant_starting_credits(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.membershipName in MEMBERSHIP_CREDITS:
+        add_credits(instance, MEMBERSHIP_CREDITS[instance.membershipName])
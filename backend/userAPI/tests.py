@@ -1,3 +1,1771 @@
-from django.test import TestCase
+import asyncio
+import csv
+import importlib
+import json
+import threading
+import time
+import tracemalloc
+from unittest import mock
+from datetime import date, time as dtime, timedelta
+from io import StringIO
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection, connections
+from django.db.models import Count, F, Sum
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from NinjadtaoApp.asgi import application as asgi_application
+from NinjadtaoApp.routers import PrimaryReplicaRouter, ReplicaStickinessMiddleware
+
+from . import asyncviews, availability, blacklist, exports, idempotency, metrics, schedule_cache, search
+from .middleware import RequestMetricsMiddleware
+from .bench import ASGIStream, compare_to_baseline, run_write_contention
+from .asyncviews import AsyncAuthView, AsyncClassesView
+from .authentication import StatelessJWTAuthentication
+from .serializer import EmailTokenObtainPairSerializer
+from .views import BookingView
+from .models import (
+    BlacklistedToken, BookedClasses, Classes, ClassTemplate, CreditLedger, IdempotencyKey, InstructorWeek, Membership,
+    ScheduleDay, TimeSlotWeek, Weekday, userModel,
+)
+from .services import (
+    book_class, booking_conflicts, cancel_booking, credit_mismatches, deactivate_expired, generate_timetable,
+    overlapping_booking, rebuild_attendance_rollups, recompute_expirations,
+)
+from .hashers import TunablePBKDF2PasswordHasher
+from .pagination import EstimatedCountPaginator
+from .exceptions import AlreadyBooked, ClassFull, OutOfCredits, TimeConflict
+
+
+def make_user(email, password=None, **extra):
+    return userModel.objects.create_user(email=email, password=password, first_name="Test", last_name="User", **extra)
+
+
+def login_client(email, password):
+    """An APIClient carrying the access token the login endpoint issues, as a real client would."""
+    client = APIClient()
+    response = client.post("/api/v1.0/user/login/", {"email": email, "password": password}, format="json")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+    return client
+
+
+def make_class(**extra):
+    fields = {
+        "class_name": "Muay Thai",
+        "class_description": "Fundamentals",
+        "class_date": date(2026, 1, 5),
+        "class_start_time": dtime(18, 0),
+        "instructor_name": "Kru Dan",
+    }
+    fields.update(extra)
+    return Classes.objects.create(**fields)
+
+
+# ----------------------------
+# Booking
+# ----------------------------
+class BookingTests(TestCase):
+    def setUp(self):
+        self.user = make_user("member@example.com")
+        self.klass = make_class(capacity=1)
+
+    def test_book_and_cancel_moves_seat_counter(self):
+        book_class(self.user, self.klass.pk)
+        self.klass.refresh_from_db()
+        self.assertEqual(self.klass.seats_booked, 1)
+
+        cancel_booking(self.user, self.klass.pk)
+        self.klass.refresh_from_db()
+        self.assertEqual(self.klass.seats_booked, 0)
+        self.assertFalse(BookedClasses.objects.exists())
+
+    def test_full_class_is_rejected(self):
+        book_class(self.user, self.klass.pk)
+        with self.assertRaises(ClassFull):
+            book_class(make_user("late@example.com"), self.klass.pk)
+
+    def test_double_booking_is_rejected_and_seat_released(self):
+        self.klass.capacity = 5
+        self.klass.save()
+        book_class(self.user, self.klass.pk)
+        with self.assertRaises(AlreadyBooked):
+            book_class(self.user, self.klass.pk)
+        self.klass.refresh_from_db()
+        self.assertEqual(self.klass.seats_booked, 1)
+
+    def test_booking_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post("/api/v1.0/user/book/", {"clasId": self.klass.pk}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+        response = client.post("/api/v1.0/user/book/", {"clasId": self.klass.pk}, format="json")
+        self.assertEqual(response.status_code, 409)
+
+
+class OverlapTests(TestCase):
+    def setUp(self):
+        self.user = make_user("member@example.com")
+        self.evening = make_class(class_start_time=dtime(18, 0))  # 18:00-19:00
+
+    def test_overlapping_class_is_rejected_and_rolled_back(self):
+        book_class(self.user, self.evening.pk)
+        overlapping = make_class(class_name="Boxing", class_start_time=dtime(18, 30))
+        with self.assertRaises(TimeConflict) as raised:
+            book_class(self.user, overlapping.pk)
+        self.assertIn("Muay Thai", str(raised.exception.detail))
+        overlapping.refresh_from_db()
+        self.assertEqual(overlapping.seats_booked, 0)
+        self.assertEqual(BookedClasses.objects.count(), 1)
+
+    def test_back_to_back_and_other_days_are_allowed(self):
+        book_class(self.user, self.evening.pk)
+        book_class(self.user, make_class(class_start_time=dtime(19, 0)).pk)
+        book_class(self.user, make_class(class_date=date(2026, 1, 6), class_start_time=dtime(18, 0)).pk)
+        book_class(make_user("other@example.com"), make_class(class_start_time=dtime(18, 0)).pk)
+        self.assertEqual(BookedClasses.objects.filter(userId=self.user).count(), 3)
+
+    def test_class_running_past_midnight_blocks_the_rest_of_its_day(self):
+        book_class(self.user, make_class(class_start_time=dtime(23, 30)).pk)  # ends 00:30
+        with self.assertRaises(TimeConflict):
+            book_class(self.user, make_class(class_start_time=dtime(23, 45)).pk)
+
+    def test_check_is_one_query(self):
+        book_class(self.user, self.evening.pk)
+        candidate = make_class(class_start_time=dtime(18, 59))
+        with self.assertNumQueries(1):
+            self.assertEqual(overlapping_booking(self.user, candidate.pk), "Muay Thai")
+
+    def test_member_is_locked_before_the_booking_is_written(self):
+        with CaptureQueriesContext(connection) as queries:
+            book_class(self.user, self.evening.pk)
+        statements = [q["sql"] for q in queries.captured_queries]
+        lock = next(i for i, sql in enumerate(statements)
+                    if sql.startswith("SELECT") and userModel._meta.db_table in sql.split("WHERE")[0])
+        insert = next(i for i, sql in enumerate(statements) if sql.startswith("INSERT"))
+        self.assertLess(lock, insert)
+
+    def test_sweep_finds_existing_conflicts(self):
+        # Rows from before the check existed, written straight to the table.
+        other = make_user("other@example.com")
+        classes = [
+            make_class(class_start_time=dtime(18, 0), class_end_time=dtime(20, 0)),
+            make_class(class_start_time=dtime(18, 30)),
+            make_class(class_start_time=dtime(19, 0)),
+            make_class(class_start_time=dtime(20, 0)),
+        ]
+        bookings = [BookedClasses.objects.create(userId=self.user, clasId=c) for c in classes]
+        BookedClasses.objects.create(userId=other, clasId=classes[1])
+        BookedClasses.objects.create(userId=other, clasId=classes[3])
+
+        pairs = {(first["pk"], second["pk"]) for first, second in booking_conflicts(chunk_size=2)}
+        self.assertEqual(pairs, {
+            (bookings[0].pk, bookings[1].pk), (bookings[0].pk, bookings[2].pk), (bookings[1].pk, bookings[2].pk),
+        })
+
+        out = StringIO()
+        call_command("find_booking_conflicts", stdout=out)
+        self.assertIn("member@example.com on 2026-01-05: Muay Thai 18:00-20:00", out.getvalue())
+        self.assertIn("3 overlapping pairs", out.getvalue())
+
+
+class IdempotencyTests(TestCase):
+    url = "/api/v1.0/user/book/"
+
+    def setUp(self):
+        self.user = make_user("member@example.com")
+        self.klass = make_class(capacity=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def book(self, key="tap-1", class_id=None):
+        return self.client.post(self.url, {"clasId": class_id or self.klass.pk}, format="json", HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_without_touching_bookings(self):
+        first = self.book()
+        self.assertEqual(first.status_code, 200)
+
+        with CaptureQueriesContext(connection) as queries:
+            retry = self.book()
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("bookedclasses", queries[0]["sql"].lower())
+        self.assertEqual(BookedClasses.objects.count(), 1)
+
+    def test_errors_are_replayed_and_keys_are_per_request(self):
+        book_class(make_user("first@example.com"), self.klass.pk)
+        self.assertEqual(self.book().status_code, 409)  # full
+        cancel_booking(userModel.objects.get(email="first@example.com"), self.klass.pk)
+        self.assertEqual(self.book().status_code, 409)  # same key: same answer
+        self.assertEqual(self.book(key="tap-2").status_code, 200)
+
+        self.assertEqual(self.book(key="tap-2", class_id=make_class().pk).status_code, 422)
+        self.assertEqual(self.book(key="x" * 256).status_code, 400)
+
+    def test_failure_after_booking_rolls_back_and_releases_the_key(self):
+        def book_then_crash(user, class_id):
+            book_class(user, class_id)
+            raise RuntimeError("worker died")
+
+        with mock.patch("userAPI.views.book_class", side_effect=book_then_crash):
+            with self.assertRaises(RuntimeError):
+                self.book()
+        self.assertFalse(BookedClasses.objects.exists())
+        self.assertEqual(Classes.objects.get(pk=self.klass.pk).seats_booked, 0)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.book().status_code, 200)
+
+    @override_settings(IDEMPOTENCY_WAIT=0)
+    def test_abandoned_claims_lapse(self):
+        # What a worker killed mid-request leaves behind: a claim with no response.
+        request = SimpleNamespace(method="POST", path=self.url, data={"clasId": self.klass.pk})
+        record = IdempotencyKey.objects.create(
+            user=self.user, key="tap-1", request_hash=idempotency._fingerprint(request),
+            expires_at=timezone.now() + timedelta(seconds=30),
+        )
+        self.assertEqual(self.book().status_code, 409)  # may still be running
+
+        IdempotencyKey.objects.filter(pk=record.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.book().status_code, 200)
+        stored = IdempotencyKey.objects.get(user=self.user, key="tap-1")
+        self.assertEqual(stored.status_code, 200)
+        self.assertGreater(stored.expires_at, timezone.now() + timedelta(hours=23))
+
+    def test_a_lapsed_claim_cannot_commit_over_its_successor(self):
+        def book_after_takeover(user, class_id):
+            # Our claim lapsed while we ran and another retry took the key over.
+            IdempotencyKey.objects.filter(key="tap-1").update(status_code=200, response_body="{}")
+            return book_class(user, class_id)
+
+        with mock.patch("userAPI.views.book_class", side_effect=book_after_takeover):
+            self.assertEqual(self.book().status_code, 409)
+        self.assertFalse(BookedClasses.objects.exists())
+
+    def test_expired_keys_are_pruned(self):
+        self.book()
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        call_command("prune_idempotency_keys", stdout=StringIO())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+# ----------------------------
+# Authentication
+# ----------------------------
+class StatelessAuthTests(TestCase):
+    url = "/api/v1.0/user/auth/"
+
+    def setUp(self):
+        self.user = make_user("member@example.com", password="pass1234", membershipName=Membership.Ten_Credits)
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post("/api/v1.0/user/login/", {"email": self.user.email, "password": "pass1234"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def profile_queries(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_claims_token_skips_user_lookup(self):
+        # Per-request query count on /auth/: legacy tokens load the user, claims tokens don't.
+        legacy, legacy_queries = self.profile_queries(RefreshToken.for_user(self.user).access_token)
+        claims, claims_queries = self.profile_queries(self.login()["access"])
+
+        self.assertEqual(legacy_queries, 2)
+        self.assertEqual(claims_queries, 1)
+        self.assertEqual(legacy.data, claims.data)
+        self.assertEqual(claims.data["membership_name"], "10 Credits")
+
+    def test_refresh_picks_up_profile_changes(self):
+        refresh = self.login()["refresh"]
+        self.user.first_name = "Renamed"
+        self.user.save()
+
+        response = self.client.post("/api/token/refresh/", {"refresh": refresh}, format="json")
+        self.assertEqual(response.status_code, 200)
+        profile, _ = self.profile_queries(response.data["access"])
+        self.assertEqual(profile.data["first_name"], "Renamed")
+
+    def test_staff_flags_come_from_the_token(self):
+        self.user.is_staff = True
+        self.user.save()
+        access = AccessToken(self.login()["access"])
+        self.assertTrue(access["is_staff"])
+        self.assertFalse(access["is_superuser"])
+
+        user = StatelessJWTAuthentication().get_user(access)
+        with self.assertNumQueries(0):
+            self.assertTrue(user.is_staff)
+            self.assertFalse(user.is_superuser)
+
+        # Tokens from before the claims existed read the flags from the user row.
+        del access["is_staff"]
+        with self.assertNumQueries(1):
+            self.assertTrue(StatelessJWTAuthentication().get_user(access).is_staff)
+
+    def test_deactivation_takes_effect_when_the_access_token_expires(self):
+        tokens = self.login()
+        self.user.is_active = False
+        self.user.save()
+
+        # The claims token is still honoured until it expires...
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        self.assertEqual(self.client.post(self.url).status_code, 200)
+        # ...but can't be renewed, and a new login is refused.
+        self.client.credentials()
+        self.assertEqual(self.client.post("/api/token/refresh/", {"refresh": tokens["refresh"]}, format="json").status_code, 401)
+        response = self.client.post("/api/v1.0/user/login/", {"email": self.user.email, "password": "pass1234"}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_refresh_rejects_inactive_user(self):
+        refresh = self.login()["refresh"]
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.post("/api/token/refresh/", {"refresh": refresh}, format="json")
+        self.assertEqual(response.status_code, 401)
+
+
+class BookingHistoryTests(TestCase):
+    url = "/api/v1.0/user/auth/"
+
+    def setUp(self):
+        self.user = make_user("member@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        today = timezone.localdate()
+        for offset in range(-5, 5):
+            book_class(self.user, make_class(class_date=today + timedelta(days=offset), class_name=f"Class {offset}").pk)
+
+    def test_upcoming_and_past_are_split_and_embed_the_class(self):
+        upcoming = self.client.post(self.url).data
+        past = self.client.post(self.url + "?bookings=past").data
+        self.assertEqual(len(upcoming["booked_classes"]), 5)
+        self.assertEqual(len(past["booked_classes"]), 5)
+        self.assertIn("instructor_name", upcoming["booked_classes"][0]["clasId"])
+        self.assertEqual(upcoming["email"], self.user.email)
+
+    def test_cursor_walks_every_booking_once(self):
+        seen = []
+        url = self.url + "?bookings=past&page_size=2"
+        while url:
+            with self.assertNumQueries(1):
+                data = self.client.post(url).data
+            seen += [row["id"] for row in data["booked_classes"]]
+            url = data["next"]
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+
+class BlacklistTests(TestCase):
+    def setUp(self):
+        blacklist.reset_filter()
+        self.user = make_user("member@example.com")
+        self.client = APIClient()
+
+    def refresh(self, token):
+        return self.client.post("/api/token/refresh/", {"refresh": str(token)}, format="json")
+
+    def test_rotated_token_cannot_be_reused(self):
+        token = RefreshToken.for_user(self.user)
+        first = self.refresh(token)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.refresh(token).status_code, 401)
+        self.assertEqual(self.refresh(first.data["refresh"]).status_code, 200)
+
+    def test_not_revoked_refresh_does_not_read_blacklist(self):
+        blacklist._local_filter()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.refresh(RefreshToken.for_user(self.user)).status_code, 200)
+        table = BlacklistedToken._meta.db_table
+        reads = [q["sql"] for q in queries if table in q["sql"] and q["sql"].startswith("SELECT")]
+        self.assertEqual(reads, [])
+
+    def test_logout_revokes_refresh_token(self):
+        token = RefreshToken.for_user(self.user)
+        response = self.client.post("/api/v1.0/user/logout/", {"refresh": str(token)}, format="json")
+        self.assertEqual(response.status_code, 205)
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_prune_only_removes_expired(self):
+        now = timezone.now()
+        BlacklistedToken.objects.create(jti="old", expires_at=now - timedelta(days=1))
+        BlacklistedToken.objects.create(jti="live", expires_at=now + timedelta(days=1))
+        call_command("prune_token_blacklist", stdout=StringIO())
+        self.assertEqual(list(BlacklistedToken.objects.values_list("jti", flat=True)), ["live"])
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = blacklist.BloomFilter(capacity=1000, error_rate=0.01)
+        items = [f"jti-{i}" for i in range(1000)]
+        for item in items:
+            bloom.add(item)
+        self.assertTrue(all(item in bloom for item in items))
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class CreditTests(TestCase):
+    def setUp(self):
+        self.user = make_user("credits@example.com", membershipName=Membership.Ten_Credits)
+        self.klass = make_class()
+
+    def balance(self):
+        return userModel.objects.get(pk=self.user.pk).credit_balance
+
+    def test_new_credit_member_gets_their_pack(self):
+        self.assertEqual(self.balance(), 10)
+        self.assertEqual(make_user("monthly@example.com").credit_balance, 0)
+
+    def test_booking_spends_and_cancel_refunds(self):
+        book_class(self.user, self.klass.pk)
+        self.assertEqual(self.balance(), 9)
+        cancel_booking(self.user, self.klass.pk)
+        self.assertEqual(self.balance(), 10)
+        self.assertEqual(
+            list(CreditLedger.objects.filter(user=self.user).values_list("delta", flat=True).order_by("id")),
+            [10, -1, 1],
+        )
+
+    def test_out_of_credits_rolls_back_seat_and_booking(self):
+        userModel.objects.filter(pk=self.user.pk).update(credit_balance=0)
+        with self.assertRaises(OutOfCredits):
+            book_class(self.user, self.klass.pk)
+        self.klass.refresh_from_db()
+        self.assertEqual(self.klass.seats_booked, 0)
+        self.assertFalse(BookedClasses.objects.exists())
+
+    def test_membership_is_read_from_the_row_not_the_token(self):
+        self.user.set_password("pass1234")
+        self.user.save()
+        client = login_client(self.user.email, "pass1234")  # the token says 10 Credits
+        userModel.objects.filter(pk=self.user.pk).update(membershipName=Membership.Monthly, credit_balance=0)
+        response = client.post("/api/v1.0/user/book/", {"clasId": self.klass.pk}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.balance(), 0)
+
+        monthly = make_user("monthly@example.com", password="pass1234")
+        client = login_client(monthly.email, "pass1234")  # the token says Monthly
+        userModel.objects.filter(pk=monthly.pk).update(membershipName=Membership.Twenty_Credits, credit_balance=2)
+        response = client.post("/api/v1.0/user/book/", {"clasId": self.klass.pk}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(userModel.objects.get(pk=monthly.pk).credit_balance, 1)
+
+    def test_reconcile_finds_and_fixes_drift(self):
+        userModel.objects.filter(pk=self.user.pk).update(credit_balance=3)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(credit_mismatches()), 1)
+        call_command("reconcile_credits", "--fix", stdout=StringIO())
+        self.assertEqual(self.balance(), 10)
+        self.assertEqual(len(credit_mismatches()), 0)
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class LoginProtectionTests(TestCase):
+    url = "/api/v1.0/user/login/"
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user("member@example.com", password="s3cret-pass")
+
+    def login(self, email="member@example.com", password="s3cret-pass"):
+        return APIClient().post(self.url, {"email": email, "password": password}, format="json")
+
+    def test_login_rehashes_at_the_configured_cost(self):
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$1000$"))
+        with override_settings(PASSWORD_HASH_ITERATIONS=2000):
+            self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$2000$"))
+
+    def test_unknown_email_costs_one_hash_like_a_wrong_password(self):
+        with mock.patch.object(TunablePBKDF2PasswordHasher, "encode", autospec=True,
+                               side_effect=PBKDF2PasswordHasher.encode) as encode:
+            self.assertEqual(self.login(email="nobody@example.com").status_code, 400)
+            self.assertEqual(encode.call_count, 1)
+            self.assertEqual(self.login(password="wrong").status_code, 400)
+            self.assertEqual(encode.call_count, 2)
+
+    def test_throttled_attempts_never_reach_the_hasher(self):
+        rates = {"login_ip": "100/min", "login_email": "2/min"}
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": rates}):
+            self.assertEqual(self.login(password="wrong").status_code, 400)
+            self.assertEqual(self.login(email="MEMBER@example.com ", password="wrong").status_code, 400)
+            with mock.patch("userAPI.backends.EmailBackend.authenticate") as authenticate:
+                response = self.login()
+            self.assertEqual(response.status_code, 429)
+            authenticate.assert_not_called()
+            # Other accounts aren't affected by this one's limit.
+            self.assertEqual(self.login(email="other@example.com").status_code, 400)
+
+    def test_ip_throttle_covers_the_stock_token_view(self):
+        rates = {"login_ip": "1/min", "login_email": "100/min"}
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": rates}):
+            client = APIClient()
+            client.post("/api/token/", {"email": "a@example.com", "password": "x"}, format="json")
+            response = client.post("/api/token/", {"email": "b@example.com", "password": "x"}, format="json")
+        self.assertEqual(response.status_code, 429)
+
+    def test_ip_throttle_ignores_spoofed_forwarded_for(self):
+        rates = {"login_ip": "1/min", "login_email": "100/min"}
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": rates}):
+            client = APIClient()
+            client.post(self.url, {"email": "a@example.com", "password": "x"}, format="json",
+                        HTTP_X_FORWARDED_FOR="203.0.113.1")
+            response = client.post(self.url, {"email": "b@example.com", "password": "x"}, format="json",
+                                   HTTP_X_FORWARDED_FOR="203.0.113.2")
+        self.assertEqual(response.status_code, 429)
+
+    def test_non_object_bodies_are_rejected_not_crashed_on(self):
+        for body in (["member@example.com"], "member@example.com"):
+            self.assertEqual(APIClient().post(self.url, body, format="json").status_code, 400)
+
+
+# ----------------------------
+# Memberships
+# ----------------------------
+class MembershipSyncTests(TestCase):
+    def test_bulk_recompute_matches_save(self):
+        start = date(2026, 1, 31)
+        for i, membership in enumerate(Membership.values):
+            make_user(f"m{i}@example.com", membershipName=membership, startDate=start)
+        expected = dict(userModel.objects.values_list("email", "expirationDate"))
+        userModel.objects.update(expirationDate=None)
+
+        call_command("sync_memberships", stdout=StringIO())
+
+        self.assertEqual(dict(userModel.objects.values_list("email", "expirationDate")), expected)
+        self.assertEqual(userModel.objects.get(email="m0@example.com").expirationDate, date(2026, 2, 28))
+
+    def test_recompute_issues_one_update_per_chunk_of_start_dates(self):
+        for i in range(30):
+            make_user(f"m{i}@example.com", membershipName=Membership.Monthly, startDate=date(2026, 1, 1 + i % 3))
+        # One SELECT of distinct start dates per membership type, one UPDATE for Monthly.
+        with self.assertNumQueries(len(Membership.values) + 1):
+            updates = list(recompute_expirations())
+        self.assertEqual(updates, [(Membership.Monthly, 30)])
+
+    def test_deactivate_expired_skips_staff_and_current_members(self):
+        make_user("lapsed@example.com", startDate=date(2020, 1, 1))
+        make_user("current@example.com", startDate=timezone.localdate())
+        make_user("coach@example.com", startDate=date(2020, 1, 1), is_staff=True)
+
+        self.assertEqual(list(deactivate_expired(batch_size=1)), [1])
+        inactive = userModel.objects.filter(is_active=False).values_list("email", flat=True)
+        self.assertEqual(list(inactive), ["lapsed@example.com"])
+
+
+# ----------------------------
+# Schedule
+# ----------------------------
+class ScheduleTests(TestCase):
+    url = "/api/v1.0/user/classes/"
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.late = make_class(class_date=date(2026, 1, 5), class_start_time=dtime(19, 0))
+        self.early = make_class(class_date=date(2026, 1, 5), class_start_time=dtime(7, 0))
+        self.next_day = make_class(class_date=date(2026, 1, 6))
+        self.outside = make_class(class_date=date(2026, 2, 1))
+
+    def test_range_is_ordered_by_date_and_start_time(self):
+        response = self.client.get(self.url, {"start": "2026-01-05", "end": "2026-01-06"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["classId"] for row in response.data],
+            [self.early.pk, self.late.pk, self.next_day.pk],
+        )
+
+    def test_bad_ranges_are_rejected(self):
+        self.assertEqual(self.client.get(self.url, {"date": "not-a-date"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"start": "2026-01-06", "end": "2026-01-05"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"start": "2026-01-05"}).status_code, 400)
+
+    def test_unchanged_day_answers_not_modified(self):
+        first = self.client.get(self.url, {"date": "2026-01-05"})
+        etag = first["ETag"]
+
+        with self.assertNumQueries(1):
+            again = self.client.get(self.url, {"date": "2026-01-05"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(again.status_code, 304)
+
+        # A change on another day leaves this day's ETag alone.
+        self.outside.instructor_name = "Kru Bee"
+        self.outside.save()
+        self.assertEqual(self.client.get(self.url, {"date": "2026-01-05"}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_availability_fields(self):
+        user = make_user("member@example.com")
+        book_class(user, self.early.pk)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        rows = {row["classId"]: row for row in client.get(self.url, {"date": "2026-01-05"}).data}
+        self.assertEqual(rows[self.early.pk]["seats_booked"], 1)
+        self.assertEqual(rows[self.early.pk]["seats_left"], self.early.capacity - 1)
+        self.assertTrue(rows[self.early.pk]["is_booked"])
+        self.assertFalse(rows[self.late.pk]["is_booked"])
+
+        anonymous = self.client.get(self.url, {"date": "2026-01-05"}).data
+        self.assertFalse(any(row["is_booked"] for row in anonymous))
+
+    def test_query_count_does_not_grow_with_classes(self):
+        user = make_user("member@example.com")
+        client = APIClient()
+        client.force_authenticate(user)
+        for hour in range(8, 20):
+            book_class(user, make_class(class_date=date(2026, 3, 2), class_start_time=dtime(hour, 0)).pk)
+
+        # Version lookup + the user's booked ids, plus one SELECT of classes on a cache miss,
+        # whether one class or twelve come back.
+        for day, count in (("2026-01-06", 1), ("2026-03-02", 12)):
+            with self.assertNumQueries(3):
+                self.assertEqual(len(client.get(self.url, {"date": day}).data), count)
+            with self.assertNumQueries(2):
+                self.assertEqual(len(client.get(self.url, {"date": day}).data), count)
+
+    def test_bookings_and_edits_change_the_etag(self):
+        etag = self.client.get(self.url, {"date": "2026-01-05"})["ETag"]
+        book_class(make_user("member@example.com"), self.early.pk)
+        response = self.client.get(self.url, {"date": "2026-01-05"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response["ETag"]
+        self.outside.class_date = date(2026, 1, 5)
+        self.outside.save()
+        self.assertEqual(self.client.get(self.url, {"date": "2026-01-05"}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class TimetableTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.monday = ClassTemplate.objects.create(
+            class_name="Fundamentals", instructor_name="Kru Dan", weekday=Weekday.Monday,
+            start_time=dtime(23, 30), duration=timedelta(minutes=45), capacity=12,
+        )
+        self.friday = ClassTemplate.objects.create(
+            class_name="Sparring", instructor_name="Kru Bee", weekday=Weekday.Friday, start_time=dtime(18, 0),
+        )
+        ClassTemplate.objects.create(
+            class_name="Retired", instructor_name="Kru Lek", weekday=Weekday.Monday, start_time=dtime(7, 0),
+            is_active=False,
+        )
+
+    def test_generates_each_weekday_in_range(self):
+        # Wed 2026-01-07 .. Mon 2026-01-26: three Fridays, three Mondays.
+        # Templates, existing dates, then one INSERT each for classes and days, one UPDATE
+        # of versions and six statements recounting the weeks' attendance rollups inside a
+        # savepoint, however many weeks are generated.
+        with self.assertNumQueries(13):
+            self.assertEqual(generate_timetable(date(2026, 1, 7), date(2026, 1, 26)), 6)
+        mondays = Classes.objects.filter(template=self.monday).order_by("class_date")
+        self.assertEqual([c.class_date for c in mondays], [date(2026, 1, 12), date(2026, 1, 19), date(2026, 1, 26)])
+        self.assertEqual({(c.class_end_time, c.capacity) for c in mondays}, {(dtime(0, 15), 12)})
+        self.assertEqual(
+            set(Classes.objects.filter(template=self.friday).values_list("class_end_time", flat=True)), {dtime(19, 0)}
+        )
+        self.assertEqual(ScheduleDay.objects.filter(class_date__range=(date(2026, 1, 7), date(2026, 1, 26))).count(), 6)
+
+    def test_rerun_is_idempotent_and_fills_gaps(self):
+        generate_timetable(date(2026, 1, 5), date(2026, 1, 18))
+        Classes.objects.filter(template=self.friday, class_date=date(2026, 1, 9)).delete()
+        version = ScheduleDay.objects.get(class_date=date(2026, 1, 5)).version
+
+        self.assertEqual(generate_timetable(date(2026, 1, 5), date(2026, 1, 18)), 1)
+        self.assertEqual(generate_timetable(date(2026, 1, 5), date(2026, 1, 18)), 0)
+        self.assertEqual(Classes.objects.filter(template__isnull=False).count(), 4)
+        self.assertEqual(ScheduleDay.objects.get(class_date=date(2026, 1, 5)).version, version)
+
+        call_command("generate_timetable", "--start=2026-01-05", "--end=2026-01-18", stdout=StringIO())
+        self.assertEqual(Classes.objects.count(), 4)
+
+    def test_template_is_not_exposed_by_the_api(self):
+        generate_timetable(date(2026, 1, 5), date(2026, 1, 5))
+        row = APIClient().get("/api/v1.0/user/classes/", {"date": "2026-01-05"}).data[0]
+        self.assertNotIn("template", row)
+        self.assertEqual(row["class_name"], "Fundamentals")
+
+
+class ScheduleSummaryTests(TestCase):
+    url = "/api/v1.0/user/classes/summary/"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.early = make_class(class_date=date(2026, 1, 5), class_start_time=dtime(7, 0), capacity=10)
+        make_class(class_date=date(2026, 1, 5), class_start_time=dtime(18, 0), capacity=20)
+        make_class(class_date=date(2026, 1, 31), capacity=5)
+        make_class(class_date=date(2026, 2, 1))
+        book_class(make_user("member@example.com"), self.early.pk)
+
+    def test_month_is_summarised_per_day_in_one_aggregate(self):
+        with self.assertNumQueries(2):  # day versions + one GROUP BY
+            response = self.client.get(self.url, {"month": "2026-01"})
+        self.assertEqual(response.data, {"month": "2026-01", "days": [
+            {"date": "2026-01-05", "classes": 2, "capacity": 30, "booked": 1},
+            {"date": "2026-01-31", "classes": 1, "capacity": 5, "booked": 0},
+        ]})
+
+    def test_aggregate_uses_the_class_date_index(self):
+        query = Classes.objects.filter(class_date__range=(date(2026, 1, 1), date(2026, 1, 31)))
+        self.assertIn("classes_date_time_idx", query.values("class_date").annotate(n=Count("classId")).explain())
+
+    def test_etag_changes_with_bookings_in_the_month_only(self):
+        etag = self.client.get(self.url, {"month": "2026-01"})["ETag"]
+        self.assertNotEqual(etag, self.client.get("/api/v1.0/user/classes/", {"start": "2026-01-01", "end": "2026-01-31"})["ETag"])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url, {"month": "2026-01"}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        book_class(make_user("other@example.com"), Classes.objects.get(class_date=date(2026, 2, 1)).pk)
+        self.assertEqual(self.client.get(self.url, {"month": "2026-01"}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        book_class(make_user("third@example.com"), self.early.pk)
+        response = self.client.get(self.url, {"month": "2026-01"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["days"][0]["booked"], 2)
+
+    def test_bad_months_are_rejected(self):
+        for month in ("2026-13", "2026-1", "January", "2026/01"):
+            self.assertEqual(self.client.get(self.url, {"month": month}).status_code, 400)
+        self.assertEqual(self.client.get(self.url).data["month"], f"{timezone.localdate():%Y-%m}")
+
+    def test_calendar_edges(self):
+        for month, last in (("9999-12", "9999-12-31"), ("0001-01", "0001-01-31"), ("2028-02", "2028-02-29")):
+            make_class(class_date=date.fromisoformat(last))
+            response = self.client.get(self.url, {"month": month})
+            self.assertEqual(response.status_code, 200, month)
+            self.assertEqual(response.data["days"][-1]["date"], last)
+
+
+class SearchTests(TestCase):
+    url = "/api/v1.0/user/classes/search/"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.muay_thai = make_class(class_description="Fundamentals, gloves provided")
+        self.sparring = make_class(class_name="Sparring", class_description="Open mat", instructor_name="Kru Bee",
+                                   class_date=date(2026, 1, 6))
+        self.bjj = make_class(class_name="Brazilian Jiu Jitsu", instructor_name="Ana Souza", class_date=date(2026, 2, 2))
+
+    def found(self, text="", instructor="", **dates):
+        return list(search.search_classes(text, instructor, **dates).values_list("pk", flat=True))
+
+    def test_every_word_matches_as_a_prefix_in_any_column(self):
+        self.assertEqual(search.backend(connection.alias), "fts5")
+        self.assertEqual(self.found("muay th"), [self.muay_thai.pk])
+        self.assertEqual(self.found("GLOVES"), [self.muay_thai.pk])
+        self.assertEqual(self.found("kru"), [self.muay_thai.pk, self.sparring.pk])
+        self.assertEqual(self.found("kru open"), [self.sparring.pk])
+        self.assertEqual(self.found("capoeira"), [])
+        self.assertEqual(self.found('"jitsu"* -(( :'), [self.bjj.pk])  # query syntax is dropped
+        self.assertEqual(self.found("muay_thai"), [self.muay_thai.pk])  # split as the index splits
+        self.assertEqual(self.found("gloves,provided"), [self.muay_thai.pk])
+        self.assertEqual(self.found(instructor="ana"), [self.bjj.pk])
+        self.assertEqual(self.found("jiu", instructor="kru"), [])
+        self.assertEqual(self.found("kru", start=date(2026, 1, 6), end=date(2026, 1, 31)), [self.sparring.pk])
+
+    def test_index_and_scan_agree(self):
+        for text, instructor in (("muay th", ""), ("kru", ""), ("", "souza"), ("open", "bee"), ("nothing", "")):
+            self.assertEqual(
+                self.found(text, instructor),
+                list(search.search_classes(text, instructor, scan=True).values_list("pk", flat=True)),
+            )
+
+    def test_index_follows_every_write_path(self):
+        self.muay_thai.class_name = "Kickboxing"
+        self.muay_thai.save()
+        self.assertEqual(self.found("muay"), [])
+        self.assertEqual(self.found("kickbox"), [self.muay_thai.pk])
+
+        Classes.objects.filter(pk=self.sparring.pk).update(instructor_name="Kru Lek")
+        self.assertEqual(self.found(instructor="bee"), [])
+        self.assertEqual(self.found(instructor="lek"), [self.sparring.pk])
+
+        self.bjj.delete()
+        self.assertEqual(self.found("jitsu"), [])
+
+        ClassTemplate.objects.create(class_name="Wrestling", instructor_name="Coach Ivo", weekday=Weekday.Monday,
+                                     start_time=dtime(7, 0))
+        generate_timetable(date(2026, 1, 12), date(2026, 1, 12))  # bulk_create
+        self.assertEqual(Classes.objects.filter(pk__in=self.found("wrestling ivo")).count(), 1)
+
+    def test_seat_updates_leave_the_index_alone(self):
+        with CaptureQueriesContext(connection) as queries:
+            book_class(make_user("member@example.com"), self.muay_thai.pk)
+        self.assertFalse([q for q in queries.captured_queries if search.FTS_TABLE in q["sql"]])
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT sql FROM sqlite_master WHERE name = '{search.FTS_TABLE}_update'")
+            self.assertNotIn("seats_booked", cursor.fetchone()[0])
+
+    def test_endpoint(self):
+        response = self.client.get(self.url, {"q": "kru", "start": "2026-01-01"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["classId"] for row in response.data], [self.muay_thai.pk, self.sparring.pk])
+        self.assertIn("seats_left", response.data[0])
+
+        response = self.client.get(self.url, {"instructor": "souza", "start": "2026-01-01", "end": "2026-01-31"})
+        self.assertEqual(response.data, [])
+        for params in ({"q": "kru_dan"}, {"q": "muay-thai.gloves"}, {"instructor": "d_an"}):
+            self.assertEqual(self.client.get(self.url, {**params, "start": "2026-01-01"}).status_code, 200, params)
+        self.assertEqual(
+            [row["classId"] for row in self.client.get(self.url, {"q": "kru_dan", "start": "2026-01-01"}).data],
+            [self.muay_thai.pk],
+        )
+        # start defaults to today, after every class here.
+        self.assertEqual(self.client.get(self.url, {"q": "kru"}).data, [])
+
+        with override_settings(SEARCH_MAX_RESULTS=1):
+            self.assertEqual(len(self.client.get(self.url, {"q": "kru", "start": "2026-01-01"}).data), 1)
+
+    def test_bad_requests_are_rejected(self):
+        for params in ({}, {"q": "  "}, {"q": "?!*"}, {"q": "kru", "start": "2026-13-01"}, {"q": "kru", "end": "soon"}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn("error", response.data)
+
+    def test_rebuild_command_and_restored_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {search.FTS_TABLE}({search.FTS_TABLE}) VALUES ('delete-all')")
+            cursor.execute(f"DROP TRIGGER {search.FTS_TABLE}_insert")
+        self.assertEqual(self.found("kru"), [])
+
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(self.found("kru"), [self.muay_thai.pk, self.sparring.pk])
+        make_class(class_name="Yoga", class_date=date(2026, 1, 7))
+        self.assertEqual(len(self.found("yoga")), 1)
+
+    def test_migration_ddl_matches_the_search_module(self):
+        # 0015 keeps its own copy of the DDL; changing search.py's needs a new migration.
+        migration = importlib.import_module("userAPI.migrations.0015_classes_search_index")
+        self.assertEqual(migration.SQLITE_STATEMENTS[:-1], search._sqlite_statements())
+
+    def test_mysql_rebuild_drops_then_builds_the_index_once(self):
+        executed = []
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value = cursor
+        cursor.execute.side_effect = lambda sql, params=None: executed.append(sql.split()[0])
+        cursor.fetchone.return_value = (1,)
+        mysql = SimpleNamespace(vendor="mysql", alias="fulltext-test", cursor=lambda: cursor)
+
+        self.assertTrue(search.rebuild(mysql))
+        self.assertEqual(executed, ["SELECT", "ALTER", "ALTER"])
+        drop, add = [call.args[0] for call in cursor.execute.call_args_list[1:]]
+        self.assertIn("DROP INDEX", drop)
+        self.assertIn("ADD FULLTEXT INDEX", add)
+
+
+class AttendanceRollupTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(make_user("coach@example.com", is_staff=True))
+        self.members = [make_user(f"member{i}@example.com") for i in range(3)]
+        # Mon 2026-01-05 and Wed 2026-01-07 with Kru Dan, Mon 2026-01-12 with Kru Bee.
+        self.monday = make_class(capacity=4)
+        self.wednesday = make_class(class_date=date(2026, 1, 7), capacity=2)
+        self.next_week = make_class(class_date=date(2026, 1, 12), instructor_name="Kru Bee", capacity=10)
+
+    def rollups(self):
+        counts = ("classes", "capacity", "booked")
+        rows = set()
+        for model, key in ((InstructorWeek, ("week", "instructor_name")),
+                           (TimeSlotWeek, ("week", "weekday", "start_time"))):
+            # Incremental updates leave rows at zero where a recount has no row at all.
+            rows |= {(model.__name__, *row) for row in model.objects.values_list(*key, *counts) if any(row[-3:])}
+        return rows
+
+    def assert_matches_recount(self):
+        incremental = self.rollups()
+        list(rebuild_attendance_rollups(weeks_per_chunk=1))
+        self.assertEqual(incremental, self.rollups())
+
+    def test_bookings_and_cancellations_are_counted(self):
+        for member in self.members[:2]:
+            book_class(member, self.monday.pk)
+        book_class(self.members[0], self.wednesday.pk)
+        cancel_booking(self.members[1], self.monday.pk)
+
+        week = InstructorWeek.objects.get(week=date(2026, 1, 5), instructor_name="Kru Dan")
+        self.assertEqual((week.classes, week.capacity, week.booked), (2, 6, 2))
+        slot = TimeSlotWeek.objects.get(week=date(2026, 1, 5), weekday=Weekday.Monday, start_time=dtime(18, 0))
+        self.assertEqual((slot.classes, slot.capacity, slot.booked), (1, 4, 1))
+        self.assert_matches_recount()
+
+    def test_class_edits_moves_and_deletes_are_counted(self):
+        for member in self.members:
+            book_class(member, self.monday.pk)
+        book_class(self.members[0], self.next_week.pk)
+
+        self.monday.capacity = 8
+        self.monday.save()
+        self.assert_matches_recount()
+
+        # Moves to another week, instructor and slot, taking its three bookings along.
+        self.monday.class_date, self.monday.instructor_name = date(2026, 1, 14), "Kru Bee"
+        self.monday.class_start_time = dtime(7, 0)
+        self.monday.save()
+        self.assertEqual(InstructorWeek.objects.get(week=date(2026, 1, 12), instructor_name="Kru Bee").booked, 4)
+        self.assert_matches_recount()
+
+        self.next_week.delete()  # cascades to its booking
+        Classes.objects.create(class_name="Yoga", class_description="", class_date=date(2026, 1, 8),
+                               class_end_time=dtime(13, 0), instructor_name="Kru Dan")  # "12:00:00" default start
+        self.assert_matches_recount()
+
+    def test_generated_timetable_is_counted(self):
+        ClassTemplate.objects.create(class_name="Sparring", instructor_name="Kru Dan", weekday=Weekday.Wednesday,
+                                     start_time=dtime(18, 0))
+        book_class(self.members[0], self.wednesday.pk)
+        generate_timetable(date(2026, 1, 5), date(2026, 1, 25))
+        self.assertEqual(
+            list(InstructorWeek.objects.filter(instructor_name="Kru Dan").values_list("week", "classes", "booked")
+                 .order_by("week")[:2]),
+            [(date(2026, 1, 5), 3, 1), (date(2026, 1, 12), 1, 0)],
+        )
+        self.assert_matches_recount()
+
+    def test_rebuild_command_recounts_in_chunks(self):
+        book_class(self.members[0], self.monday.pk)
+        expected = self.rollups()
+        InstructorWeek.objects.update(booked=99)
+        TimeSlotWeek.objects.all().delete()
+        InstructorWeek.objects.create(week=date(2025, 6, 2), instructor_name="Gone", classes=1, capacity=1)
+
+        out = StringIO()
+        call_command("rebuild_attendance_rollups", "--weeks-per-chunk=1", stdout=out)
+        self.assertIn("2 chunks", out.getvalue())
+        self.assertEqual(self.rollups(), expected)
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_attendance_rollups", "--start=January", stdout=StringIO())
+
+    def test_instructor_endpoint_reads_only_the_rollups(self):
+        book_class(self.members[0], self.monday.pk)
+        book_class(self.members[1], self.monday.pk)
+        params = {"start": "2026-01-07", "end": "2026-01-12"}  # whole weeks: 5th to 18th
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/v1.0/user/analytics/instructors/", params)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn(BookedClasses._meta.db_table, queries[0]["sql"])
+        self.assertEqual(response.data, {"start": "2026-01-05", "end": "2026-01-18", "weeks": [
+            {"week": "2026-01-05", "instructor_name": "Kru Dan", "classes": 2, "capacity": 6, "booked": 2,
+             "fill_rate": 0.333},
+            {"week": "2026-01-12", "instructor_name": "Kru Bee", "classes": 1, "capacity": 10, "booked": 0,
+             "fill_rate": 0.0},
+        ]})
+        response = self.client.get("/api/v1.0/user/analytics/instructors/", {**params, "instructor": "Kru Bee"})
+        self.assertEqual([row["week"] for row in response.data["weeks"]], ["2026-01-12"])
+
+    def test_time_slot_endpoint_ranks_by_booked_seats(self):
+        make_class(class_date=date(2026, 1, 12), class_start_time=dtime(7, 0))
+        book_class(self.members[0], self.wednesday.pk)
+        book_class(self.members[1], self.wednesday.pk)
+        book_class(self.members[0], self.next_week.pk)
+
+        url = "/api/v1.0/user/analytics/timeslots/"
+        response = self.client.get(url, {"start": "2026-01-05", "end": "2026-01-18"})
+        self.assertEqual(response.data["slots"][:2], [
+            {"weekday": "Wednesday", "start_time": "18:00", "classes": 1, "capacity": 2, "booked": 2, "fill_rate": 1.0},
+            {"weekday": "Monday", "start_time": "18:00", "classes": 2, "capacity": 14, "booked": 1,
+             "fill_rate": 0.071},
+        ])
+        self.assertEqual(len(self.client.get(url, {"start": "2026-01-05", "end": "2026-01-18", "limit": 1}).data["slots"]), 1)
+
+    def test_analytics_are_staff_only_and_validate_params(self):
+        for params in ({"start": "2026-13-01"}, {"start": "2026-01-12", "end": "2026-01-05"},
+                       {"start": "2020-01-01", "end": "2026-01-01"}, {"limit": "0"}, {"limit": "ten"}):
+            response = self.client.get("/api/v1.0/user/analytics/timeslots/", params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn("error", response.data)
+
+        self.client.force_authenticate(self.members[0])
+        self.assertEqual(self.client.get("/api/v1.0/user/analytics/instructors/").status_code, 403)
+        self.assertEqual(APIClient().get("/api/v1.0/user/analytics/timeslots/").status_code, 401)
+
+    def test_weeks_past_the_end_of_the_calendar_are_rejected(self):
+        for params in ({"end": "9999-12-31"}, {"start": "9999-12-27", "end": "9999-12-27"}):
+            response = self.client.get("/api/v1.0/user/analytics/instructors/", params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn("error", response.data)
+        response = self.client.get("/api/v1.0/user/analytics/timeslots/", {"start": "9999-12-20", "end": "9999-12-26"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_login_tokens_are_authorised_by_their_staff_claim(self):
+        make_user("head.coach@example.com", "s3cret-pass", is_staff=True)
+        make_user("student@example.com", "s3cret-pass")
+        staff = login_client("head.coach@example.com", "s3cret-pass")
+        member = login_client("student@example.com", "s3cret-pass")
+        params = {"start": "2026-01-05", "end": "2026-01-18"}
+        for url in ("/api/v1.0/user/analytics/instructors/", "/api/v1.0/user/analytics/timeslots/"):
+            self.assertEqual(staff.get(url, params).status_code, 200, url)
+            self.assertEqual(member.get(url, params).status_code, 403, url)
+
+
+class ScheduleCacheTests(TestCase):
+    url = "/api/v1.0/user/classes/"
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.monday = make_class(class_date=date(2026, 1, 5))
+        self.tuesday = make_class(class_date=date(2026, 1, 6))
+
+    def get_week(self):
+        return self.client.get(self.url, {"start": "2026-01-05", "end": "2026-01-11"})
+
+    def test_only_the_changed_day_is_rebuilt(self):
+        self.get_week()
+        self.tuesday.instructor_name = "Kru Bee"
+        self.tuesday.save()
+
+        before = schedule_cache.stats()
+        response = self.get_week()
+        after = schedule_cache.stats()
+        self.assertEqual(after["hits"] - before["hits"], 1)
+        self.assertEqual(after["misses"] - before["misses"], 1)
+        self.assertEqual(response.data[1]["instructor_name"], "Kru Bee")
+
+    def test_bookings_invalidate_the_day(self):
+        self.get_week()
+        book_class(make_user("member@example.com"), self.monday.pk)
+        self.assertEqual(self.get_week().data[0]["seats_booked"], 1)
+
+    def test_stale_copy_is_served_while_another_request_rebuilds(self):
+        self.get_week()
+        self.monday.class_name = "Renamed"
+        self.monday.save()
+        cache.add("schedule-lock:2026-01-05", 1)  # someone else is rebuilding Monday
+
+        response = self.get_week()
+        self.assertEqual(response.data[0]["class_name"], "Muay Thai")
+        self.assertNotIn("ETag", response)
+        self.assertEqual(schedule_cache.stats()["stale"], 1)
+
+        cache.delete("schedule-lock:2026-01-05")
+        self.assertEqual(self.get_week().data[0]["class_name"], "Renamed")
+
+    @override_settings(METRICS_ALLOWED_IPS=["127.0.0.1"])
+    def test_metrics_endpoint_exposes_counters(self):
+        self.get_week()
+        self.get_week()
+        body = self.client.get("/metrics/").content.decode()
+        self.assertIn('ninjadtao_schedule_cache_total{result="hits"} 2', body)
+        self.assertIn('ninjadtao_schedule_cache_total{result="misses"} 2', body)
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user("member@example.com")
+        self.access = str(EmailTokenObtainPairSerializer.get_token(self.user).access_token)
+        book_class(self.user, make_class(class_date=timezone.localdate()).pk)
+
+    async def test_async_views_match_sync_views(self):
+        headers = {"Authorization": f"Bearer {self.access}"}
+        for path, method in (("/api/v1.0/user/classes/", "get"), ("/api/v1.0/user/auth/", "post")):
+            sync_response = await sync_to_async(getattr(APIClient(), method))(path, headers=headers)
+            with override_settings(ROOT_URLCONF="NinjadtaoApp.asgi_urls"):
+                async_response = await getattr(AsyncClient(), method)(path, headers=headers)
+            self.assertEqual(async_response.status_code, 200)
+            self.assertEqual(async_response.json(), sync_response.json())
+
+    def test_asgi_urlconf_routes_reads_to_async_views(self):
+        self.assertIs(resolve("/api/v1.0/user/classes/", "NinjadtaoApp.asgi_urls").func.view_class, AsyncClassesView)
+        self.assertIs(resolve("/api/v1.0/user/auth/", "NinjadtaoApp.asgi_urls").func.view_class, AsyncAuthView)
+        self.assertIs(resolve("/api/v1.0/user/book/", "NinjadtaoApp.asgi_urls").func.view_class, BookingView)
+
+
+class BatchTests(TestCase):
+    url = "/api/v1.0/user/batch/"
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user("member@example.com")
+        self.access = str(EmailTokenObtainPairSerializer.get_token(self.user).access_token)
+        self.today = timezone.localdate()
+        self.gym_class = make_class(class_date=self.today)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access}")
+
+    def batch(self, *requests):
+        return self.client.post(self.url, {"requests": list(requests)}, format="json")
+
+    def test_cold_start_calls_match_separate_requests(self):
+        classes_path = f"/api/v1.0/user/classes/?date={self.today}"
+        with mock.patch.object(
+            StatelessJWTAuthentication, "authenticate", autospec=True, side_effect=StatelessJWTAuthentication.authenticate
+        ) as authenticate:
+            response = self.batch(
+                {"id": "profile", "method": "POST", "path": "/api/v1.0/user/auth/"},
+                {"id": "classes", "path": classes_path},
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(authenticate.call_count, 1)
+
+        profile, classes = response.json()["responses"]
+        self.assertEqual((profile["id"], profile["status"]), ("profile", 200))
+        self.assertEqual(profile["body"], self.client.post("/api/v1.0/user/auth/").json())
+        self.assertEqual(classes["body"], self.client.get(classes_path).json())
+        self.assertIn("ETag", classes["headers"])
+
+    def test_sub_requests_run_in_order_and_fail_independently(self):
+        responses = self.batch(
+            {"method": "POST", "path": "/api/v1.0/user/book/", "body": {"clasId": self.gym_class.pk}},
+            {"method": "POST", "path": "/api/v1.0/user/book/", "body": {"clasId": self.gym_class.pk}},
+            {"method": "POST", "path": "/api/v1.0/user/auth/"},
+            {"path": "/api/v1.0/user/nowhere/"},
+            {"path": "/api/v1.0/user/export/bookings.csv"},
+        ).json()["responses"]
+        self.assertEqual([r["status"] for r in responses], [200, 409, 200, 404, 404])
+        self.assertEqual([r["id"] for r in responses], [0, 1, 2, 3, 4])
+        self.assertEqual([c["clasId"]["classId"] for c in responses[2]["body"]["booked_classes"]], [self.gym_class.pk])
+
+    def test_anonymous_batch_reaches_public_endpoints_only(self):
+        self.client.credentials()
+        responses = self.batch(
+            {"path": f"/api/v1.0/user/classes/?date={self.today}"},
+            {"method": "POST", "path": "/api/v1.0/user/auth/"},
+        ).json()["responses"]
+        self.assertEqual([r["status"] for r in responses], [200, 401])
+
+    def test_invalid_batches_are_rejected(self):
+        for requests in ([], [{"path": "/admin/"}], [{"path": "/api/v1.0/user/auth/", "headers": {"Authorization": "x"}}]):
+            response = self.client.post(self.url, {"requests": requests}, format="json")
+            self.assertEqual(response.status_code, 400, requests)
+        with override_settings(BATCH_MAX_REQUESTS=2):
+            self.assertEqual(self.batch(*[{"path": "/api/v1.0/user/classes/"}] * 3).status_code, 400)
+
+    async def test_asgi_runs_consecutive_reads_concurrently(self):
+        in_flight = 0
+        both_started = asyncio.Event()
+        real_versions = asyncviews.aschedule_versions
+
+        async def versions(start, end):
+            # Only returns once both reads are running; in sequence the first would time out.
+            nonlocal in_flight
+            in_flight += 1
+            if in_flight == 2:
+                both_started.set()
+            await asyncio.wait_for(both_started.wait(), 5)
+            return await real_versions(start, end)
+
+        with override_settings(ROOT_URLCONF="NinjadtaoApp.asgi_urls"), \
+                mock.patch.object(asyncviews, "aschedule_versions", versions):
+            response = await AsyncClient().post(
+                self.url,
+                {"requests": [{"path": f"/api/v1.0/user/classes/?date={self.today}"}] * 2},
+                content_type="application/json",
+                headers={"Authorization": f"Bearer {self.access}"},
+            )
+        self.assertEqual(response.status_code, 200)
+        first, second = response.json()["responses"]
+        self.assertEqual((first["status"], second["status"]), (200, 200))
+        self.assertEqual(first["body"], second["body"])
+
+
+STREAM_PATH = "/api/v1.0/user/classes/stream/"
+
+
+def keep_test_connection(test):
+    # Like django.test.Client: stream requests run their sync steps on the test's
+    # thread, so the request signals must not close the test's connection.
+    for signal in (request_started, request_finished):
+        signal.disconnect(close_old_connections)
+        test.addCleanup(signal.connect, close_old_connections)
+
+
+class AvailabilityStreamTests(TestCase):
+    def setUp(self):
+        keep_test_connection(self)
+        self.user = make_user("member@example.com")
+        self.gym_class = make_class(capacity=5)
+
+    def book(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            book_class(self.user, self.gym_class.pk)
+
+    def cancel(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cancel_booking(self.user, self.gym_class.pk)
+
+    async def test_bookings_push_seat_deltas_to_that_day(self):
+        stream = ASGIStream(asgi_application, STREAM_PATH, {"date": "2026-01-05"})
+        other_day = ASGIStream(asgi_application, STREAM_PATH, {"date": "2026-01-06"})
+        self.assertEqual(await stream.read(), "retry: 3000\n\n")
+        await other_day.read()
+        self.assertEqual(stream.status, 200)
+
+        await sync_to_async(self.book)()
+        event = await stream.read()
+        self.assertTrue(event.startswith("event: availability\ndata: "))
+        self.assertEqual(
+            json.loads(event.split("data: ", 1)[1]),
+            {"classId": self.gym_class.pk, "seats_booked": 1, "seats_left": 4},
+        )
+
+        await sync_to_async(self.cancel)()
+        self.assertIn('"seats_left":5', await stream.read())
+        self.assertTrue(other_day.chunks.empty())
+
+        await stream.close()
+        await other_day.close()
+        self.assertEqual(availability.subscriber_count(), 0)
+
+    async def test_slow_subscriber_keeps_only_the_latest_delta_per_class(self):
+        subscription = availability.subscribe("2026-01-05")
+        try:
+            for seats_booked in range(1, 101):
+                availability.deliver("2026-01-05", {"classId": 1, "seats_booked": seats_booked, "seats_left": 0})
+                availability.deliver("2026-01-05", {"classId": 2, "seats_booked": seats_booked, "seats_left": 0})
+            messages = await subscription.next(timeout=1)
+        finally:
+            availability.unsubscribe(subscription)
+        self.assertEqual(sorted((m["classId"], m["seats_booked"]) for m in messages), [(1, 100), (2, 100)])
+        self.assertEqual(await subscription.next(timeout=0.01), [])
+
+    def test_redis_listener_reconnects_with_backoff(self):
+        class Stop(Exception):
+            pass
+
+        class PubSub:
+            def __init__(self, subscribe_error=None, items=()):
+                self.subscribe_error, self.items = subscribe_error, items
+
+            def psubscribe(self, pattern):
+                if self.subscribe_error:
+                    raise self.subscribe_error
+
+            def listen(self):
+                yield from self.items
+                raise ConnectionError("connection reset")
+
+            def close(self):
+                pass
+
+        message = {"channel": b"ninjadtao:availability:2026-01-05", "data": b'{"classId": 1}'}
+        sessions = iter([
+            PubSub(ConnectionError("refused")), PubSub(ConnectionError("refused")),
+            PubSub(items=[{"channel": b"ninjadtao:availability:x", "data": b"not json"}, message]),
+            PubSub(Stop()),
+        ])
+        # Built without __init__, which needs the redis package.
+        broker = availability.RedisBroker.__new__(availability.RedisBroker)
+        broker.client = SimpleNamespace(pubsub=lambda **kwargs: next(sessions))
+        broker._connection_errors = (ConnectionError,)
+
+        with mock.patch.object(availability.time, "sleep") as sleep, \
+                mock.patch.object(availability, "deliver") as deliver, \
+                self.assertLogs("userAPI.availability", "WARNING"):
+            with self.assertRaises(Stop):
+                broker._listen()
+        # Doubling while Redis is down, back to the start once a subscription succeeds.
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [0.5, 1.0, 0.5])
+        deliver.assert_called_once_with("2026-01-05", {"classId": 1})
+
+    def test_nothing_is_read_when_nobody_is_listening(self):
+        with self.assertNumQueries(0):
+            availability.publish_class(self.gym_class.pk)
+
+    @override_settings(AVAILABILITY_HEARTBEAT=0.01)
+    async def test_idle_stream_gets_keep_alive_comments(self):
+        stream = ASGIStream(asgi_application, STREAM_PATH, {"date": "2026-01-05"})
+        await stream.read()
+        self.assertEqual(await stream.read(), ": keep-alive\n\n")
+        await stream.close()
+
+    async def test_bad_date_is_rejected(self):
+        stream = ASGIStream(asgi_application, STREAM_PATH, {"date": "soon"})
+        self.assertIn("YYYY-MM-DD", await stream.read())
+        await stream.task
+        self.assertEqual(stream.status, 400)
+
+
+@override_settings(AVAILABILITY_HEARTBEAT=3600)  # opening them all can outlast the default
+class IdleStreamLoadTests(SimpleTestCase):
+    connections = 5000
+    sample = 200
+    max_bytes_per_connection = 64 * 1024
+
+    def setUp(self):
+        keep_test_connection(self)
+
+    async def open(self, count):
+        streams = [ASGIStream(asgi_application, STREAM_PATH, {"date": "2026-01-05"}) for _ in range(count)]
+        await asyncio.gather(*(stream.read(timeout=60) for stream in streams))
+        return streams
+
+    async def test_one_worker_holds_idle_subscribers_in_bounded_memory(self):
+        threads = threading.active_count()
+        streams = await self.open(self.connections)
+        self.assertEqual(availability.subscriber_count("2026-01-05"), self.connections)
+        # No thread is parked per connection.
+        self.assertLess(threading.active_count() - threads, 10)
+
+        # Measure what each further connection costs, client side included.
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            streams += await self.open(self.sample)
+            per_connection = (tracemalloc.get_traced_memory()[0] - before) / self.sample
+        finally:
+            tracemalloc.stop()
+        self.assertLess(per_connection, self.max_bytes_per_connection)
+
+        availability.deliver("2026-01-05", {"classId": 1, "seats_booked": 3, "seats_left": 17})
+        events = await asyncio.gather(*(stream.read(timeout=60) for stream in streams))
+        self.assertTrue(all('"seats_left":17' in event for event in events))
+
+        await asyncio.gather(*(stream.close() for stream in streams))
+        self.assertEqual(availability.subscriber_count(), 0)
+
+
+class FastSerializationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user("member@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        today = timezone.localdate()
+        for i in range(5):
+            klass = make_class(
+                class_date=today + timedelta(days=i % 2), class_start_time=dtime(7 + i, 30),
+                class_description="Clinch & knees \u2014 \u0e21\u0e27\u0e22\u0e44\u0e17\u0e22\u2028line two",
+            )
+            if i % 2:
+                book_class(self.user, klass.pk)
+
+    def get_all(self):
+        today = timezone.localdate().isoformat()
+        return [
+            self.client.get("/api/v1.0/user/classes/").content,
+            self.client.get("/api/v1.0/user/classes/", {"date": today}).content,
+            self.client.post("/api/v1.0/user/auth/?page_size=1").content,
+        ]
+
+    def test_fast_path_is_byte_for_byte_identical(self):
+        with override_settings(FAST_SERIALIZATION=False):
+            expected = self.get_all()
+        cache.clear()
+        with override_settings(FAST_SERIALIZATION=True):
+            self.assertEqual(self.get_all(), expected)
+
+    def test_renderer_matches_json_renderer(self):
+        from decimal import Decimal
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import ORJSONRenderer
+
+        data = {
+            "when": timezone.now().replace(microsecond=123456), "day": date(2026, 1, 5), "at": dtime(18, 0),
+            "price": Decimal("12.50"), "text": "\u0e21\u0e27\u0e22 \u2028 \u2029 </script>", 1: [None, True, 1.5],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    @override_settings(GZIP_MIN_BYTES=200)
+    def test_only_large_responses_are_gzipped(self):
+        client = APIClient()
+        response = client.get("/api/v1.0/user/classes/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        # The compressed response carries a weak ETag, which still revalidates.
+        self.assertTrue(response["ETag"].startswith("W/"))
+        again = client.get("/api/v1.0/user/classes/", HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+        self.assertFalse(client.get("/api/v1.0/user/test/", HTTP_ACCEPT_ENCODING="gzip").has_header("Content-Encoding"))
+
+
+class RequestMetricsTests(TestCase):
+    url = "/api/v1.0/user/classes/"
+
+    def setUp(self):
+        cache.clear()
+        for histogram in metrics.REQUEST_HISTOGRAMS:
+            histogram.reset()
+        make_class()
+
+    def test_server_timing_reports_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().get(self.url, {"date": "2026-01-05"})
+        self.assertIn(f'desc="{len(queries)} queries"', response["Server-Timing"])
+        self.assertRegex(response["Server-Timing"], r"render;dur=[\d.]+, total;dur=[\d.]+$")
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_slow_queries_are_logged_without_params(self):
+        with self.assertLogs("userAPI.slow_queries", "WARNING") as logs:
+            APIClient().get(self.url, {"date": "2026-01-05"})
+        self.assertIn(self.url, logs.output[0])
+        self.assertNotIn("2026-01-05", "".join(logs.output))
+
+    @override_settings(METRICS_ALLOWED_IPS=["127.0.0.1"])
+    def test_metrics_endpoint_exports_histograms(self):
+        client = APIClient()
+        client.get(self.url)
+        client.get(self.url)
+        body = client.get("/metrics/").content.decode()
+        self.assertIn('ninjadtao_request_duration_seconds_count{view="userAPI.views.ClassesView",method="GET"} 2', body)
+        self.assertIn('ninjadtao_request_db_queries_bucket{view="userAPI.views.ClassesView",method="GET",le="+Inf"} 2', body)
+        self.assertIn("# TYPE ninjadtao_request_render_seconds histogram", body)
+
+    def test_metrics_are_refused_outside_the_allowed_addresses(self):
+        self.assertEqual(APIClient().get("/metrics/").status_code, 403)  # off unless configured
+        with override_settings(METRICS_ALLOWED_IPS=["10.0.0.5"]):
+            self.assertEqual(APIClient().get("/metrics/").status_code, 403)
+            self.assertEqual(APIClient().get("/metrics/", HTTP_X_FORWARDED_FOR="10.0.0.5").status_code, 403)
+            self.assertEqual(APIClient().get("/metrics/", REMOTE_ADDR="10.0.0.5").status_code, 200)
+
+    async def test_asgi_requests_are_measured_without_a_thread_hop(self):
+        async def view(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(RequestMetricsMiddleware(view)))
+        # Django registers the hook as is rather than wrapping it in sync_to_async.
+        handler = ASGIHandler()
+        handler.load_middleware(is_async=True)
+        self.assertTrue(any(
+            isinstance(getattr(hook, "__self__", None), RequestMetricsMiddleware)
+            for hook in handler._template_response_middleware
+        ))
+
+        with override_settings(ROOT_URLCONF="NinjadtaoApp.asgi_urls"):
+            response = await AsyncClient().get(self.url, {"date": "2026-01-05"})
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response["Server-Timing"], r'desc="[1-9]\d* queries", render;dur=[\d.]+')
+
+    def test_histogram_counts_every_thread(self):
+        histogram = metrics.Histogram("test_seconds", "Test.", (0.5, 1.0))
+        workers = [
+            threading.Thread(target=lambda: [histogram.observe(0.75, (("view", "x"),)) for _ in range(1000)])
+            for _ in range(8)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        cumulative, total = histogram.collect()[(("view", "x"),)]
+        self.assertEqual(cumulative, [0, 8000, 8000])
+        self.assertAlmostEqual(total, 6000)
+        # Finished threads are folded in, not kept: ASGI starts a thread per request.
+        self.assertEqual(histogram._shards, {})
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """Fire N parallel bookings at one class; exactly `capacity` may succeed.
+
+    Runs against whichever database is configured, so use DJANGO_DB_ENGINE=mysql
+    to exercise MySQL as well as SQLite.
+    """
+
+    attempts = 50
+    capacity = 20
+    p99_budget = 2.0  # seconds
+
+    def test_parallel_bookings_never_oversell(self):
+        klass = make_class(capacity=self.capacity)
+        users = [make_user(f"rush{i}@example.com") for i in range(self.attempts)]
+
+        barrier = threading.Barrier(self.attempts)
+        results = []
+        latencies = []
+        lock = threading.Lock()
+
+        def attempt(user):
+            barrier.wait()
+            started = time.perf_counter()
+            try:
+                book_class(user, klass.pk)
+                outcome = "booked"
+            except ClassFull:
+                outcome = "full"
+            except Exception as exc:
+                outcome = type(exc).__name__
+            finally:
+                connection.close()
+            with lock:
+                results.append(outcome)
+                latencies.append(time.perf_counter() - started)
+
+        threads = [threading.Thread(target=attempt, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        klass.refresh_from_db()
+        self.assertEqual(results.count("booked"), self.capacity)
+        self.assertEqual(results.count("full"), self.attempts - self.capacity)
+        self.assertEqual(klass.seats_booked, self.capacity)
+        self.assertEqual(BookedClasses.objects.filter(clasId=klass).count(), self.capacity)
+
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        self.assertLess(p99, self.p99_budget)
+
+
+class ConcurrentIdempotencyTests(TransactionTestCase):
+    threads = 10
+
+    def test_same_key_from_many_threads_books_once(self):
+        klass = make_class(capacity=5)
+        user = make_user("retry@example.com")
+        barrier = threading.Barrier(self.threads)
+        responses = []
+        lock = threading.Lock()
+
+        def retry():
+            client = APIClient()
+            client.force_authenticate(user)
+            barrier.wait()
+            try:
+                response = client.post(
+                    "/api/v1.0/user/book/", {"clasId": klass.pk}, format="json", HTTP_IDEMPOTENCY_KEY="tap-1",
+                )
+            finally:
+                connection.close()
+            with lock:
+                responses.append((response.status_code, response.json()))
+
+        workers = [threading.Thread(target=retry) for _ in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(BookedClasses.objects.filter(clasId=klass).count(), 1)
+        self.assertEqual(Classes.objects.get(pk=klass.pk).seats_booked, 1)
+        self.assertEqual({status for status, _ in responses}, {200})
+        self.assertEqual(len({body["id"] for _, body in responses}), 1)
+
+
+class SQLiteContentionTests(TransactionTestCase):
+    def setUp(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite only")
+
+    def test_tuned_profile_removes_lock_errors(self):
+        klass = make_class(capacity=10**9)
+        default = run_write_contention(klass.pk, processes=4, writes=50, tuned=False)
+        tuned = run_write_contention(klass.pk, processes=4, writes=50, tuned=True)
+
+        self.assertEqual(tuned["lock_errors"], 0)
+        self.assertEqual(tuned["committed"], 200)
+        self.assertGreater(tuned["writes_per_s"], default["writes_per_s"])
+
+    def test_pragmas_are_applied_to_new_connections(self):
+        connection.close()
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal")
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTests(TransactionTestCase):
+    """Routes reads to a second SQLite file that never receives the primary's writes."""
+
+    replica_path = settings.BASE_DIR / "test_replica.sqlite3"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        if connection.vendor != "sqlite":
+            return
+        # Not in settings.DATABASES, so add the alias by hand and allow it for this test case.
+        connections.settings["replica"] = {**connection.settings_dict, "NAME": cls.replica_path}
+        cls.databases = cls.databases | {"replica"}
+        call_command("migrate", database="replica", verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        if "replica" in connections.settings:
+            connections["replica"].close()
+            del connections["replica"]
+            del connections.settings["replica"]
+            cls.replica_path.unlink(missing_ok=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("uses a second SQLite file as the replica")
+        cache.clear()
+        self.user = make_user("member@example.com")
+        self.klass = make_class(class_date=timezone.localdate())
+        self.client = APIClient()
+        self.access = str(EmailTokenObtainPairSerializer.get_token(self.user).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access}")
+
+    def booked_ids(self):
+        response = self.client.post("/api/v1.0/user/auth/")
+        self.assertEqual(response.status_code, 200)
+        return [row["clasId"]["classId"] for row in response.data["booked_classes"]]
+
+    def test_booking_shows_up_in_next_auth_call(self):
+        self.assertEqual(self.client.post("/api/v1.0/user/book/", {"clasId": self.klass.pk}, format="json").status_code, 200)
+        self.assertEqual(self.booked_ids(), [self.klass.pk])
+
+        # Once the sticky window is gone the read goes to the (unreplicated) replica,
+        # which proves the previous read was pinned to the primary.
+        cache.clear()
+        self.assertEqual(self.booked_ids(), [])
+
+    async def test_middleware_runs_natively_under_asgi(self):
+        router = PrimaryReplicaRouter()
+
+        async def view(request):
+            seen = [router.db_for_read(Classes)]
+            await sync_to_async(router.db_for_write)(Classes)  # a write made in a worker thread
+            return HttpResponse(" ".join(seen + [router.db_for_read(Classes)]))
+
+        middleware = ReplicaStickinessMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {self.access}")
+        self.assertEqual((await middleware(request)).content, b"replica default")
+        # The write pins this client's next request to the primary.
+        self.assertEqual((await middleware(request)).content, b"default default")
+
+    def test_router_outside_requests_uses_primary(self):
+        router = PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(Classes), "default")
+        self.assertEqual(router.db_for_write(Classes), "default")
+
+
+# ----------------------------
+# Load testing
+# ----------------------------
+class LoadDataTests(TestCase):
+    def test_seeded_data_is_consistent(self):
+        call_command("seed_load_data", users=60, days=10, classes_per_day=4, capacity=15, bookings=400, stdout=StringIO())
+
+        self.assertEqual(userModel.objects.count(), 60)
+        self.assertEqual(set(userModel.objects.values_list("membershipName", flat=True)), set(Membership.values))
+        self.assertEqual(Classes.objects.count(), 40)
+        mismatched = Classes.objects.annotate(n=Count("booked_users")).exclude(n=F("seats_booked"))
+        self.assertFalse(mismatched.exists())
+        self.assertFalse(Classes.objects.filter(seats_booked__gt=F("capacity")).exists())
+        # Analytics see the seeded history without a separate rebuild.
+        rollups = InstructorWeek.objects.aggregate(classes=Sum("classes"), booked=Sum("booked"))
+        self.assertEqual(rollups, {"classes": 40, "booked": BookedClasses.objects.count()})
+        self.assertFalse(credit_mismatches().exists())
+        self.assertFalse(userModel.objects.filter(credit_balance__lt=0).exists())
+        # Booking history predates each class.
+        self.assertFalse(BookedClasses.objects.filter(booking_date__date__gt=F("clasId__class_date")).exists())
+        self.assertTrue(BookedClasses.objects.filter(booking_date__lt=timezone.now() - timedelta(days=1)).exists())
+        self.assertTrue(BookedClasses._meta.get_field("booking_date").auto_now_add)  # model metadata untouched
+
+        with self.assertRaises(CommandError):
+            call_command("seed_load_data", users=1, days=1, stdout=StringIO())
+
+    def test_baseline_comparison_flags_regressions(self):
+        baseline = {"classes": {"p95_ms": 10.0, "rps": 500.0, "queries_per_request": 2.0}}
+        within = {"classes": {"p95_ms": 11.5, "rps": 420.0, "queries_per_request": 2.0}}
+        self.assertEqual(compare_to_baseline(within, baseline, tolerance=0.2), [])
+
+        worse = {"classes": {"p95_ms": 13.0, "rps": 500.0, "queries_per_request": 3.0}}
+        self.assertEqual(
+            [r["metric"] for r in compare_to_baseline(worse, baseline, tolerance=0.2)],
+            ["p95_ms", "queries_per_request"],
+        )
+        self.assertEqual(compare_to_baseline({}, baseline, 0.2), [{"endpoint": "classes", "metric": "missing"}])
+
+
+# ----------------------------
+# Exports and admin
+# ----------------------------
+class ExportTests(TestCase):
+    def setUp(self):
+        self.staff = make_user("coach@example.com", is_staff=True)
+        self.member = make_user("member@example.com")
+        userModel.objects.filter(pk=self.member.pk).update(first_name="=HYPERLINK(1)")
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+        self.monday = make_class(class_date=date(2026, 1, 5), instructor_name="Kru Dan")
+        self.tuesday = make_class(class_date=date(2026, 1, 6), instructor_name="Kru Bee")
+        book_class(self.member, self.monday.pk)
+        book_class(self.member, self.tuesday.pk)
+        book_class(self.staff, self.tuesday.pk)
+
+    def export(self, path, **params):
+        response = self.client.get(f"/api/v1.0/user/export/{path}", params)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_bookings_csv_is_filtered_and_streamed(self):
+        response, body = self.export("bookings.csv", start="2026-01-06", instructor="Kru Bee")
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        rows = list(csv.DictReader(StringIO(body)))
+        self.assertEqual([row["member_email"] for row in rows], ["member@example.com", "coach@example.com"])
+        self.assertEqual(rows[0]["class_date"], "2026-01-06")
+        self.assertEqual(rows[0]["membership"], "1 Month")
+        self.assertEqual(rows[0]["member_first_name"], "'=HYPERLINK(1)")
+
+    def test_bookings_ndjson_streams_in_chunks(self):
+        self.assertEqual(len(list(exports.stream_ndjson(*exports.bookings(), chunk_size=2))), 2)
+
+        response = self.client.get("/api/v1.0/user/export/bookings.ndjson", HTTP_ACCEPT="application/x-ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([row["class_id"] for row in rows], [self.monday.pk, self.tuesday.pk, self.tuesday.pk])
+        self.assertTrue(rows[0]["booking_date"].endswith("Z"))
+
+    def test_members_export_filters(self):
+        _, body = self.export("members.csv", active="true", membership=str(Membership.Monthly))
+        self.assertEqual(len(list(csv.DictReader(StringIO(body)))), 2)
+
+    def test_exports_are_staff_only_and_validated(self):
+        self.assertEqual(self.client.get("/api/v1.0/user/export/bookings.csv", {"start": "soon"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/v1.0/user/export/payments.csv").status_code, 404)
+        self.assertEqual(self.client.get("/api/v1.0/user/export/bookings.xlsx").status_code, 404)
+
+        member = APIClient()
+        member.force_authenticate(self.member)
+        self.assertEqual(member.get("/api/v1.0/user/export/bookings.csv").status_code, 403)
+
+    def test_staff_login_token_can_export(self):
+        make_user("manager@example.com", password="pass1234", is_staff=True)
+        response = login_client("manager@example.com", "pass1234").get("/api/v1.0/user/export/bookings.csv")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(list(csv.DictReader(StringIO(b"".join(response.streaming_content).decode())))), 3)
+
+        make_user("member2@example.com", password="pass1234")
+        response = login_client("member2@example.com", "pass1234").get("/api/v1.0/user/export/bookings.csv")
+        self.assertEqual(response.status_code, 403)
+
+
+class BookingAdminTests(TestCase):
+    def setUp(self):
+        self.admin = userModel.objects.create_superuser(email="admin@example.com", first_name="A", last_name="D")
+        self.client.force_login(self.admin)
+        user = make_user("member@example.com")
+        for hour in range(6, 12):
+            book_class(user, make_class(class_start_time=dtime(hour, 0)).pk)
+
+    def test_changelist_skips_count_for_large_tables(self):
+        with mock.patch.object(EstimatedCountPaginator, "exact_below", 0):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get("/admin/userAPI/bookedclasses/")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "member@example.com")
+        booking_counts = [q["sql"] for q in queries if "COUNT(" in q["sql"] and "bookedclasses" in q["sql"]]
+        self.assertEqual(booking_counts, [])
+
+    def test_estimate_is_only_used_unfiltered(self):
+        bookings = BookedClasses.objects.order_by("-id")
+        with mock.patch.object(EstimatedCountPaginator, "exact_below", 0):
+            self.assertEqual(EstimatedCountPaginator(bookings, 100).count, BookedClasses.objects.order_by().last().pk)
+            self.assertEqual(EstimatedCountPaginator(bookings.filter(clasId__class_start_time__hour=6), 100).count, 1)
+        self.assertEqual(EstimatedCountPaginator(bookings, 100).count, 6)
@@ -0,0 +1,43 @@
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LoginThrottle(SimpleRateThrottle):
+    """
+    Base for the login throttles. DRF checks throttles in initial(), before the
+    serializer runs, so a throttled attempt never reaches the password hasher.
+    """
+
+    def get_rate(self):
+        # Read at request time (not import time) so the rates follow settings overrides.
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+
+class LoginIPThrottle(LoginThrottle):
+    """
+    Login attempts per client address.
+
+    The address is REMOTE_ADDR, or with REST_FRAMEWORK['NUM_PROXIES'] set, the
+    X-Forwarded-For entry that many proxies back. A header the client adds
+    itself doesn't change the key.
+    """
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginEmailThrottle(LoginThrottle):
+    """Login attempts per account, whichever addresses they come from."""
+    scope = 'login_email'
+
+    def get_cache_key(self, request, view):
+        if not isinstance(request.data, dict):
+            return None  # a JSON list or string; the serializer rejects it
+        email = request.data.get('email') or request.data.get('username')
+        if not isinstance(email, str) or not email.strip():
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': email.strip().lower()}
+
+
+LOGIN_THROTTLES = [LoginIPThrottle, LoginEmailThrottle]
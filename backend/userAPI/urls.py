@@ -4,13 +4,29 @@ from .views import TestView
 from .views import EmailTokenObtainPairView
 from .views import AuthView
 from .views import ClassesView
+from .views import ClassSummaryView
+from .views import ClassSearchView
+from .views import BookingView
+from .views import LogoutView
+from .views import ExportView
+from .views import BatchView
+from .views import InstructorAnalyticsView
+from .views import TimeSlotAnalyticsView
 
 
 urlpatterns = [
     path('test/', TestView.as_view()),
     path('login/', EmailTokenObtainPairView.as_view(), name='email_login'),
+    path('logout/', LogoutView.as_view()),
     path('auth/', AuthView.as_view()),
     path('classes/', ClassesView.as_view()),
+    path('classes/summary/', ClassSummaryView.as_view()),
+    path('classes/search/', ClassSearchView.as_view()),
+    path('book/', BookingView.as_view()),
+    path('export/<str:dataset>.<str:fmt>', ExportView.as_view()),
+    path('batch/', BatchView.as_view()),
+    path('analytics/instructors/', InstructorAnalyticsView.as_view()),
+    path('analytics/timeslots/', TimeSlotAnalyticsView.as_view()),
 ]
 
 
@@ -1,4 +1,6 @@
 #from django.shortcuts import render
+import calendar
+from datetime import date, timedelta
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -6,15 +8,94 @@ from rest_framework import status
 
 from . models import *
 from . serializer import * 
+from . authentication import StatelessJWTAuthentication
+from . blacklist import revoke
+from . idempotency import idempotent
+from . pagination import BookingCursorPagination
+from . throttles import LOGIN_THROTTLES
+from . import batch, exports, fastserializers, metrics as request_metrics, schedule_cache, search
+from . schedule_cache import get_schedule
+from . services import (
+    booked_class_ids, book_class, cancel_booking, instructor_weeks, popular_time_slots, schedule_etag, schedule_summary,
+    schedule_versions, week_of, with_availability,
+)
 
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
-from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework.authentication import SessionAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.http import parse_etags
+
+def etag_matches(request, etag):
+    # Weak comparison (RFC 9110 13.1.2): GZipMiddleware hands out compressed responses with W/ tags.
+    return etag in {tag.removeprefix("W/") for tag in parse_etags(request.headers.get("If-None-Match", ""))}
+
+
+def parse_date_param(request, name, default=None):
+    """The ?name= query parameter as a date, or default when it is missing. Raises ValueError unless YYYY-MM-DD."""
+    value = request.query_params.get(name)
+    if not value:
+        return default
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValueError(f"Invalid {name} date. Use YYYY-MM-DD.")
+    return parsed
+
 
 # Create your views here.
 class EmailTokenObtainPairView(TokenObtainPairView):
     serializer_class = EmailTokenObtainPairSerializer
+    throttle_classes = LOGIN_THROTTLES
+
+
+class EmailTokenRefreshView(TokenRefreshView):
+    serializer_class = EmailTokenRefreshSerializer
+
+
+class LogoutView(APIView):
+    def post(self, request):
+        token = request.data.get("refresh")
+        if not token:
+            return Response({"error": "refresh is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            refresh = RefreshToken(token)
+        except TokenError:
+            return Response({"error": "Invalid refresh token."}, status=status.HTTP_400_BAD_REQUEST)
+
+        revoke(refresh[jwt_settings.JTI_CLAIM], datetime_from_epoch(refresh["exp"]))
+        return Response(status=status.HTTP_205_RESET_CONTENT)
+
+
+def metrics(request):
+    """
+    Prometheus text-format counters and request histograms, for internal scraping.
+
+    Only addresses in METRICS_ALLOWED_IPS get them; per-view latencies and query
+    counts are not for the public. REMOTE_ADDR is used, never X-Forwarded-For.
+    """
+    if request.META.get("REMOTE_ADDR") not in getattr(settings, 'METRICS_ALLOWED_IPS', []):
+        return HttpResponseForbidden()
+    lines = [
+        "# HELP ninjadtao_schedule_cache_total Schedule cache lookups per day, by result.",
+        "# TYPE ninjadtao_schedule_cache_total counter",
+    ]
+    for result, value in schedule_cache.stats().items():
+        lines.append(f'ninjadtao_schedule_cache_total{{result="{result}"}} {value}')
+    lines.extend(request_metrics.exposition())
+    return HttpResponse("\n".join(lines) + "\n", content_type="text/plain; version=0.0.4")
 
 
 class TestView(APIView):
@@ -24,6 +105,8 @@ class TestView(APIView):
 #localhost:8000/api/v1.0/user/test/
 
 class LoginView(APIView):
+    throttle_classes = LOGIN_THROTTLES
+
     def post(self, request):
         email = request.data.get("email")
         password = request.data.get("password")
@@ -37,43 +120,359 @@ class LoginView(APIView):
 #localhost:8000/api/v1.0/user/login
 
 class AuthView(APIView): 
+    authentication_classes = [StatelessJWTAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticated]
+    booking_views = ("upcoming", "past")
+    read_only_methods = ("POST",)  # the profile is POSTed but changes nothing (userAPI.batch)
+
     def post(self, request):
-        user = request.user
+        # ?bookings=upcoming (default) or ?bookings=past, paged with ?cursor= / ?page_size=
+        view = request.query_params.get("bookings", "upcoming")
+        if view not in self.booking_views:
+            return Response({"error": "bookings must be 'upcoming' or 'past'."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Get all booked classes for this user
-        booked_classes = BookedClasses.objects.filter(userId=user)
+        paginator = BookingCursorPagination()
+        page = paginator.paginate_queryset(self.get_bookings(request.user, view), request, view=self)
+        return Response(self.get_profile(request.user, view, page, paginator))
 
-        # Serialize them
-        serializer = BookingSerializer(booked_classes, many=True)
+    def get_bookings(self, user, view):
+        booked_classes = BookedClasses.objects.filter(userId_id=user.pk).select_related('clasId')
+        today = timezone.localdate()
+        if view == "upcoming":
+            booked_classes = booked_classes.filter(clasId__class_date__gte=today)
+        else:
+            booked_classes = booked_classes.filter(clasId__class_date__lt=today)
+        if fastserializers.enabled():
+            return fastserializers.booking_values(booked_classes)
+        return booked_classes
 
-        # Return user info + booked classes
-        return Response({
+    def get_profile(self, user, view, page, paginator):
+        # Return user info + one page of booked classes
+        if fastserializers.enabled():
+            booked_classes = fastserializers.serialize_bookings(page)
+        else:
+            booked_classes = BookingDetailSerializer(page, many=True).data
+        return {
             "email": user.email,
             "first_name": user.first_name,
             "last_name": user.last_name,
             "membership_name": user.get_membershipName_display(),
-            "booked_classes": serializer.data, 
-        })
+            "bookings": view,
+            "booked_classes": booked_classes,
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link(),
+        }
 
 class BookingView(APIView): 
+    authentication_classes = [StatelessJWTAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @staticmethod
+    def get_class_id(request):
+        try:
+            return int(request.data.get("clasId") or request.query_params.get("clasId"))
+        except (TypeError, ValueError):
+            return None
+
+    @idempotent
     def post(self, request): 
-        serializer = BookingSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=200)
+        class_id = self.get_class_id(request)
+        if class_id is None:
+            return Response({"error": "clasId must be a class id."}, status=status.HTTP_400_BAD_REQUEST)
+
+        booking = book_class(request.user, class_id)
+        serializer = BookingSerializer(booking)
+        return Response(serializer.data, status=200)
+
+    @idempotent
+    def delete(self, request):
+        class_id = self.get_class_id(request)
+        if class_id is None:
+            return Response({"error": "clasId must be a class id."}, status=status.HTTP_400_BAD_REQUEST)
+
+        cancel_booking(request.user, class_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 class ClassesView(APIView):
+    authentication_classes = [StatelessJWTAuthentication, SessionAuthentication]
+    max_range_days = 92
+
     def get(self, request):
+        try:
+            start, end = self.get_date_range(request)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The schedule version check is one indexed query; serialization only runs on a miss.
+        versions = schedule_versions(start, end)
+        etag = schedule_etag(start, end, request.user, versions)
+        headers = {"ETag": etag, "Vary": "Authorization, Cookie"}
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        if start is None:
+            # The whole table isn't cached; it's one annotated query.
+            classes = self.get_classes(start, end, request.user)
+            if fastserializers.enabled():
+                data = fastserializers.serialize_classes(classes)
+            else:
+                data = ClassSerializer(classes, many=True).data
+            return Response(data, status=status.HTTP_200_OK, headers=headers)
+
+        rows, stale = get_schedule(versions)
+        if stale:
+            del headers["ETag"]  # these rows belong to an older version than the tag would claim
+        data = self.mark_booked(rows, booked_class_ids(request.user, start, end))
+        return Response(data, status=status.HTTP_200_OK, headers=headers)
+
+    def get_classes(self, start, end, user):
+        classes = Classes.objects.order_by('class_date', 'class_start_time')
+        if start is not None:
+            classes = classes.filter(class_date__range=(start, end))
+        return with_availability(classes, user)
+
+    @staticmethod
+    def mark_booked(rows, booked_ids):
+        return [{**row, "is_booked": row["classId"] in booked_ids} for row in rows]
+
+    def get_date_range(self, request):
+        """?date=YYYY-MM-DD for one day, ?start=&end= for a range, nothing for every class."""
         date_param = request.query_params.get('date')
+        start_param = request.query_params.get('start', date_param)
+        end_param = request.query_params.get('end', date_param)
+
+        if start_param is None and end_param is None:
+            return None, None
+        if start_param is None or end_param is None:
+            raise ValueError("Both start and end are required.")
+
+        try:
+            start, end = parse_date(start_param), parse_date(end_param)
+        except ValueError:
+            start = end = None
+        if start is None or end is None:
+            raise ValueError("Invalid date format. Use YYYY-MM-DD.")
+        if end < start:
+            raise ValueError("end must not be before start.")
+        if (end - start).days >= self.max_range_days:
+            raise ValueError(f"Date range is limited to {self.max_range_days} days.")
+        return start, end
+
+
+class ClassSearchView(APIView):
+    """
+    ?q=muay thai&instructor=dan&start=&end=: classes matching every word, in schedule order.
+
+    q searches class name, description and instructor; instructor only the
+    instructor. start defaults to today; at most settings.SEARCH_MAX_RESULTS
+    rows come back. Served by the full-text index (userAPI.search).
+    """
+    authentication_classes = [StatelessJWTAuthentication, SessionAuthentication]
+
+    def get(self, request):
+        text = request.query_params.get("q", "")
+        instructor = request.query_params.get("instructor", "")
+        if not search.terms(text) and not search.terms(instructor):
+            return Response({"error": "q or instructor is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            start, end = self.get_dates(request)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        limit = getattr(settings, 'SEARCH_MAX_RESULTS', 100)
+        classes = with_availability(search.search_classes(text, instructor, start, end), request.user)[:limit]
+        if fastserializers.enabled():
+            data = fastserializers.serialize_classes(classes)
+        else:
+            data = ClassSerializer(classes, many=True).data
+        return Response(data, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def get_dates(request):
+        return parse_date_param(request, "start", timezone.localdate()), parse_date_param(request, "end")
+
+
+class ClassSummaryView(APIView):
+    """?month=YYYY-MM (default: this month): per-day class count, capacity and booked seats for a calendar."""
+    authentication_classes = [StatelessJWTAuthentication, SessionAuthentication]
+
+    def get(self, request):
+        try:
+            start, end = self.get_month(request.query_params.get("month"))
+        except ValueError:
+            return Response({"error": "Invalid month. Use YYYY-MM."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Same day versions as /classes/, so a booking or edit on any day of the month changes the tag.
+        etag = schedule_etag(start, end, versions=schedule_versions(start, end), resource="summary")
+        headers = {"ETag": etag}
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        days = [
+            {"date": row["class_date"].isoformat(), "classes": row["classes"],
+             "capacity": row["capacity"], "booked": row["booked"]}
+            for row in schedule_summary(start, end)
+        ]
+        return Response({"month": f"{start:%Y-%m}", "days": days}, status=status.HTTP_200_OK, headers=headers)
 
-        if date_param:
-            try:
-                classes = Classes.objects.filter(class_date=date_param)
-            except ValueError:
-                return Response({"error": "Invalid date format. Use YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+    @staticmethod
+    def get_month(value):
+        if value is None:
+            start = timezone.localdate().replace(day=1)
         else:
-            classes = Classes.objects.all()
+            if len(value) != 7 or value[4] != "-":
+                raise ValueError(value)
+            start = date(int(value[:4]), int(value[5:]), 1)
+        return start, start.replace(day=calendar.monthrange(start.year, start.month)[1])
+
+
+class AnalyticsView(APIView):
+    """
+    Staff-only attendance analytics, answered from the rollup tables (services.add_to_rollups).
+
+    ?start=&end= (YYYY-MM-DD) pick whole weeks, Monday to Sunday; the default is
+    the last default_weeks weeks up to this one.
+    """
+    authentication_classes = [StatelessJWTAuthentication, SessionAuthentication]
+    permission_classes = [IsAdminUser]
+    default_weeks = 12
+    max_range_days = 731
+
+    def get_weeks(self, request):
+        today = timezone.localdate()
+        start = parse_date_param(request, "start", week_of(today) - timedelta(weeks=self.default_weeks - 1))
+        end = parse_date_param(request, "end", today)
+        try:
+            start, end = week_of(start), week_of(end) + timedelta(days=6)
+        except OverflowError:
+            raise ValueError("Dates must fall in whole weeks between 0001-01-01 and 9999-12-31.")
+        if end < start:
+            raise ValueError("end must not be before start.")
+        if (end - start).days >= self.max_range_days:
+            raise ValueError(f"Date range is limited to {self.max_range_days} days.")
+        return start, end
+
+
+class InstructorAnalyticsView(AnalyticsView):
+    """?start=&end=&instructor=: classes, capacity, booked seats and fill rate per instructor per week."""
+
+    def get(self, request):
+        try:
+            start, end = self.get_weeks(request)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        weeks = [
+            {**row, "week": row["week"].isoformat()}
+            for row in instructor_weeks(start, end, request.query_params.get("instructor") or None)
+        ]
+        return Response({"start": start.isoformat(), "end": end.isoformat(), "weeks": weeks}, status=status.HTTP_200_OK)
+
+
+class TimeSlotAnalyticsView(AnalyticsView):
+    """?start=&end=&limit=: the busiest weekday and start time slots, by booked seats."""
+    default_limit = 10
 
-        serializer = ClassSerializer(classes, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    def get(self, request):
+        try:
+            start, end = self.get_weeks(request)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        limit = self.get_limit(request)
+        if limit is None:
+            return Response({"error": "limit must be a positive integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        slots = [
+            {**row, "weekday": Weekday(row["weekday"]).label, "start_time": f"{row['start_time']:%H:%M}"}
+            for row in popular_time_slots(start, end, limit)
+        ]
+        return Response({"start": start.isoformat(), "end": end.isoformat(), "slots": slots}, status=status.HTTP_200_OK)
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get("limit", self.default_limit))
+        except ValueError:
+            return None
+        return limit if limit > 0 else None
+
+
+class IgnoreClientContentNegotiation(BaseContentNegotiation):
+    """The export format comes from the URL; don't 406 clients that send Accept: text/csv."""
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return (renderers[0], renderers[0].media_type)
+
+
+class ExportView(APIView):
+    """
+    Staff-only streaming exports: /export/bookings.csv, /export/members.ndjson, ...
+
+    bookings takes ?start= / ?end= (class date, YYYY-MM-DD) and ?instructor=;
+    members takes ?membership= and ?active=true|false.
+    """
+    authentication_classes = [StatelessJWTAuthentication, SessionAuthentication]
+    permission_classes = [IsAdminUser]
+    content_negotiation_class = IgnoreClientContentNegotiation
+    batchable = False  # streams; a batch needs the whole body
+
+    def get(self, request, dataset, fmt):
+        if fmt not in exports.FORMATS:
+            return Response({"error": f"Unknown format '{fmt}'. Use csv or ndjson."}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            if dataset == "bookings":
+                queryset, columns = exports.bookings(**self.get_booking_filters(request))
+            elif dataset == "members":
+                queryset, columns = exports.members(**self.get_member_filters(request))
+            else:
+                return Response({"error": f"Unknown export '{dataset}'."}, status=status.HTTP_404_NOT_FOUND)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        stream, content_type = exports.FORMATS[fmt]
+        response = StreamingHttpResponse(stream(queryset, columns), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{dataset}.{fmt}"'
+        return response
+
+    @staticmethod
+    def get_booking_filters(request):
+        return {
+            "instructor": request.query_params.get("instructor") or None,
+            "start": parse_date_param(request, "start"),
+            "end": parse_date_param(request, "end"),
+        }
+
+    @staticmethod
+    def get_member_filters(request):
+        filters = {}
+        membership = request.query_params.get("membership")
+        if membership:
+            if membership not in {str(value) for value in Membership.values}:
+                raise ValueError(f"membership must be one of {Membership.values}.")
+            filters["membership"] = int(membership)
+        active = request.query_params.get("active")
+        if active:
+            if active not in ("true", "false"):
+                raise ValueError("active must be 'true' or 'false'.")
+            filters["active"] = active == "true"
+        return filters
+
+
+class BatchView(APIView):
+    """
+    POST {"requests": [{"id", "method", "path", "headers", "body"}, ...]}: several userAPI calls in one round trip.
+
+    See userAPI.batch. Here on the WSGI app they run one after another; the
+    ASGI app (asyncviews.AsyncBatchView) runs consecutive reads concurrently.
+    """
+    authentication_classes = [StatelessJWTAuthentication, SessionAuthentication]
+    batchable = False
+
+    def post(self, request):
+        try:
+            specs = batch.parse(request.data)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"responses": [batch.Call(request, spec).run() for spec in specs]})